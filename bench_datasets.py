@@ -1,42 +1,66 @@
 """
 Save as `bench_datasets.py` at project root and run:
-    python3 bench_datasets.py
+    python3 bench_datasets.py [--workers N] [--engines layers,heightmap] [--baseline old_results.csv]
 
 This script:
-- Scans CSV files in the repository root.
-- For each CSV it loads items using loader_gpu.main_gpu.load_items_csv.
-- Tries a small grid of lane percentiles, candidate pool sizes and GA settings.
-- Runs packing (with OR-Tools preselect if available, then optional GA).
-- Keeps and writes the best result (layout + report + plot) per dataset into `bench_results/`.
+- Scans CSV files in the repository root (or the ones given with --datasets).
+- For each CSV it loads items as a columnar ItemTable using loader_gpu.main_gpu.load_items_csv.
+- Tries a small grid of lane percentiles, candidate pool sizes, GA settings and pack order modes,
+  spreading the grid points across a process pool.
+- Records fill metrics, wall time and peak traced memory per stage for every point in
+  `bench_results/results.csv`, one row per point, appended as points finish. Points already in
+  the table are skipped, so an interrupted run resumes where it stopped (--fresh 1 starts over).
+- Reports the fill gained and the extra seconds over the plain sorted pack (no GA,
+  respect_order=0) of the same lane/candidate setting, and their ratio when the point is
+  slower by more than MIN_EXTRA_S (below that the ratio is noise and is left out).
+- Writes the winner per dataset (layout + report + plot) into `bench_results/`; plots are
+  rendered once, for the final winner only, on a background thread (--render 0 skips them).
+- Consults the pack result cache (loader_gpu/cache.py, --cache_dir) before running a point; a
+  hit returns the stored row, timings included, and layout. Hit/miss counts go into
+  `bench_results/cache_stats.json`. Use --cache 0 when the timings themselves are measured.
+- With --baseline, compares against a stored results table and lists fill drops and slowdowns
+  in `bench_results/regressions.json` (exit status 1 when there are any).
 
 Run notes:
 - This is intentionally conservative in search space to finish reasonably fast. You can expand
-  `LANE_PCTS`, `CAND_SIZES`, and `GA_CHOICES` to search more combos.
+  `LANE_PCTS`, `CAND_SIZES`, `GA_CHOICES` and `ORDER_MODES` to search more combos.
+- Peak memory comes from tracemalloc, which slows Python-heavy stages; compare timings only
+  between runs with the same --trace_memory setting.
 """
-import os, glob
+import os, glob, time, csv, argparse, sys, tracemalloc
 from itertools import product
 from importlib import import_module
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 mg = import_module("loader_gpu.main_gpu")
 cfg = import_module("loader_gpu.config")
 sel = import_module("loader_gpu.selector")
-ga_mod = import_module("loader_gpu.ga_gpu")
+ga_mod = import_module("loader_gpu.ga")
 pack_mod = import_module("loader_gpu.packer_cpu")
 utils = import_module("loader_gpu.utils")
+models = import_module("loader_gpu.models")
+instrument = import_module("loader_gpu.instrument")
+cache_mod = import_module("loader_gpu.cache")
 
 load_items_csv = mg.load_items_csv
 select_subset = sel.select_subset
+lane_candidates = sel.lane_candidates
+PlacementTable = models.PlacementTable
 ga_reorder = ga_mod.ga_reorder
 pack = pack_mod.pack
 save_layout_csv = utils.save_layout_csv
 save_report_json = utils.save_report_json
-try:
-    draw3d = utils.draw3d
-except Exception:
-    draw3d = lambda *a, **k: None
+metrics = instrument.metrics
+def draw3d(*args, **kwargs):
+    # a missing or broken matplotlib must not cost the benchmark results
+    try:
+        utils.draw3d(*args, **kwargs)
+    except Exception:
+        pass
+
+import numpy as np
 
-ROOT = os.path.dirname(__file__)
-CSV_FILES = [p for p in glob.glob(os.path.join(ROOT, "*.csv"))]
+ROOT = os.path.dirname(os.path.abspath(__file__))
 # ignore output files we might have generated and very small CSVs later
 IGNORE_PREFIXES = {"packed_layout", "bench_results", "report", "plot3d"}
 
@@ -44,98 +68,287 @@ IGNORE_PREFIXES = {"packed_layout", "bench_results", "report", "plot3d"}
 LANE_PCTS = [60, 70, 80]
 CAND_SIZES = [180, 260, None]   # None -> use all eligible
 GA_CHOICES = [(0, 0), (48, 18)]  # (population, generations)  (0,0) -> no GA
+ORDER_MODES = [0, 1]             # pack respect_order: 0 -> pack re-sorts, 1 -> keep GA order
 
-os.makedirs("bench_results", exist_ok=True)
+# wall-time differences below this (seconds) are timing noise: no fill-per-second ratio and
+# no throughput regression
+MIN_EXTRA_S = 0.05
 
-import numpy as np
+STAGES = ["load", "prefilter", "select_subset", "ga_reorder", "pack"]
+KEY_FIELDS = ["dataset", "engine", "lane_pct", "cand_size", "ga_pop", "ga_gen", "respect_order"]
+RESULT_FIELDS = KEY_FIELDS + ["preselected", "placed", "vol_util", "wt_util", "seconds"] + \
+    [f"{s}_s" for s in STAGES] + [f"{s}_peak_mb" for s in STAGES]
 
-for csv_path in CSV_FILES:
-    base = os.path.basename(csv_path).rsplit('.',1)[0]
-    if any(base.startswith(pref) for pref in IGNORE_PREFIXES):
-        print(f"Skipping generated file: {csv_path}")
-        continue
-    name = os.path.basename(csv_path).rsplit(".", 1)[0]
-    print(f"\n=== Dataset: {name} ({csv_path}) ===")
-    try:
-        items = load_items_csv(csv_path)
-    except Exception as e:
-        print(f"Skipping {csv_path}: failed to load as items CSV ({e})")
-        continue
-    print(f"Loaded {len(items)} items from {name}")
-    if len(items) < 10:
-        print(f"Skipping {name} because it has too few items ({len(items)}) to benchmark.")
-        continue
+def _key(row):
+    return tuple(str(row[k]) for k in KEY_FIELDS)
+
+def _worker_init():
+    # one grid point per worker process: keep torch/BLAS (if loaded later) single-threaded
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+# per-process caches by directory, so a pool worker keeps its memory tier across points
+_CACHES = {}
+
+def run_point(job):
+    # One grid point, run in a pool worker (or in-process to re-create a winner).
+    # Returns (results row, placements, total weight, served from the cache).
+    csv_path, engine, lane_pct, cand_size, (pop, gen), respect, trace_memory, cache_dir = job
+    metrics.reset()
+    metrics.enabled, metrics.verbose = True, False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
     truck = cfg.TruckSpec()
+    t0 = time.perf_counter()
+    with metrics.stage("load"):
+        tab = load_items_csv(csv_path, table=True)
+    cache = key = None
+    if cache_dir:
+        if cache_dir not in _CACHES:
+            _CACHES[cache_dir] = cache_mod.ResultCache(cache_dir)
+        cache = _CACHES[cache_dir]
+        params = {"runner": "bench", "engine": engine, "lane_pct": lane_pct, "cand_size": cand_size,
+                  "ga": [pop, gen], "respect_order": respect, "trace_memory": bool(trace_memory)}
+        key = cache_mod.cache_key(tab, truck, cfg.Flags(), params)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit["row"], cache_mod.placements_from_json(hit["placed"]), hit["total_weight"], True
+    with metrics.stage("prefilter"):
+        idx, lane = lane_candidates(tab, truck, lane_pct=lane_pct, limit=cand_size)
+        cand = tab.take(idx)
+    with metrics.stage("select_subset"):
+        # failures propagate: main() reports the point as FAILED rather than recording a
+        # measurement of the unselected pool
+        chosen = select_subset(cand, truck).to_items()
+
+    order = chosen[:]
+    if pop and len(order) > 4:
+        with metrics.stage("ga_reorder"):
+            order = ga_reorder(order, truck, population=pop, generations=gen,
+                               respect_order=bool(respect), engine=engine)
 
-    widths = np.array([min(i.L, i.W) if i.can_rotate else i.W for i in items])
-    # guard against empty or nan-only arrays
-    if widths.size == 0 or np.isnan(widths).all():
-        print(f"No valid width measurements for {name}, skipping.")
-        continue
+    with metrics.stage("pack"):
+        placed, total_w = pack(truck, cfg.Flags(), order, respect_order=bool(respect), engine=engine)
+    seconds = time.perf_counter() - t0
 
-    best = {"vol_util": -1, "placed": [], "cfg": None}
+    vol_total = truck.L * truck.W * truck.H
+    rep = metrics.report()
+    row = {
+        "dataset": os.path.basename(csv_path).rsplit(".", 1)[0], "engine": engine,
+        "lane_pct": lane_pct, "cand_size": cand_size or "ALL", "ga_pop": pop, "ga_gen": gen,
+        "respect_order": respect, "preselected": len(chosen), "placed": len(placed),
+        "vol_util": round(100.0 * PlacementTable.from_placements(placed).volume() / vol_total, 3),
+        "wt_util": round(100.0 * total_w / truck.payload_kg, 3),
+        "seconds": round(seconds, 4),
+    }
+    for s in STAGES:
+        row[f"{s}_s"] = rep["stage_seconds"].get(s, 0.0)
+        row[f"{s}_peak_mb"] = rep.get("stage_peak_mb", {}).get(s, "")
+    if cache is not None:
+        cache.put(key, {"row": row, "placed": cache_mod.placements_to_json(placed), "total_weight": total_w})
+    return row, placed, total_w, False
 
-    for lane_pct, cand_size, ga_cfg in product(LANE_PCTS, CAND_SIZES, GA_CHOICES):
+def _read_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+def _value(v):
+    # results.csv cell back to int/float where it was one
+    for conv in (int, float):
         try:
-            lane = float(np.percentile(widths, lane_pct))
-        except Exception:
-            lane = float(np.nanpercentile(widths, min(lane_pct, 100)))
-        lane = min(lane, truck.W / 1.95)
-        MIN_H = 0.0
+            return conv(v)
+        except (TypeError, ValueError):
+            pass
+    return v
 
-        def fits_lane(it):
-            dims = [(it.L, it.W), (it.W, it.L)] if it.can_rotate else [(it.L, it.W)]
-            return any((w <= lane and l <= truck.L and it.H <= truck.H) for l, w in dims)
+def _datasets(paths):
+    # loadable item CSVs with enough rows and usable widths
+    found = []
+    for csv_path in paths:
+        base = os.path.basename(csv_path).rsplit('.', 1)[0]
+        if any(base.startswith(pref) for pref in IGNORE_PREFIXES):
+            print(f"Skipping generated file: {csv_path}")
+            continue
+        try:
+            tab = load_items_csv(csv_path, table=True)
+        except Exception as e:
+            print(f"Skipping {csv_path}: failed to load as items CSV ({e})")
+            continue
+        if len(tab) < 10:
+            print(f"Skipping {base} because it has too few items ({len(tab)}) to benchmark.")
+            continue
+        widths = np.where(tab.can_rotate != 0, np.minimum(tab.L, tab.W), tab.W)
+        # guard against nan-only arrays
+        if np.isnan(widths).all():
+            print(f"No valid width measurements for {base}, skipping.")
+            continue
+        found.append(csv_path)
+    return found
 
-        eligible = [i for i in items if i.H >= MIN_H and fits_lane(i)]
-        eligible = sorted(eligible, key=lambda i: (
-            -i.drop_order, -i.H, -(i.L * i.W), -i.stack_limit
-        ))
+def gain_per_second(rows):
+    # (fill points gained, extra seconds, points per extra second) over the plain sorted pack
+    # of the same setting; the ratio is None unless the point is slower by over MIN_EXTRA_S
+    ref = {}
+    for r in rows:
+        if int(_num(r["ga_pop"])) == 0 and int(_num(r["respect_order"])) == 0:
+            ref[(r["dataset"], r["engine"], str(r["lane_pct"]), str(r["cand_size"]))] = r
+    out = {}
+    for r in rows:
+        base = ref.get((r["dataset"], r["engine"], str(r["lane_pct"]), str(r["cand_size"])))
+        if base is None:
+            continue
+        fill = _num(r["vol_util"]) - _num(base["vol_util"])
+        extra_s = _num(r["seconds"]) - _num(base["seconds"])
+        out[_key(r)] = (fill, extra_s, fill / extra_s if extra_s > MIN_EXTRA_S else None)
+    return out
 
-        if len(eligible) < 150:
-            eligible = sorted(items, key=lambda i: -(i.L * i.W))[:150]
+def compare_baseline(rows, baseline_rows, fill_tol, time_tol):
+    # Matching grid points only: fill drops beyond fill_tol points are quality regressions,
+    # wall time beyond (1 + time_tol) x baseline (and + MIN_EXTRA_S) throughput regressions.
+    base = {_key(r): r for r in baseline_rows}
+    found = []
+    for r in rows:
+        b = base.get(_key(r))
+        if b is None:
+            continue
+        drop = _num(b["vol_util"]) - _num(r["vol_util"])
+        if drop > fill_tol:
+            found.append({"kind": "quality", "point": dict(zip(KEY_FIELDS, _key(r))),
+                          "baseline_vol_util": _num(b["vol_util"]), "vol_util": _num(r["vol_util"])})
+        slow, fast = _num(r["seconds"]), _num(b["seconds"])
+        if slow > fast * (1.0 + time_tol) and slow - fast > MIN_EXTRA_S:
+            found.append({"kind": "throughput", "point": dict(zip(KEY_FIELDS, _key(r))),
+                          "baseline_seconds": fast, "seconds": slow})
+    return found
 
-        cand = eligible if cand_size is None else eligible[:cand_size]
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the loader grid over item CSVs")
+    ap.add_argument("--datasets", nargs="*", help="item CSVs (default: all CSVs in the repo root)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--engines", default="layers", help="comma-separated pack engines")
+    ap.add_argument("--out", default="bench_results")
+    ap.add_argument("--fresh", type=int, default=0)
+    ap.add_argument("--trace_memory", type=int, default=1)
+    ap.add_argument("--cache", type=int, default=1, help="reuse results of identical earlier points")
+    ap.add_argument("--cache_dir", default=cfg.CACHE_DIR)
+    ap.add_argument("--render", type=int, default=1, help="plot the winners (0 -> skip)")
+    ap.add_argument("--baseline", help="results.csv of an earlier run to compare against")
+    ap.add_argument("--fill_tol", type=float, default=0.5, help="allowed vol_util drop (points)")
+    ap.add_argument("--time_tol", type=float, default=0.25, help="allowed relative slowdown")
+    args = ap.parse_args()
 
-        try:
-            chosen = select_subset(cand, truck)
-        except Exception:
-            chosen = cand
+    os.makedirs(args.out, exist_ok=True)
+    results_path = os.path.join(args.out, "results.csv")
+    if args.fresh and os.path.exists(results_path):
+        os.remove(results_path)
+    done = {_key(r): r for r in _read_results(results_path)}
 
-        order = chosen[:]
-        pop, gen = ga_cfg
-        if pop and len(order) > 4:
-            try:
-                order = ga_reorder(order, truck, population=pop, generations=gen)
-            except Exception:
-                order = chosen[:]
-
-        placed, total_w = pack(truck, cfg.Flags(), order)
-
-        vol_used = sum(p.L * p.W * p.H for p in placed)
-        vol_total = truck.L * truck.W * truck.H
-        vol_util = 100.0 * vol_used / vol_total
-
-        if vol_util > best['vol_util']:
-            best['vol_util'] = vol_util
-            best['placed'] = placed
-            best['cfg'] = {"lane_pct": lane_pct, "cand_size": cand_size, "ga": ga_cfg, "preselected": len(chosen)}
-            out_prefix = os.path.join("bench_results", f"{name}_best")
-            save_layout_csv(placed, out_prefix + "_packed_layout.csv")
-            save_report_json({
-                "placed_items": len(placed),
-                "volume_utilization_pct": round(vol_util, 2),
-                "weight_utilization_pct": round(100.0 * total_w / truck.payload_kg, 2),
-                "config": best['cfg'],
-            }, out_prefix + "_report.json")
+    paths = args.datasets or sorted(glob.glob(os.path.join(ROOT, "*.csv")))
+    datasets = _datasets(paths)
+    engines = [e for e in args.engines.split(",") if e]
+    cache_dir = args.cache_dir if args.cache else None
+    jobs = []
+    for csv_path, engine, lane_pct, cand_size, ga_cfg, respect in product(
+            datasets, engines, LANE_PCTS, CAND_SIZES, GA_CHOICES, ORDER_MODES):
+        job = (csv_path, engine, lane_pct, cand_size, ga_cfg, respect, bool(args.trace_memory), cache_dir)
+        key = _key({"dataset": os.path.basename(csv_path).rsplit(".", 1)[0], "engine": engine,
+                    "lane_pct": lane_pct, "cand_size": cand_size or "ALL", "ga_pop": ga_cfg[0],
+                    "ga_gen": ga_cfg[1], "respect_order": respect})
+        if key not in done:
+            jobs.append(job)
+    print(f"{len(datasets)} datasets, {len(jobs)} grid points to run ({len(done)} already in {results_path})")
+
+    # placements of points finished in this session, so winners need no re-run
+    layouts = {}
+    cache_stats = {"hits": 0, "misses": 0}
+    new_file = not os.path.exists(results_path)
+    with open(results_path, "a", newline="") as f, \
+            ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_worker_init) as pool:
+        w = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new_file:
+            w.writeheader()
+        futures = {pool.submit(run_point, job): job for job in jobs}
+        for fut in as_completed(futures):
             try:
-                draw3d(placed, truck, out_prefix + "_plot3d.png",
-                       title=f"{name} best: {vol_util:.2f}% (cfg={best['cfg']})")
-            except Exception:
-                pass
+                row, placed, total_w, cached = fut.result()
+            except Exception as e:
+                print(f"FAILED {futures[fut][:6]}: {e}")
+                continue
+            if cache_dir:
+                cache_stats["hits" if cached else "misses"] += 1
+            w.writerow(row); f.flush()
+            done[_key(row)] = {k: str(v) for k, v in row.items()}
+            layouts[_key(row)] = (placed, total_w)
+            print(f"{row['dataset']} engine={row['engine']} lane={row['lane_pct']} cand={row['cand_size']} "
+                  f"ga=({row['ga_pop']}, {row['ga_gen']}) order={row['respect_order']} -> "
+                  f"vol={row['vol_util']:.2f}% placed={row['placed']} time={row['seconds']:.2f}s"
+                  f"{' (cached)' if cached else ''}")
+
+    rows = [r for r in done.values() if r["dataset"] in
+            {os.path.basename(p).rsplit(".", 1)[0] for p in datasets}]
+    gains = gain_per_second(rows)
+    truck = cfg.TruckSpec()
+    summary = {}
+    writer = utils.OutputWriter("thread")
+    for name in sorted({r["dataset"] for r in rows}):
+        best = max((r for r in rows if r["dataset"] == name), key=lambda r: _num(r["vol_util"]))
+        key = _key(best)
+        if key not in layouts:
+            # winner came from an earlier session: re-create its layout (the grid is deterministic)
+            csv_path = next(p for p in datasets if os.path.basename(p).rsplit(".", 1)[0] == name)
+            cand = None if best["cand_size"] == "ALL" else int(_num(best["cand_size"]))
+            _, placed, total_w, _ = run_point((csv_path, best["engine"], int(_num(best["lane_pct"])), cand,
+                                               (int(_num(best["ga_pop"])), int(_num(best["ga_gen"]))),
+                                               int(_num(best["respect_order"])), False, cache_dir))
+            layouts[key] = (placed, total_w)
+        placed, total_w = layouts[key]
+        fill, extra_s, ratio = gains.get(key, (None, None, None))
+        config = {k: _value(v) for k, v in zip(KEY_FIELDS[1:], key[1:])}
+        out_prefix = os.path.join(args.out, f"{name}_best")
+        writer.submit(save_layout_csv, placed, out_prefix + "_packed_layout.csv")
+        summary[name] = {
+            "placed_items": len(placed),
+            "volume_utilization_pct": round(_num(best["vol_util"]), 2),
+            "weight_utilization_pct": round(100.0 * total_w / truck.payload_kg, 2),
+            "config": config,
+            "seconds": _num(best["seconds"]),
+            "fill_gain_pts": round(fill, 3) if fill is not None else None,
+            "extra_seconds": round(extra_s, 3) if extra_s is not None else None,
+            "fill_gain_per_second": round(ratio, 3) if ratio is not None else None,
+            "stage_seconds": {s: _num(best[f"{s}_s"]) for s in STAGES},
+        }
+        writer.submit(save_report_json, summary[name], out_prefix + "_report.json")
+        if args.render:
+            writer.submit(draw3d, placed, truck, out_prefix + "_plot3d.png",
+                          title=f"{name} best: {_num(best['vol_util']):.2f}% (cfg={config})")
+        print(f"BEST for {name}: vol={_num(best['vol_util']):.2f}% cfg={config}")
+    writer.close()
+    save_report_json(summary, os.path.join(args.out, "summary.json"))
+    if cache_dir:
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        cache_stats["hit_rate"] = round(cache_stats["hits"] / lookups, 3) if lookups else None
+        save_report_json(cache_stats, os.path.join(args.out, "cache_stats.json"))
+        print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_dir})")
 
-        print(f"cfg lane={lane_pct} cand={cand_size or 'ALL'} ga={ga_cfg} -> vol={vol_util:.2f}% placed={len(placed)}")
+    if args.baseline:
+        regressions = compare_baseline(rows, _read_results(args.baseline), args.fill_tol, args.time_tol)
+        save_report_json(regressions, os.path.join(args.out, "regressions.json"))
+        for reg in regressions:
+            print(f"REGRESSION ({reg['kind']}): {reg}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        if regressions:
+            sys.exit(1)
 
-    print(f"BEST for {name}: vol={best['vol_util']:.2f}% cfg={best['cfg']}")
+    print(f'\nDone. Results saved under {args.out}/.')
 
-print('\nDone. Results saved under bench_results/.')
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse, asyncio, glob, os, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from .config import TruckSpec, Flags, BATCH_WORKERS, BATCH_JOBS
+from .instrument import metrics
+from .main_gpu import build_parser as pack_parser, load_items_csv, pack_manifest
+from .deadline import Deadline
+from .cache import ResultCache
+from .utils import save_layout_csv, save_layout_npy, save_report_json, draw3d
+
+# Batch pipeline over many manifests: each one goes load (CSV parse, on a thread) ->
+# select_subset/ga_reorder/pack (pack_manifest, in a worker process) -> write (layout, .npy,
+# plot and report, on threads), and up to `jobs` manifests are in flight at once, so
+# parsing and writing overlap with packing on the other workers. Outputs go to
+# <out>/<manifest name>/ as main_gpu writes them, plus <out>/batch_report.json.
+
+_CACHE = None       # per-worker ResultCache
+
+def _init_worker(cache_dir):
+    global _CACHE
+    metrics.verbose = False
+    _CACHE = ResultCache(cache_dir) if cache_dir else None
+
+def _pack_job(tab, args):
+    # runs in a worker process; the deadline starts when the worker picks the job up
+    metrics.reset()
+    metrics.enabled = bool(args.instrument)
+    placed, total_w, report = pack_manifest(tab, TruckSpec(), Flags(), args, Deadline(args.deadline or None), _CACHE)
+    if metrics.enabled:
+        report["instrumentation"] = metrics.report()
+    return placed, total_w, report
+
+def find_manifests(paths):
+    # files as given, directories expanded to their *.csv files (sorted)
+    found = []
+    for p in paths:
+        found += sorted(glob.glob(os.path.join(p, "*.csv"))) if os.path.isdir(p) else [p]
+    return found
+
+def _names(paths):
+    # output directory per manifest: the file name, suffixed when two manifests share it
+    names, seen = [], {}
+    for p in paths:
+        name = os.path.basename(p).rsplit(".", 1)[0]
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+async def _write(placed, truck, report, out, args):
+    os.makedirs(out, exist_ok=True)
+    jobs = [asyncio.to_thread(save_layout_csv, placed, os.path.join(out, "packed_layout.csv")),
+            asyncio.to_thread(save_report_json, report, os.path.join(out, "report.json"))]
+    if args.layout_npy:
+        jobs.append(asyncio.to_thread(save_layout_npy, placed, os.path.join(out, "packed_layout.npy")))
+    if args.render:
+        title = f"Fill: {report['volume_utilization_pct']:.1f}% (Vol), {report['weight_utilization_pct']:.1f}% (Wt)"
+        jobs.append(asyncio.to_thread(draw3d, placed, truck, os.path.join(out, "plot3d.png"), title=title))
+    await asyncio.gather(*jobs)
+
+async def _manifest(path, name, args, out_dir, pool, slots):
+    loop = asyncio.get_running_loop()
+    row = {"manifest": path, "name": name}
+    async with slots:
+        try:
+            t0 = time.perf_counter()
+            tab = await asyncio.to_thread(load_items_csv, path, table=True)
+            t1 = time.perf_counter()
+            placed, total_w, report = await loop.run_in_executor(pool, _pack_job, tab, args)
+            t2 = time.perf_counter()
+            report["batch"] = {"manifest": path, "load_s": round(t1 - t0, 4), "pack_s": round(t2 - t1, 4)}
+            await _write(placed, TruckSpec(), report, os.path.join(out_dir, name), args)
+            t3 = time.perf_counter()
+        except Exception as e:
+            metrics.log(f"[WARN] {name}: {type(e).__name__}: {e}")
+            return dict(row, error=f"{type(e).__name__}: {e}")
+    row.update(items=len(tab), placed_items=report["placed_items"],
+               volume_utilization_pct=report["volume_utilization_pct"],
+               weight_utilization_pct=report["weight_utilization_pct"],
+               load_s=round(t1 - t0, 4), pack_s=round(t2 - t1, 4), write_s=round(t3 - t2, 4))
+    if report.get("deadline", {}).get("cut_short"):
+        row["cut_short"] = report["deadline"]["cut_short"]
+    metrics.log(f"[BATCH] {name}: {row['placed_items']} placed, {row['volume_utilization_pct']:.1f}% vol "
+                f"(load {row['load_s']:.2f}s, pack {row['pack_s']:.2f}s, write {row['write_s']:.2f}s)")
+    return row
+
+async def run_batch(paths, args, out_dir="batch_out", workers=BATCH_WORKERS, jobs=BATCH_JOBS):
+    # returns the batch report (also written to <out_dir>/batch_report.json)
+    workers = workers or os.cpu_count() or 1
+    jobs = jobs or 2 * workers
+    names = _names(paths)
+    os.makedirs(out_dir, exist_ok=True)
+    # workers come from a fork server: the loader/writer threads are already running when
+    # the pool starts, and forking a threaded process is not safe
+    method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(method), initializer=_init_worker,
+                             initargs=(args.cache_dir if args.cache else None,)) as pool:
+        slots = asyncio.Semaphore(jobs)
+        rows = await asyncio.gather(*(_manifest(p, n, args, out_dir, pool, slots) for p, n in zip(paths, names)))
+    seconds = time.perf_counter() - t0
+    report = {
+        "manifests": len(rows),
+        "failed": sum("error" in r for r in rows),
+        "workers": workers,
+        "jobs_in_flight": jobs,
+        "seconds": round(seconds, 3),
+        "manifests_per_min": round(60.0 * len(rows) / max(seconds, 1e-9), 2),
+        "results": rows,
+    }
+    save_report_json(report, os.path.join(out_dir, "batch_report.json"))
+    return report
+
+def main():
+    ap = argparse.ArgumentParser(description="Pack many manifests with overlapped load/pack/write stages",
+                                 epilog="Any other option is passed on as a main_gpu option (e.g. --use_ga 0).")
+    ap.add_argument("manifests", nargs="+", help="item CSV files or directories of them")
+    ap.add_argument("--out", default="batch_out")
+    # pack worker processes (0 -> all cores) and manifests in flight (0 -> 2 per worker)
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    ap.add_argument("--jobs", type=int, default=BATCH_JOBS)
+    batch_args, rest = ap.parse_known_args()
+    args = pack_parser().parse_args(["--items", "-"] + rest)
+    if args.fleet or args.choose_truck:
+        ap.error("--fleet and --choose_truck are not supported in batch mode")
+    metrics.verbose = bool(args.verbose)
+    paths = find_manifests(batch_args.manifests)
+    if not paths:
+        ap.error("no manifests found")
+    report = asyncio.run(run_batch(paths, args, batch_args.out, batch_args.workers, batch_args.jobs))
+    print(f"Packed {report['manifests'] - report['failed']}/{report['manifests']} manifests in "
+          f"{report['seconds']:.1f}s ({report['manifests_per_min']:.1f}/min, {report['workers']} workers)")
+    print(f"Wrote: {batch_args.out}/batch_report.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import dataclasses, functools, hashlib, json, os
+from collections import OrderedDict
+from pathlib import Path
+from . import config
+from .config import CACHE_MEMORY_ENTRIES, CACHE_DISK_BYTES
+from .models import ItemTable, PlacementTable
+from .instrument import metrics
+
+@functools.lru_cache(maxsize=None)
+def _code_digest():
+    # the package sources are part of every key: a packer change must not serve old layouts
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(path.name.encode()); h.update(path.read_bytes())
+    return h.hexdigest()
+
+def _json(obj):
+    # numpy scalars (ids, drop orders, weights from an ItemTable) -> plain Python
+    return obj.item() if hasattr(obj, "item") else str(obj)
+
+def cache_key(tab: ItemTable, truck, flags, params):
+    # Content address of one run: item columns (in order, since order breaks ties in the
+    # prefilter/packer), TruckSpec, Flags, the upper-case config constants (bar CACHE_*), the run
+    # parameters (CLI arguments, grid point) and the package code.
+    h = hashlib.sha256(_code_digest().encode())
+    for name, col in tab.columns().items():
+        h.update(name.encode())
+        h.update("\x00".join(map(str, col.tolist())).encode() if col.dtype == object else col.tobytes())
+    consts = {k: v for k, v in vars(config).items() if k.isupper() and not k.startswith("CACHE_")}
+    for part in (dataclasses.asdict(truck), dataclasses.asdict(flags), consts, params):
+        h.update(json.dumps(part, sort_keys=True, default=_json).encode())
+    return h.hexdigest()
+
+def placements_to_json(placed):
+    tab = PlacementTable.from_placements(placed)
+    return {name: getattr(tab, name).tolist() for name in PlacementTable.FIELDS}
+
+def placements_from_json(cols):
+    return PlacementTable(**cols).to_placements()
+
+class ResultCache:
+    # Two-tier cache of JSON-serialisable run results: an in-process LRU of `max_entries`
+    # and, when `path` is set, one <key>.json file per entry under it. Disk hits refresh the
+    # file's mtime, and stores evict the least recently used files beyond `max_bytes`.
+    # Files are written to a temporary name and renamed, so pool workers can share a dir.
+    def __init__(self, path=None, max_entries=CACHE_MEMORY_ENTRIES, max_bytes=CACHE_DISK_BYTES):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self._hit("memory_hits")
+            return self.memory[key]
+        if self.path is not None:
+            f = self.path / f"{key}.json"
+            try:
+                value = json.loads(f.read_text())
+                os.utime(f)
+            except (OSError, ValueError):
+                value = None    # absent, evicted meanwhile, or a partial file from a crash
+            if value is not None:
+                self._remember(key, value)
+                self._hit("disk_hits")
+                return value
+        self.stats["misses"] += 1
+        metrics.count("cache_misses")
+        return None
+
+    def _hit(self, kind):
+        self.stats[kind] += 1
+        metrics.count(f"cache_{kind}")
+
+    def put(self, key, value):
+        self._remember(key, value)
+        self.stats["stores"] += 1
+        if self.path is None:
+            return
+        f = self.path / f"{key}.json"
+        tmp = self.path / f".{key}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(value, default=_json))
+        os.replace(tmp, f)
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for f in self.path.glob("*.json"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, f))
+        total = sum(size for _, size, _ in files)
+        for _, size, f in sorted(files, key=lambda t: t[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                f.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+
+    def report(self):
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return dict(self.stats, hit_rate=round(hits / lookups, 3) if lookups else None)
@@ -1,13 +1,8 @@
 from dataclasses import dataclass
 
+# Default vehicle; other types (e.g. the Tata LPT 712) are listed in FLEET_CATALOG and
+# compared with main_gpu --choose_truck 1
 @dataclass
-# class TruckSpec:
-#     name: str = "Tata LPT 712"
-#     L: float = 5.218
-#     W: float = 1.962
-#     H: float = 1.812
-#     payload_kg: float = 3800.0
-
 class TruckSpec:
     name: str = "20 ft Eicher Box"
     L: float = 6.32   # meters
@@ -37,3 +32,85 @@ BETA_WT: int = 1
 
 GA_POP: int = 64
 GA_GEN: int = 20
+
+# Workers for evaluating candidate layer heights in pack (<=1 -> serial, in-process)
+PACK_WORKERS: int = 1
+
+# Packing engine: "layers" (flat layers + shelf fallback) or "heightmap" (GRID_STEP height map)
+PACK_ENGINE: str = "layers"
+
+# How main_gpu writes the layout CSV, report and plot (--writer): "sync", "thread" or "process"
+OUTPUT_WRITER: str = "thread"
+
+# Collect per-stage wall times and hot-path counters into report.json (main_gpu --instrument)
+INSTRUMENT: bool = True
+
+# GA implementation: "auto" (torch when a CUDA device is present, else NumPy), "numpy" or "torch"
+GA_BACKEND: str = "auto"
+
+# GA rescoring: real-pack volumes memoised per process (LRU entries, keyed on the order pack
+# works through); after GA_SURROGATE_WARMUP real packs a linear fit of packed volume on the
+# proxy score screens the remaining candidates, packing only those whose prediction plus
+# GA_SURROGATE_Z residual deviations could beat the best so far. The fit screens nothing
+# while the proxy ranks the real packs so far with a Kendall's tau below GA_SURROGATE_MIN_TAU
+GA_FITNESS_CACHE: int = 256
+GA_SURROGATE_WARMUP: int = 5
+GA_SURROGATE_Z: float = 2.0
+GA_SURROGATE_MIN_TAU: float = 0.6
+
+# CP-SAT preselector: effort cap in deterministic seconds (roughly seconds of work; unlike a
+# wall-clock cap it stops at the same point on every run) and a wall-clock safety cap of
+# SELECT_WALL_FACTOR times that, search workers (>1 -> interleaved search, still reproducible
+# but slower per core), solver seed, weight of drop-order priority in the objective (0 -> off),
+# score each selected item earns on top of its own (keeps the pool full of candidates rather
+# than a few high scorers), and volume/payload allowed in the pool relative to the truck
+# (main_gpu --select_slack; above 1.0 the pool may hold more than the truck carries)
+SELECT_TIME_LIMIT: float = 1.8
+SELECT_WALL_FACTOR: float = 4.0
+SELECT_WORKERS: int = 1
+SELECT_SEED: int = 0
+SELECT_DROP_WEIGHT: float = 0.0
+SELECT_COUNT_BONUS: float = 1.0
+SELECT_SLACK: float = 1.0
+
+# Time budget (main_gpu --deadline): fractions of the time left that the preselection and
+# the GA may use; the final pack gets whatever remains
+DEADLINE_SELECT_SHARE: float = 0.25
+DEADLINE_GA_SHARE: float = 0.6
+
+# Pack result cache (main_gpu --cache, bench_datasets.py --cache): directory of the on-disk
+# tier, entries kept in memory per process, and disk size before LRU files are evicted
+CACHE_DIR: str = ".pack_cache"
+CACHE_MEMORY_ENTRIES: int = 64
+CACHE_DISK_BYTES: int = 256 * 1024 * 1024
+
+# Fleet mode (main_gpu --fleet 1): vehicle types as (spec, available count, cost per trip),
+# the share of a truck's volume the planner expects to fill, and solver processes (0 -> all cores)
+FLEET_CATALOG = [
+    (TruckSpec(), 12, 1.0),
+    (TruckSpec(name="Tata LPT 712", L=5.218, W=1.962, H=1.812, payload_kg=3800.0), 12, 0.7),
+]
+FLEET_FILL: float = 0.75
+FLEET_WORKERS: int = 0
+
+# Pack service (python -m loader_gpu.service): TCP port, warm worker processes (0 -> all
+# cores), requests queued beyond the busy workers before new ones get 503, request body cap
+SERVICE_PORT: int = 8765
+SERVICE_WORKERS: int = 0
+SERVICE_QUEUE: int = 32
+SERVICE_MAX_BODY: int = 64 * 1024 * 1024
+# Per-request effort on the service: deadline (s) when a request sets none and the largest it
+# may set, and the range (low, high) a request may give each numeric option; any other numeric
+# option must be finite and >= 0 (a worker process runs one request at a time, so requests
+# cannot start pools of their own: pack_workers, pack_pool and cache_dir are not accepted at all)
+SERVICE_DEADLINE: float = 30.0
+SERVICE_MAX_DEADLINE: float = 120.0
+SERVICE_LIMITS = {"select_time": (0.0, 5.0), "select_workers": (1, 1), "select_drop_weight": (0.0, 100.0),
+                  "select_slack": (0.5, 2.0), "ga_population": (2, 256), "ga_generations": (0, 100),
+                  "local_search": (0, 500), "use_ortools": (0, 1), "use_ga": (0, 1), "respect_order": (0, 1),
+                  "instrument": (0, 1), "verbose": (0, 1), "cache": (0, 1)}
+
+# Batch mode (python -m loader_gpu.batch): pack worker processes (0 -> all cores) and
+# manifests in flight through load/pack/write at once (0 -> 2 per worker)
+BATCH_WORKERS: int = 0
+BATCH_JOBS: int = 0
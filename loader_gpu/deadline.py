@@ -0,0 +1,53 @@
+import time
+
+class Deadline:
+    # Wall-clock budget shared by the stages of one run. Stages poll expired() between units
+    # of work (a candidate height, a GA generation, a rescoring pack, a shelf height) and
+    # keep their best result so far; stop(stage) does the same check and records the stage
+    # as cut short. seconds=None never expires, so deadline=None and Deadline() behave alike.
+    def __init__(self, seconds=None, end=None, cut=None):
+        self.end = end if end is not None else (time.perf_counter() + seconds if seconds else None)
+        self.cut = cut if cut is not None else []
+
+    def remaining(self):
+        return float("inf") if self.end is None else self.end - time.perf_counter()
+
+    def timeout(self):
+        # for wait(timeout=...): None without a budget, else the time left (0 once expired)
+        return None if self.end is None else max(0.0, self.remaining())
+
+    def expired(self):
+        return self.end is not None and time.perf_counter() >= self.end
+
+    def stop(self, stage):
+        if not self.expired():
+            return False
+        self.mark(stage)
+        return True
+
+    def mark(self, stage):
+        if stage not in self.cut:
+            self.cut.append(stage)
+
+    def share(self, fraction):
+        # a sub-budget of `fraction` of the time left (e.g. for the GA, so the final pack
+        # still has time); cut stages are recorded on the parent
+        if self.end is None:
+            return self
+        return Deadline(end=time.perf_counter() + max(0.0, self.remaining()) * fraction, cut=self.cut)
+
+def stop(deadline, stage):
+    # stop(None, ...) is False: callers without a budget pass deadline=None
+    return deadline is not None and deadline.stop(stage)
+
+def shutdown(executor, deadline=None):
+    # Shut down a run's executor. Within the budget this waits for it as usual; past the
+    # deadline queued tasks are dropped and running ones are not waited for (a cut stage has
+    # stopped collecting them): process workers are terminated, threads finish on their own.
+    if deadline is None or not deadline.expired():
+        executor.shutdown()
+        return
+    procs = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for p in procs:
+        p.terminate()
@@ -0,0 +1,219 @@
+import os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List
+import pandas as pd
+from .config import TruckSpec, FLEET_FILL, FLEET_WORKERS, PACK_ENGINE
+from .models import Item
+from .packer_cpu import pack
+from .session import PackSession
+from .instrument import metrics
+
+EPS = 1e-9
+
+def load_fleet_csv(path):
+    # catalog CSV: name, L_m, W_m, H_m, payload_kg, count, cost (cost defaults to 1 per trip)
+    df = pd.read_csv(path)
+    return [(TruckSpec(name=str(r["name"]), L=float(r["L_m"]), W=float(r["W_m"]), H=float(r["H_m"]),
+                       payload_kg=float(r["payload_kg"])), int(r["count"]), float(r.get("cost", 1.0)))
+            for _, r in df.iterrows()]
+
+def fits_truck(it: Item, truck):
+    if it.H > truck.H + EPS:
+        return False
+    dims = [(it.L, it.W), (it.W, it.L)] if it.can_rotate else [(it.L, it.W)]
+    return any(L <= truck.L + EPS and W <= truck.W + EPS for L, W in dims)
+
+def _fill_one(items, truck, fill):
+    # first-fit decreasing (items come sorted by volume) up to the expected fill and payload
+    cap_vol, cap_wt = truck.L * truck.W * truck.H * fill, truck.payload_kg
+    take, vol, wt = [], 0.0, 0.0
+    for i, it in enumerate(items):
+        if vol + it.vol <= cap_vol and wt + it.weight <= cap_wt + EPS and fits_truck(it, truck):
+            take.append(i); vol += it.vol; wt += it.weight
+    return take, vol
+
+def assign(items: List[Item], catalog, available, fill=FLEET_FILL, objective="cost"):
+    # Greedy vehicle choice on volume/payload bounds. Each step opens the vehicle type with
+    # the lowest cost per planned m^3 (objective="count": every vehicle costs 1), except
+    # that when some type can take everything left the cheapest such type closes the plan.
+    # `available` (remaining count per type) is decremented. Returns ([(type, items)], rest).
+    remaining = sorted(items, key=lambda it: -it.vol)
+    trucks = []
+    while remaining:
+        best = None
+        for t, (spec, _, cost) in enumerate(catalog):
+            if available[t] <= 0:
+                continue
+            take, vol = _fill_one(remaining, spec, fill)
+            if not take:
+                continue
+            c = 1.0 if objective == "count" else cost
+            rank = (0, c, -vol) if len(take) == len(remaining) else (1, c / vol, -vol)
+            if best is None or rank < best[0]:
+                best = (rank, t, take)
+        if best is None:
+            break
+        _, t, take = best
+        available[t] -= 1
+        chosen = set(take)
+        trucks.append((t, [remaining[i] for i in take]))
+        remaining = [it for i, it in enumerate(remaining) if i not in chosen]
+    return trucks, remaining
+
+def _solve_truck(job):
+    # one truck's pack, run in a worker process; the log lines of parallel trucks would interleave
+    truck, flags, items, engine = job
+    metrics.verbose = False
+    return pack(truck, flags, items, engine=engine)
+
+def plan_fleet(items: List[Item], catalog, flags, engine=PACK_ENGINE, workers=FLEET_WORKERS,
+               fill=FLEET_FILL, objective="cost", max_rounds=8):
+    # Assign a manifest to vehicles from `catalog` [(TruckSpec, count, cost)] and pack every
+    # truck, each in its own worker process. Boxes a truck's packer leaves out are offered to
+    # the trucks already loaded (incrementally, PackSession) and then to new vehicles, for up
+    # to `max_rounds` rounds. Returns (trucks, unplaced): trucks as dicts with the vehicle
+    # type index, spec, cost, items and placements.
+    workers = workers or os.cpu_count() or 1
+    available = [count for _, count, _ in catalog]
+    trucks, pending = [], list(items)
+    for _ in range(max_rounds):
+        batch, rest = assign(pending, catalog, available, fill, objective)
+        if not batch:
+            break
+        jobs = [(catalog[t][0], flags, its, engine) for t, its in batch]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                results = list(pool.map(_solve_truck, jobs))
+        else:
+            results = [_solve_truck(job) for job in jobs]
+        metrics.count("fleet_truck_solves", len(jobs))
+        left = list(rest)
+        for (t, its), (placed, weight) in zip(batch, results):
+            if not placed:
+                available[t] += 1       # nothing loaded: the vehicle stays in the yard
+                left += its
+                continue
+            ids = {p.id for p in placed}
+            trucks.append({"type": t, "spec": catalog[t][0], "cost": catalog[t][2],
+                           "items": [it for it in its if it.id in ids], "placed": placed, "weight": weight})
+            left += [it for it in its if it.id not in ids]
+        # top up loaded trucks before opening new ones
+        for tr in trucks:
+            if not left:
+                break
+            session = PackSession.from_placements(tr["spec"], flags, tr["items"], tr["placed"])
+            offer = left
+            added, left = session.add_many(offer)
+            if added:
+                ids = {p.id for p in added}
+                tr["items"] += [it for it in offer if it.id in ids]
+                tr["placed"] = session.placements()
+                tr["weight"] = session.total_weight
+                metrics.count("fleet_topped_up", len(added))
+        if len(left) == len(pending):
+            pending = left
+            break
+        pending = left
+        if not pending:
+            break
+    return trucks, pending
+
+def vehicle_bound(items: List[Item], spec, flags):
+    # Cheap upper bounds on what one `spec` can load: the volume and weight of the items that
+    # fit its box, capped by its volume and payload and, with max_payload, the volume by a
+    # fractional knapsack on volume per kg. Returns (items that fit, volume, weight).
+    fit = [it for it in items if fits_truck(it, spec)]
+    vol = min(sum(it.vol for it in fit), spec.L * spec.W * spec.H)
+    weight = min(sum(it.weight for it in fit), spec.payload_kg)
+    if flags.max_payload:
+        kvol, room = 0.0, spec.payload_kg + EPS
+        for it in sorted(fit, key=lambda it: -it.vol / max(it.weight, EPS)):
+            if it.weight <= room:
+                kvol += it.vol; room -= it.weight
+            else:
+                kvol += it.vol * room / it.weight
+                break
+        vol = min(vol, kvol)
+    return fit, vol, weight
+
+def _rank_key(objective, vol, spec, cost, total_vol):
+    # smaller is better; monotone in vol, so the key of a bound is a bound on the key.
+    # "cover": most of the manifest loaded, then cheapest, then fullest; "cost": lowest cost
+    # per m^3 loaded; "fill": fullest vehicle, then cheapest
+    fill = vol / (spec.L * spec.W * spec.H)
+    if objective == "cost":
+        return (cost / max(vol, EPS), -fill)
+    if objective == "fill":
+        return (-round(fill, 6), cost)
+    return (-round(vol / max(total_vol, EPS), 6), cost, -fill)
+
+def _pack_vehicle(job):
+    # one candidate vehicle's pack, in a worker process (quiet) or in-process
+    spec, flags, items, engine, quiet = job
+    if quiet:
+        metrics.verbose = False
+    t0 = time.perf_counter()
+    placed, weight = pack(spec, flags, items, engine=engine)
+    return placed, weight, time.perf_counter() - t0
+
+def rank_vehicles(items: List[Item], catalog, flags, engine=PACK_ENGINE, workers=FLEET_WORKERS, objective="cover"):
+    # Pack the whole manifest into one vehicle of every type in `catalog` [(TruckSpec, count,
+    # cost)] and rank the types by `objective` (see _rank_key). Types are tried in order of
+    # their optimistic key (vehicle_bound) with up to `workers` packs running at once; a type
+    # whose bound cannot beat the best pack so far is pruned without packing, as is one that
+    # fits no item. Returns (rows best first, placements and weight per packed type index).
+    workers = workers or os.cpu_count() or 1
+    total_vol = sum(it.vol for it in items)
+    bounds, rows = {}, {}
+    for t, (spec, _, cost) in enumerate(catalog):
+        fit, vol, weight = vehicle_bound(items, spec, flags)
+        bounds[t] = (fit, vol, _rank_key(objective, vol, spec, cost, total_vol))
+        rows[t] = {"vehicle": spec.name, "cost": cost,
+                   "bound_volume_utilization_pct": round(100.0 * vol / (spec.L * spec.W * spec.H), 1),
+                   "bound_weight_utilization_pct": round(100.0 * weight / spec.payload_kg, 1)}
+    queue = deque(sorted(bounds, key=lambda t: bounds[t][2]))
+    packed, keys, running = {}, {}, {}
+    best = None
+
+    def finish(t, result):
+        nonlocal best
+        placed, weight, seconds = result
+        spec, _, cost = catalog[t]
+        vol = sum(p.L * p.W * p.H for p in placed)
+        packed[t] = (placed, weight)
+        keys[t] = _rank_key(objective, vol, spec, cost, total_vol)
+        best = keys[t] if best is None else min(best, keys[t])
+        rows[t].update(status="packed", placed_items=len(placed), seconds=round(seconds, 3),
+                       volume_utilization_pct=round(100.0 * vol / (spec.L * spec.W * spec.H), 1),
+                       weight_utilization_pct=round(100.0 * weight / spec.payload_kg, 1),
+                       manifest_volume_pct=round(100.0 * vol / max(total_vol, EPS), 1),
+                       cost_per_m3=round(cost / vol, 4) if vol > EPS else None)
+        metrics.log(f"[TRUCK] {spec.name}: {len(placed)} items, vol {rows[t]['volume_utilization_pct']}%, "
+                    f"wt {rows[t]['weight_utilization_pct']}%, {seconds:.2f}s")
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(queue))) if workers > 1 and len(queue) > 1 else None
+    try:
+        while queue or running:
+            while queue and len(running) < (workers if pool else 1):
+                t = queue.popleft()
+                fit, _, bound = bounds[t]
+                if not fit or (best is not None and bound > best):
+                    rows[t]["status"] = "pruned" if fit else "no_fit"
+                    metrics.count("truck_pruned")
+                    continue
+                job = (catalog[t][0], flags, fit, engine, pool is not None)
+                if pool is None:
+                    finish(t, _pack_vehicle(job))
+                else:
+                    running[pool.submit(_pack_vehicle, job)] = t
+                metrics.count("truck_packs")
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for f in done:
+                    finish(running.pop(f), f.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    order = sorted(keys, key=lambda t: (keys[t], t)) + [t for t in rows if t not in keys]
+    return [dict(rows[t], type=t, rank=k + 1 if t in keys else None) for k, t in enumerate(order)], packed
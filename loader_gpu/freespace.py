@@ -0,0 +1,291 @@
+import bisect
+import numpy as np
+
+EPS = 1e-9
+
+# columns of the backing array: rect origin and size, plus cached fit limits and area
+X, Y, RL, RW, LIM_L, LIM_W, AREA = range(7)
+# below this many rows a scalar scan beats the fixed cost of the array ops
+SMALL = 32
+
+def _row(rect):
+    x, y, l, w = rect
+    return (x, y, l, w, l + EPS, w + EPS, l * w)
+
+class FreeRects:
+    # Maximal-rectangles free space of one layer, stored as an (n, 7) float64 array of
+    # x, y, L, W rows (see the column constants). Row order is significant: best-fit ties
+    # go to the earliest row, exactly like the dict-list scans this replaces.
+    def __init__(self, L, W, capacity=64):
+        self.r = np.empty((max(4, capacity), 7), dtype=np.float64)
+        self.r[0] = _row((0.0, 0.0, L, W))
+        self.n = 1
+        self.version = 0    # bumped whenever the rows (or their order) change
+        self._fits = None
+        self._bounds()
+
+    @classmethod
+    def from_rows(cls, rows):
+        fr = cls(0.0, 0.0, capacity=len(rows) + 4)
+        fr.n = len(rows)
+        for i, rect in enumerate(rows):
+            fr.r[i] = _row(tuple(rect[:4]))
+        fr._bounds()
+        return fr
+
+    def copy(self):
+        fr = FreeRects.__new__(FreeRects)
+        fr.r = self.r.copy()
+        fr.n, fr.max_l, fr.max_w, fr.version = self.n, self.max_l, self.max_w, self.version
+        fr._fits = None
+        return fr
+
+    def __len__(self):
+        return self.n
+
+    def rows(self):
+        return self.r[:self.n, :4]
+
+    def _bounds(self):
+        # cheap necessary condition for best_fit: nothing fits beyond the widest/longest row
+        if 0 < self.n <= SMALL:
+            dims = self.r[:self.n, RL:LIM_L].tolist()
+            self.max_l = max(d[0] for d in dims); self.max_w = max(d[1] for d in dims)
+        elif self.n:
+            m = self.r[:self.n, RL:LIM_L].max(axis=0)
+            self.max_l, self.max_w = float(m[0]), float(m[1])
+        else:
+            self.max_l = self.max_w = -1.0
+
+    def _reserve(self, k):
+        if self.n + k > self.r.shape[0]:
+            grown = np.empty((2 * (self.n + k), 7), dtype=np.float64)
+            grown[:self.n] = self.r[:self.n]
+            self.r = grown
+
+    def best_fit(self, L, W):
+        # index of the row that fits (L, W) with the least leftover area, or -1
+        if L > self.max_l + EPS or W > self.max_w + EPS:
+            return -1
+        if self.n <= SMALL:
+            best, best_left = -1, None
+            for i, (lim_l, lim_w, area) in enumerate(self.r[:self.n, LIM_L:].tolist()):
+                if L <= lim_l and W <= lim_w:
+                    left = area - L * W
+                    if best_left is None or left < best_left:
+                        best, best_left = i, left
+            return best
+        r = self.r[:self.n]
+        left = np.where((L <= r[:, LIM_L]) & (W <= r[:, LIM_W]), r[:, AREA] - L * W, np.inf)
+        i = int(np.argmin(left))
+        return i if left[i] != np.inf else -1
+
+    def fitting(self, L, W):
+        # indices of all rows that fit (L, W), best fit first (ties by row order)
+        if L > self.max_l + EPS or W > self.max_w + EPS:
+            return []
+        r = self.r[:self.n]
+        ok = np.flatnonzero((L <= r[:, LIM_L]) & (W <= r[:, LIM_W]))
+        return ok[np.argsort(r[ok, AREA], kind="stable")].tolist()
+
+    def first_fitting(self, dims, start=0, chunk=64):
+        # First row index >= start of `dims` (k, m, 2: per-item orientation L/W pairs) that
+        # may fit the free space, or -1. Free space only shrinks while a layer is filled, so
+        # items skipped here would also have failed best_fit, and a fit mask computed earlier
+        # stays a valid superset: the last chunk's mask is reused until the scan leaves it.
+        k = dims.shape[0]
+        if not self.n:
+            return -1
+        cached = self._fits
+        if cached is not None and cached[0] is dims and cached[1] <= start < cached[2]:
+            hits = cached[3]
+            i = bisect.bisect_left(hits, start)
+            if i < len(hits):
+                return hits[i]
+            start = cached[2]
+        r = self.r[:self.n]
+        rl, rw = r[:, LIM_L], r[:, LIM_W]
+        while start < k:
+            end = min(k, start + chunk)
+            d = dims[start:end]
+            fit = ((d[:, :, 0, None] <= rl) & (d[:, :, 1, None] <= rw)).any(axis=(1, 2))
+            hits = (np.flatnonzero(fit) + start).tolist()
+            self._fits = (dims, start, end, hits)
+            if hits:
+                return hits[0]
+            start = end
+        return -1
+
+    def rect(self, i):
+        return tuple(self.r[i, :4].tolist())
+
+    def requeue(self, i):
+        # move row i to the end, as the old pop-then-append did when a placement was rejected
+        if i != self.n - 1:
+            self.version += 1
+            row = self.r[i].copy()
+            self.r[i:self.n - 1] = self.r[i + 1:self.n]
+            self.r[self.n - 1] = row
+
+    def push(self, rect):
+        self.version += 1
+        self._reserve(1)
+        self.r[self.n] = _row(rect)
+        self.n += 1
+
+    def place(self, i, L, W):
+        # Place L x W at the origin of row i. Every row overlapping the box (not just row i)
+        # is replaced by its maximal left/right/bottom/top remainders, so later placements
+        # can never intersect this box; rows contained in another row are then dropped.
+        # For row i this yields the old guillotine pieces: right strip, then top strip.
+        x0, y0 = self.rect(i)[:2]
+        self._cut(x0, y0, x0 + L, y0 + W, i)
+
+    def occupy(self, x, y, L, W):
+        # mark an L x W box at (x, y) as used, e.g. when rebuilding a layer from placements
+        self._cut(x, y, x + L, y + W, None)
+
+    def _cut(self, x0, y0, x1, y1, i):
+        # split the rows overlapping the box (row i first, if given) and prune
+        n = self.n
+        if n <= SMALL:
+            rows = self.r[:n, :4].tolist()
+            hits = [k for k, (x, y, l, w) in enumerate(rows)
+                    if x < x1 - EPS and x + l > x0 + EPS and y < y1 - EPS and y + w > y0 + EPS]
+        else:
+            r = self.r[:n]
+            hit = ((r[:, X] < x1 - EPS) & (r[:, X] + r[:, RL] > x0 + EPS) &
+                   (r[:, Y] < y1 - EPS) & (r[:, Y] + r[:, RW] > y0 + EPS))
+            hits = np.flatnonzero(hit).tolist()
+            rows = self.r[hits, :4].tolist()
+            rows = dict(zip(hits, rows))
+        if i is not None and i not in hits:
+            hits.append(i)
+        if not hits:
+            return
+        pieces = []
+        for k in ([i] if i is not None else []) + [k for k in hits if k != i]:
+            fx, fy, fl, fw = rows[k]
+            fx1, fy1 = fx + fl, fy + fw
+            for piece in ((fx, fy, x0 - fx, fw),             # left
+                          (x1, fy, fx1 - x1, fw),            # right
+                          (fx, fy, fl, y0 - fy),             # bottom
+                          (fx, y1, fl, fy1 - y1)):           # top
+                if piece[2] > EPS and piece[3] > EPS:
+                    pieces.append(piece)
+        keep = np.ones(n, dtype=bool)
+        keep[hits] = False
+        rest = self.r[:n][keep]
+        self.n = rest.shape[0]
+        self.r[:self.n] = rest
+        self.version += 1
+        m = self.n
+        for piece in pieces:
+            self.push(piece)
+        self._prune(m)
+        self._bounds()
+
+    def _prune(self, m):
+        # Rows before `m` are pairwise non-contained (they survived earlier prunes), so only
+        # containment involving the new rows [m, n) has to be checked. Of two equal rows
+        # the earlier one is kept.
+        n = self.n
+        if n == m:
+            return
+        r = self.r[:n]
+        if n <= SMALL:
+            rows = [(x, y, x + l, y + w) for x, y, l, w in r[:, :4].tolist()]
+            drop = [False] * n
+            for b in range(m, n):
+                bx0, by0, bx1, by1 = rows[b]
+                for a, (ax0, ay0, ax1, ay1) in enumerate(rows):
+                    if a == b:
+                        continue
+                    a_in_b = ax1 <= bx1 + EPS and ay1 <= by1 + EPS and ax0 >= bx0 - EPS and ay0 >= by0 - EPS
+                    b_in_a = bx1 <= ax1 + EPS and by1 <= ay1 + EPS and bx0 >= ax0 - EPS and by0 >= ay0 - EPS
+                    if a_in_b and not (b_in_a and a < b):
+                        drop[a] = True
+                    if b_in_a and not (a_in_b and b < a):
+                        drop[b] = True
+            if any(drop):
+                keep = r[[not d for d in drop]]
+                self.n = keep.shape[0]
+                self.r[:self.n] = keep
+            return
+        x0, y0 = r[:, 0], r[:, 1]
+        x1, y1 = x0 + r[:, 2], y0 + r[:, 3]
+        idx = np.arange(n)
+        drop = np.zeros(n, dtype=bool)
+        for b in range(m, n):
+            bx0, by0, bx1, by1 = x0[b], y0[b], x1[b], y1[b]
+            # rows lying inside new row b, and new row b lying inside other rows
+            inside = (x1 <= bx1 + EPS) & (y1 <= by1 + EPS) & (x0 >= bx0 - EPS) & (y0 >= by0 - EPS)
+            outer = (bx1 <= x1 + EPS) & (by1 <= y1 + EPS) & (bx0 >= x0 - EPS) & (by0 >= y0 - EPS)
+            inside[b] = outer[b] = False
+            equal = inside & outer
+            drop |= inside & ~(equal & (idx < b))
+            if (outer & ~(equal & (idx > b))).any():
+                drop[b] = True
+        if drop.any():
+            keep = r[~drop]
+            self.n = keep.shape[0]
+            self.r[:self.n] = keep
+
+    def merged(self):
+        # Merge edge-sharing rows with equal extent, repeated to a fixed point. Each pass
+        # sweeps the rows in order, growing the current row by the next matching row found
+        # with a vectorised search, so the result equals the original greedy merge.
+        r = self.r[:self.n, :4].copy()
+        changed = True
+        while changed and len(r) > 1:
+            changed = False
+            n = len(r)
+            x, y, l, w = r[:, 0], r[:, 1], r[:, 2], r[:, 3]
+            # pairwise adjacency of the unmerged rows; a row with no later match is kept as-is
+            same_h = (np.abs(y[:, None] - y[None, :]) < EPS) & (np.abs(w[:, None] - w[None, :]) < EPS)
+            adj_h = (np.abs(x[:, None] + l[:, None] - x[None, :]) < EPS) | (np.abs(x[None, :] + l[None, :] - x[:, None]) < EPS)
+            same_v = (np.abs(x[:, None] - x[None, :]) < EPS) & (np.abs(l[:, None] - l[None, :]) < EPS)
+            adj_v = (np.abs(y[:, None] + w[:, None] - y[None, :]) < EPS) | (np.abs(y[None, :] + w[None, :] - y[:, None]) < EPS)
+            has_later = np.triu((same_h & adj_h) | (same_v & adj_v), 1).any(axis=1).tolist()
+            used = np.zeros(n, dtype=bool)
+            out = []
+            for i in range(n):
+                if used[i]:
+                    continue
+                used[i] = True
+                mx, my, ml, mw = r[i].tolist()
+                if has_later[i]:
+                    pos = i + 1
+                    while pos < n:
+                        tx, ty, tl, tw = x[pos:], y[pos:], l[pos:], w[pos:]
+                        hor = (np.abs(my - ty) < EPS) & (np.abs(mw - tw) < EPS)
+                        right = hor & (np.abs(mx + ml - tx) < EPS)
+                        left = hor & ~right & (np.abs(tx + tl - mx) < EPS)
+                        ver = (np.abs(mx - tx) < EPS) & (np.abs(ml - tl) < EPS)
+                        up = ver & (np.abs(my + mw - ty) < EPS)
+                        down = ver & ~up & (np.abs(ty + tw - my) < EPS)
+                        hit = (right | left | up | down) & ~used[pos:]
+                        if not hit.any():
+                            break
+                        j = int(np.argmax(hit))
+                        bx, by, bl, bw = r[pos + j].tolist()
+                        if right[j]:
+                            ml += bl
+                        elif left[j]:
+                            ml += bl; mx = bx
+                        elif up[j]:
+                            mw += bw
+                        else:
+                            mw += bw; my = by
+                        used[pos + j] = True
+                        changed = True
+                        pos += j + 1
+                out.append((mx, my, ml, mw))
+            r = np.array(out, dtype=np.float64).reshape(-1, 4)
+        return r
+
+    def largest_merged_area(self):
+        m = self.merged()
+        if not len(m):
+            return 0.0
+        return float((m[:, 2] * m[:, 3]).max())
@@ -0,0 +1,24 @@
+import os
+from importlib.util import find_spec
+from .config import GA_BACKEND
+
+def _cuda_present():
+    # cheap probe for an NVIDIA driver, so CPU-only hosts never pay for `import torch`
+    return os.path.exists("/proc/driver/nvidia/version") or os.path.exists("/dev/nvidia0")
+
+def ga_backend(requested=GA_BACKEND):
+    # "numpy" or "torch"; "auto" uses torch only when it is installed and sees a CUDA device
+    if requested in ("numpy", "torch"):
+        return requested
+    if find_spec("torch") is None or not _cuda_present():
+        return "numpy"
+    import torch
+    return "torch" if torch.cuda.is_available() else "numpy"
+
+def ga_reorder(items, truck, *args, backend=GA_BACKEND, **kwargs):
+    # ga_gpu / ga_numpy ga_reorder, imported on first use
+    if ga_backend(backend) == "torch":
+        from .ga_gpu import ga_reorder as impl
+    else:
+        from .ga_numpy import ga_reorder as impl
+    return impl(items, truck, *args, **kwargs)
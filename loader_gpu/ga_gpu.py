@@ -1,9 +1,10 @@
-import torch, random
+import torch
 from typing import List
-from .models import Item
+from .models import Item, ItemTable
 from .config import ALPHA_VOL, BETA_WT
-from .packer_cpu import pack
-from .config import Flags
+from .ga_numpy import pick_by_packing
+from .deadline import stop
+from .config import PACK_ENGINE
 
 # def device_auto():
 #     return torch.device("cpu")
@@ -11,13 +12,40 @@ from .config import Flags
 def device_auto():
     return torch.device("cuda") if torch.cuda.is_available() else torch.device("cpu")
 
-def items_to_tensors(items: List[Item], device):
-    vol = torch.tensor([it.vol for it in items], dtype=torch.float32, device=device)
-    wt  = torch.tensor([it.weight for it in items], dtype=torch.float32, device=device)
-    drop= torch.tensor([it.drop_order for it in items], dtype=torch.float32, device=device)
+def items_to_tensors(items, device):
+    # columns are shared with the ItemTable (torch.from_numpy); only the float32 cast copies
+    tab = items if isinstance(items, ItemTable) else ItemTable.from_items(items)
+    vol = torch.from_numpy(tab.vol).to(device=device, dtype=torch.float32)
+    wt  = torch.from_numpy(tab.weight).to(device=device, dtype=torch.float32)
+    drop= torch.from_numpy(tab.drop_order).to(device=device, dtype=torch.float32)
     score = ALPHA_VOL*vol + BETA_WT*(wt/1000.0) + 0.01*drop
     return vol, wt, drop, score
 
+def order_crossover(p1, p2, a, b):
+    # Batched order crossover (OX) over (C, N) parent permutations: child r keeps
+    # p1[r, a[r]:b[r]] in place and fills the other positions, starting at b[r] and
+    # wrapping around, with the remaining genes in the order they appear in p2[r].
+    C, N = p1.shape
+    pos = torch.arange(N, device=p1.device)
+    in_seg = (pos >= a[:, None]) & (pos < b[:, None])
+    used = torch.zeros_like(in_seg).scatter_(1, p1, in_seg)       # gene -> in p1's segment
+    keep = ~used.gather(1, p2)
+    # p2's remaining genes first, in p2 order (stable sort on the "already used" flag)
+    fill = p2.gather(1, torch.argsort((~keep).to(torch.int8), dim=1, stable=True))
+    k = pos.expand(C, N)
+    tgt = (b[:, None] + k) % N
+    # the last b-a targets wrap onto the segment itself and take p1's genes there
+    src = torch.where(k < (N - (b - a))[:, None], fill, p1.gather(1, tgt))
+    return torch.empty_like(p1).scatter_(1, tgt, src)
+
+def swap_genes(pop, i, j):
+    # in place: swap genes i[r] and j[r] of every row r (i == j leaves a row unchanged)
+    rows = torch.arange(pop.shape[0], device=pop.device)
+    vi, vj = pop[rows, i].clone(), pop[rows, j].clone()
+    pop[rows, i] = vj
+    pop[rows, j] = vi
+    return pop
+
 @torch.no_grad()
 def evaluate_population(order_idx_pop: torch.Tensor, vol, wt, cap_vol, cap_wt):
     P, N = order_idx_pop.shape
@@ -31,102 +59,66 @@ def evaluate_population(order_idx_pop: torch.Tensor, vol, wt, cap_vol, cap_wt):
     score = 0.9*util_vol + 0.1*util_wt
     return score, util_vol, util_wt
 
-def ga_reorder(items: List[Item], truck, population=64, generations=20, seed=1234):
+def ga_reorder(items: List[Item], truck, population=64, generations=20, seed=1234, executor=None,
+               respect_order=False, engine=PACK_ENGINE, deadline=None):
+    # respect_order=True scores candidates with the order-respecting packer; otherwise pack
+    # re-sorts its input and every candidate ordering yields the same layout.
+    # `deadline` ends the generations and the rescoring early, keeping the best order so far.
+    # `items` may be an ItemTable; the returned order is always a list of Item.
     dev = device_auto()
-    rnd = random.Random(seed)
     N = len(items)
+    tab = items if isinstance(items, ItemTable) else ItemTable.from_items(items)
+    items = tab.to_items() if items is tab else items
     if N < 4: return items
-    vol, wt, drop, base = items_to_tensors(items, dev)
+    vol, wt, drop, base = items_to_tensors(tab, dev)
     cap_vol = torch.tensor(truck.L*truck.W*truck.H, dtype=torch.float32, device=dev)
     cap_wt  = torch.tensor(truck.payload_kg, dtype=torch.float32, device=dev)
 
-    base_idx = torch.argsort(-base)
-    pop = [base_idx.clone()]
-    for _ in range(population-1):
-        idx = base_idx.clone()
-        for _ in range(max(1, N//20)):
-            i = rnd.randrange(N); j = rnd.randrange(N)
-            idx[i], idx[j] = idx[j], idx[i]
-        pop.append(idx)
-    pop = torch.stack(pop, dim=0)
+    base_idx = torch.argsort(-base, stable=True)
+    # all randomness from one seeded CPU generator, so runs repeat on any device
+    gen_t = torch.Generator().manual_seed(seed)
+    def rand_int(high, size):
+        return torch.randint(high, size, generator=gen_t).to(dev)
+
+    # individual 0 is the greedy order; the others get max(1, N//20) random swaps each
+    pop = base_idx.repeat(population, 1)
+    for _ in range(max(1, N//20)):
+        i, j = rand_int(N, (population,)), rand_int(N, (population,))
+        i[0] = j[0]
+        swap_genes(pop, i, j)
 
     best_idx = pop[0]; best_score = -1e9
     for _ in range(generations):
+        if stop(deadline, "ga_generations"):
+            break
         scores, _, _ = evaluate_population(pop, vol, wt, cap_vol, cap_wt)
-        topk = torch.topk(scores, k=max(2, population//5))
+        topk = torch.topk(scores, k=min(pop.shape[0], max(2, population//5)))
         elites = pop[topk.indices]
         if float(topk.values[0]) > best_score:
             best_score = float(topk.values[0]); best_idx = elites[0].clone()
-        new_pop = [elites[i % elites.shape[0]].clone() for i in range(elites.shape[0])]
-        while len(new_pop) < population:
-            p1 = elites[rnd.randrange(elites.shape[0])].clone()
-            p2 = elites[rnd.randrange(elites.shape[0])].clone()
-            # --- SAFE ORDER CROSSOVER (OX) ---
-            N = len(p1)
-            a, b = sorted([rnd.randrange(N), rnd.randrange(N)])
-            child = [-1] * N
-            seg = p1[a:b].tolist()
-            child[a:b] = seg
-            used = set(seg)
-            fill = [g for g in p2.tolist() if g not in used]
-            pos = b
-            for g in fill:
-                if pos >= N: pos = 0
-                child[pos] = g
-                pos += 1
-            child = torch.tensor(child, device=dev, dtype=torch.long)
-
-            if rnd.random() < 0.2:
-                i, j = rnd.randrange(N), rnd.randrange(N)
-                child[i], child[j] = child[j], child[i]
-            new_pop.append(child)
-        pop = torch.stack(new_pop, dim=0)
-    # After GA finishes, the proxy fitness may not perfectly correlate with real 3D packing.
-    # Evaluate the top candidate orderings using the real packer and select the one that gives
-    # the maximum actual packed volume. This is more expensive but produces much better results.
+        n_child = population - elites.shape[0]
+        if n_child <= 0:
+            pop = elites
+            continue
+        # parents drawn uniformly from the elites, a batched order crossover per child,
+        # then a swap mutation on 20% of the children
+        pick = rand_int(elites.shape[0], (n_child, 2))
+        cuts = torch.sort(rand_int(N, (n_child, 2)), dim=1).values
+        children = order_crossover(elites[pick[:, 0]], elites[pick[:, 1]], cuts[:, 0], cuts[:, 1])
+        mutate = (torch.rand(n_child, generator=gen_t) < 0.2).to(dev)
+        i, j = rand_int(N, (n_child,)), rand_int(N, (n_child,))
+        swap_genes(children, torch.where(mutate, i, j), j)
+        pop = torch.cat([elites, children], dim=0)
+    # After GA finishes, the proxy fitness may not perfectly correlate with real 3D packing:
+    # evaluate the top candidate orderings with the real packer (see ga_numpy.pick_by_packing).
     try:
         # compute final proxy scores and get top candidates
         final_scores, _, _ = evaluate_population(pop, vol, wt, cap_vol, cap_wt)
         k = min(8, pop.shape[0])
         topk = torch.topk(final_scores, k=k)
         candidates = pop[topk.indices].cpu().tolist()
-        best_order = [items[int(i)] for i in best_idx.tolist()]
-        # baseline packed volume for best_idx
-        baseline_placed, _ = pack(truck, Flags(), best_order)
-        best_vol = sum(p.L * p.W * p.H for p in baseline_placed)
-        # evaluate each candidate with the real packer
-        for cand_idx in candidates:
-            order_items = [items[int(i)] for i in cand_idx]
-            placed, _ = pack(truck, Flags(), order_items)
-            vol_used = sum(p.L * p.W * p.H for p in placed)
-            if vol_used > best_vol:
-                best_vol = vol_used
-                best_order = order_items
-        return best_order
+        return pick_by_packing(items, truck, best_idx.tolist(), candidates,
+                               executor=executor, respect_order=respect_order, engine=engine, deadline=deadline)
     except Exception:
         # fallback to fastest proxy result on any error
         return [items[int(i)] for i in best_idx.tolist()]
-
-    # optional cheap local search (pairwise swaps) to improve real packed volume
-    def _volume_for_order(order_items):
-        placed, _ = pack(truck, Flags(), order_items)
-        return sum(p.L * p.W * p.H for p in placed)
-
-    try:
-        # convert best_idx to list of items
-        cur_order = [items[int(i)] for i in best_idx.tolist()]
-        cur_vol = _volume_for_order(cur_order)
-        # small number of random pairwise swaps
-        for _ in range(min(300, max(50, len(items)*2))):
-            i = random.randrange(len(items)); j = random.randrange(len(items))
-            if i == j: continue
-            cur_order[i], cur_order[j] = cur_order[j], cur_order[i]
-            new_vol = _volume_for_order(cur_order)
-            if new_vol >= cur_vol:
-                cur_vol = new_vol
-            else:
-                # revert
-                cur_order[i], cur_order[j] = cur_order[j], cur_order[i]
-        return cur_order
-    except Exception:
-        return [items[int(i)] for i in best_idx.tolist()]
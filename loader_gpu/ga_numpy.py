@@ -0,0 +1,240 @@
+import dataclasses, time
+from collections import OrderedDict
+from typing import List
+import numpy as np
+from .models import Item, ItemTable
+from .config import ALPHA_VOL, BETA_WT, Flags, PACK_ENGINE, GA_FITNESS_CACHE, GA_SURROGATE_WARMUP, GA_SURROGATE_Z
+from .config import GA_SURROGATE_MIN_TAU
+from .packer_cpu import pack, pack_order
+from .deadline import Deadline, stop
+from .instrument import metrics
+
+# Pure-NumPy twin of ga_gpu: same proxy fitness, operators and final packing check,
+# without importing torch. Used when torch is missing or there is no CUDA device.
+
+def items_to_arrays(items):
+    tab = items if isinstance(items, ItemTable) else ItemTable.from_items(items)
+    vol = tab.vol.astype(np.float32)
+    wt = tab.weight.astype(np.float32)
+    drop = tab.drop_order.astype(np.float32)
+    score = ALPHA_VOL*vol + BETA_WT*(wt/1000.0) + 0.01*drop
+    return vol, wt, drop, score
+
+def evaluate_population(order_idx_pop, vol, wt, cap_vol, cap_wt):
+    vol_ord = vol[order_idx_pop]  # (P,N)
+    wt_ord  = wt[order_idx_pop]   # (P,N)
+    cvol = np.cumsum(vol_ord, axis=1)
+    cwt  = np.cumsum(wt_ord, axis=1)
+    mask = (cvol <= cap_vol) & (cwt <= cap_wt)
+    util_vol = np.sum(vol_ord * mask, axis=1) / cap_vol
+    util_wt  = np.sum(wt_ord * mask, axis=1) / cap_wt
+    score = 0.9*util_vol + 0.1*util_wt
+    return score, util_vol, util_wt
+
+def order_crossover(p1, p2, a, b):
+    # batched order crossover (OX), see ga_gpu.order_crossover
+    C, N = p1.shape
+    rows = np.arange(C)[:, None]
+    pos = np.arange(N)
+    in_seg = (pos >= a[:, None]) & (pos < b[:, None])
+    used = np.zeros((C, N), dtype=bool)
+    used[rows, p1] = in_seg
+    keep = ~used[rows, p2]
+    fill = p2[rows, np.argsort(~keep, axis=1, kind="stable")]
+    k = np.broadcast_to(pos, (C, N))
+    tgt = (b[:, None] + k) % N
+    src = np.where(k < (N - (b - a))[:, None], fill, p1[rows, tgt])
+    child = np.empty_like(p1)
+    child[rows, tgt] = src
+    return child
+
+def swap_genes(pop, i, j):
+    rows = np.arange(pop.shape[0])
+    vi, vj = pop[rows, i].copy(), pop[rows, j].copy()
+    pop[rows, i] = vj
+    pop[rows, j] = vi
+    return pop
+
+# order signature -> packed volume, least recently used first
+_FITNESS = OrderedDict()
+
+def _fitness_key(order_items, truck, respect_order=False, engine=PACK_ENGINE):
+    # the sequence pack() actually works through: without respect_order every permutation
+    # of the same items shares one entry
+    return (dataclasses.astuple(truck), engine,
+            tuple((it.id, it.L, it.W, it.H, it.weight, it.fragile, it.stack_limit, it.can_rotate, it.drop_order)
+                  for it in pack_order(order_items, respect_order, engine)))
+
+def _memoised(key):
+    # packed volume of an earlier real pack, or None
+    if key not in _FITNESS:
+        return None
+    _FITNESS.move_to_end(key)
+    metrics.count("ga_fitness_hits")
+    return _FITNESS[key]
+
+def _real_pack(key, order_items, truck, executor=None, respect_order=False, engine=PACK_ENGINE, deadline=None):
+    # packed volume of one ordering, memoised; None when the deadline cut the pack short
+    # (a partial layout says nothing about the ordering, so it is neither kept nor stored)
+    budget = None if deadline is None else Deadline(end=deadline.end)
+    t0 = time.perf_counter()
+    placed, _ = pack(truck, Flags(), order_items, executor=executor, respect_order=respect_order, engine=engine,
+                     deadline=budget)
+    metrics.record("ga_real_pack", time.perf_counter() - t0)
+    metrics.count("ga_real_packs")
+    if budget is not None and budget.cut:
+        metrics.count("ga_real_packs_cut")
+        return None
+    _FITNESS[key] = vol = sum(p.L * p.W * p.H for p in placed)
+    while len(_FITNESS) > GA_FITNESS_CACHE:
+        _FITNESS.popitem(last=False)
+    return vol
+
+def packed_volume(order_items, truck, executor=None, respect_order=False, engine=PACK_ENGINE, deadline=None):
+    # real-pack fitness of an ordering, memoised (see _fitness_key); None if cut short
+    key = _fitness_key(order_items, truck, respect_order, engine)
+    vol = _memoised(key)
+    return vol if vol is not None else _real_pack(key, order_items, truck, executor, respect_order, engine,
+                                                  deadline)
+
+class _Surrogate:
+    # packed volume ~ a + b * proxy score, least squares over the real packs of one
+    # rescoring; sigma is the residual standard deviation
+    def __init__(self):
+        self.xs, self.ys = [], []
+        self.coef, self.sigma = None, 0.0
+
+    def add(self, x, y):
+        self.xs.append(x); self.ys.append(y)
+        if len(self.ys) < max(3, GA_SURROGATE_WARMUP):
+            return
+        A = np.column_stack([np.ones(len(self.xs)), self.xs])
+        self.coef = np.linalg.lstsq(A, np.asarray(self.ys), rcond=None)[0]
+        resid = np.asarray(self.ys) - A @ self.coef
+        self.sigma = float(np.sqrt(resid @ resid / (len(self.ys) - 2)))
+
+    def predict(self, x):
+        return float(self.coef[0] + self.coef[1] * x)
+
+    def trusted(self):
+        # fitted, and the proxy ranks the real packs so far well enough (Kendall's tau)
+        if self.coef is None:
+            return False
+        c = d = 0
+        for k in range(len(self.xs)):
+            for m in range(k + 1, len(self.xs)):
+                s = (self.xs[k] - self.xs[m]) * (self.ys[k] - self.ys[m])
+                c += s > 0; d += s < 0
+        return c + d > 0 and (c - d) / (c + d) >= GA_SURROGATE_MIN_TAU
+
+def _rank_agreement(pairs):
+    # concordant / discordant (prediction, real volume) pairs, accumulated across runs so
+    # the report can give Kendall's tau of the surrogate ranking
+    for k, (p1, r1) in enumerate(pairs):
+        for p2, r2 in pairs[k + 1:]:
+            s = (p1 - p2) * (r1 - r2)
+            if s > 0:
+                metrics.count("ga_surrogate_concordant")
+            elif s < 0:
+                metrics.count("ga_surrogate_discordant")
+    c = metrics.counters.get("ga_surrogate_concordant", 0)
+    d = metrics.counters.get("ga_surrogate_discordant", 0)
+    if c + d:
+        metrics.gauge("ga_surrogate_kendall_tau", (c - d) / (c + d))
+
+def pick_by_packing(items, truck, best_idx, candidates, executor=None, respect_order=False, engine=PACK_ENGINE,
+                    deadline=None):
+    # The proxy fitness may not correlate with real 3D packing: pack the proxy winner and
+    # the top candidate orderings (lists of indices) and keep the largest packed volume.
+    # Repeated orderings come from the fitness memo; once the surrogate is fitted and ranks
+    # the real packs so far consistently, candidates it rules out are not packed (memoised
+    # ones are always looked up, since that costs nothing). Every pack runs under the
+    # deadline; a pack it cuts short counts as not better, and past it no further pack is
+    # started (the proxy winner is the fallback).
+    best_order = [items[int(i)] for i in best_idx]
+    if stop(deadline, "ga_rescoring"):
+        return best_order
+    vol, wt, _, _ = items_to_arrays(items)
+    cap_vol, cap_wt = np.float32(truck.L * truck.W * truck.H), np.float32(truck.payload_kg)
+    proxy, _, _ = evaluate_population(np.asarray([best_idx] + list(candidates), dtype=np.intp), vol, wt, cap_vol, cap_wt)
+    surrogate, pairs = _Surrogate(), []
+    best_vol = packed_volume(best_order, truck, executor, respect_order, engine, deadline)
+    if best_vol is None:
+        deadline.mark("ga_rescoring")
+        return best_order
+    surrogate.add(float(proxy[0]), best_vol)
+    for x, cand_idx in zip(proxy[1:].tolist(), candidates):
+        if stop(deadline, "ga_rescoring"):
+            break
+        order_items = [items[int(i)] for i in cand_idx]
+        key = _fitness_key(order_items, truck, respect_order, engine)
+        vol_used = _memoised(key)
+        if vol_used is None:
+            pred = surrogate.predict(x) if surrogate.trusted() else None
+            if pred is not None and pred + GA_SURROGATE_Z * surrogate.sigma <= best_vol:
+                metrics.count("ga_surrogate_skips")
+                continue
+            vol_used = _real_pack(key, order_items, truck, executor, respect_order, engine, deadline)
+            if vol_used is None:
+                deadline.mark("ga_rescoring")
+                break
+            if pred is not None:
+                pairs.append((pred, vol_used))
+        surrogate.add(x, vol_used)
+        if vol_used > best_vol:
+            best_vol = vol_used
+            best_order = order_items
+    _rank_agreement(pairs)
+    seconds = metrics.stages.get("ga_real_pack", 0.0)
+    if seconds > 0:
+        metrics.gauge("ga_real_packs_per_s", metrics.counters.get("ga_real_packs", 0) / seconds)
+    return best_order
+
+def ga_reorder(items: List[Item], truck, population=64, generations=20, seed=1234, executor=None,
+               respect_order=False, engine=PACK_ENGINE, deadline=None):
+    # same contract as ga_gpu.ga_reorder
+    N = len(items)
+    tab = items if isinstance(items, ItemTable) else ItemTable.from_items(items)
+    items = tab.to_items() if items is tab else items
+    if N < 4: return items
+    vol, wt, drop, base = items_to_arrays(tab)
+    cap_vol = np.float32(truck.L*truck.W*truck.H)
+    cap_wt  = np.float32(truck.payload_kg)
+    rng = np.random.default_rng(seed)
+
+    base_idx = np.argsort(-base, kind="stable")
+    # individual 0 is the greedy order; the others get max(1, N//20) random swaps each
+    pop = np.tile(base_idx, (population, 1))
+    for _ in range(max(1, N//20)):
+        i, j = rng.integers(0, N, population), rng.integers(0, N, population)
+        i[0] = j[0]
+        swap_genes(pop, i, j)
+
+    best_idx = pop[0]; best_score = -1e9
+    for _ in range(generations):
+        if stop(deadline, "ga_generations"):
+            break
+        scores, _, _ = evaluate_population(pop, vol, wt, cap_vol, cap_wt)
+        top = np.argsort(-scores, kind="stable")[:min(pop.shape[0], max(2, population//5))]
+        elites = pop[top]
+        if float(scores[top[0]]) > best_score:
+            best_score = float(scores[top[0]]); best_idx = elites[0].copy()
+        n_child = population - elites.shape[0]
+        if n_child <= 0:
+            pop = elites
+            continue
+        pick = rng.integers(0, elites.shape[0], (n_child, 2))
+        cuts = np.sort(rng.integers(0, N, (n_child, 2)), axis=1)
+        children = order_crossover(elites[pick[:, 0]], elites[pick[:, 1]], cuts[:, 0], cuts[:, 1])
+        mutate = rng.random(n_child) < 0.2
+        i, j = rng.integers(0, N, n_child), rng.integers(0, N, n_child)
+        swap_genes(children, np.where(mutate, i, j), j)
+        pop = np.concatenate([elites, children], axis=0)
+    try:
+        final_scores, _, _ = evaluate_population(pop, vol, wt, cap_vol, cap_wt)
+        top = np.argsort(-final_scores, kind="stable")[:min(8, pop.shape[0])]
+        return pick_by_packing(items, truck, best_idx.tolist(), pop[top].tolist(),
+                               executor=executor, respect_order=respect_order, engine=engine, deadline=deadline)
+    except Exception:
+        # fallback to fastest proxy result on any error
+        return [items[int(i)] for i in best_idx.tolist()]
@@ -0,0 +1,138 @@
+from typing import List
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .models import Item, Placement, sku_key
+from .instrument import metrics
+from .deadline import stop
+from .config import (
+    GRID_STEP,
+    SUPPORT_RATIO_CARTON,
+    SUPPORT_RATIO_STANDARD,
+    SUPPORT_RATIO_HEAVY,
+    SUPPORT_MIN_FRACTION,
+)
+
+EPS = 1e-9
+# tops within this distance below a box's base count as supporting it (as in the layer packer)
+SUPPORT_TOL = 0.05
+
+def _cells(length, step):
+    # grid cells covered by `length`; rounding up keeps boxes from sharing a cell
+    return int(np.ceil(length / step - 1e-6))
+
+def _required_fraction(weight):
+    base_need_ratio = (SUPPORT_RATIO_CARTON if weight < 18 else SUPPORT_RATIO_STANDARD if weight < 70 else SUPPORT_RATIO_HEAVY)
+    return max(base_need_ratio, SUPPORT_MIN_FRACTION, 0.30)
+
+def _sliding(arr, w, op):
+    # op (np.maximum / np.minimum) over every window of w consecutive rows, by doubling:
+    # after the loop r[i] covers rows i..i+k-1, and two overlapping k-windows cover w
+    r, k = arr, 1
+    while 2 * k <= w:
+        r = op(r[:-k], r[k:])
+        k *= 2
+    m = arr.shape[0] - w + 1
+    return op(r[:m], r[w - k:w - k + m])
+
+class HeightMap:
+    # Truck floor as an (nx, ny) grid of stack heights at `step` resolution. A box covering
+    # a x b cells rests on the highest cell under it: sliding-window max/min over the map give
+    # the resting height of every candidate position at once, and windows whose min is within
+    # SUPPORT_TOL of the max are fully supported without counting cells.
+    def __init__(self, L, W, step=GRID_STEP):
+        self.step = step
+        self.nx = int(np.floor(L / step + 1e-6))
+        self.ny = int(np.floor(W / step + 1e-6))
+        self.h = np.zeros((self.nx, self.ny), dtype=np.float64)
+
+    def window_max_min(self, a, b):
+        # separable: reduce along x over a cells, then along y over b cells
+        mx, mn = _sliding(self.h, a, np.maximum), _sliding(self.h, a, np.minimum)
+        return _sliding(mx.T, b, np.maximum).T, _sliding(mn.T, b, np.minimum).T
+
+    def support(self, i, j, a, b, base):
+        # fraction of cells under each window (arrays i, j) that reach its resting height
+        win = sliding_window_view(self.h, (a, b))[i, j]
+        return (win >= base[:, None, None] - SUPPORT_TOL).mean(axis=(1, 2))
+
+    def find(self, a, b, h, limit_h, need, chunk=64):
+        # Lowest, then front-most (x), then left-most (y) window where an a x b box of height
+        # h stays under limit_h and is supported: at least `need` of its cells, or the centre
+        # cell plus a fifth of `need` (the layer packer's centre fallback). (i, j, base) or None.
+        if a > self.nx or b > self.ny:
+            return None
+        mx, mn = self.window_max_min(a, b)
+        ci, cj = np.nonzero(mx + h <= limit_h + EPS)
+        if not len(ci):
+            return None
+        base = mx[ci, cj]
+        flat = (base - mn[ci, cj] <= SUPPORT_TOL) | (base <= EPS)
+        order = np.lexsort((cj, ci, base))
+        # only candidates ahead of the first flat window can beat it; check those in chunks
+        first_flat = np.flatnonzero(flat[order])
+        flat_end = first_flat[0] if len(first_flat) else len(order)
+        for s in range(0, flat_end, chunk):
+            o = order[s:min(s + chunk, flat_end)]
+            metrics.count("support_checks", len(o))
+            sup = self.support(ci[o], cj[o], a, b, base[o])
+            centre = self.h[ci[o] + a // 2, cj[o] + b // 2] >= base[o] - SUPPORT_TOL
+            good = (sup + EPS >= need) | (centre & (sup + EPS >= 0.20 * need))
+            if good.any():
+                k = o[int(np.argmax(good))]
+                return int(ci[k]), int(cj[k]), float(base[k])
+        if flat_end < len(order):
+            k = order[flat_end]
+            return int(ci[k]), int(cj[k]), float(base[k])
+        return None
+
+    def place(self, i, j, a, b, top):
+        self.h[i:i + a, j:j + b] = top
+
+def heightmap_order(items: List[Item], respect_order=False):
+    if respect_order:
+        return list(items)
+    # large footprints first build flat, well-supported bases
+    return sorted(items, key=lambda i: (-(i.L * i.W), -i.H, -i.weight))
+
+def pack_heightmap(truck, flags, items: List[Item], respect_order=False, step=GRID_STEP, deadline=None):
+    # Height-map engine: boxes go one at a time to the lowest supported position on a
+    # GRID_STEP grid (positions snap to the grid, footprints round up to whole cells).
+    # Cost per attempt is a few array passes over the map, independent of len(placed).
+    # When `deadline` expires the boxes placed so far are returned.
+    order = heightmap_order(items, respect_order)
+    hm = HeightMap(truck.L, truck.W, step)
+    placed: List[Placement] = []
+    total_weight = 0.0
+    # SKU type -> number of placements when a carton of that type last failed; the map is
+    # unchanged until the next placement, so an identical carton would fail the same way
+    failed = {}
+    attempts = 0    # window searches (one per orientation tried)
+    for it in order:
+        if stop(deadline, "pack_boxes"):
+            break
+        if flags.max_payload and total_weight + it.weight > truck.payload_kg + EPS:
+            continue
+        key = sku_key(it)
+        if failed.get(key) == len(placed):
+            continue
+        dims = [(it.L, it.W), (it.W, it.L)] if it.can_rotate and getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
+        need = _required_fraction(it.weight)
+        best = None
+        for L, W in dims:
+            if L > truck.L + EPS or W > truck.W + EPS:
+                continue
+            a, b = _cells(L, step), _cells(W, step)
+            pos = hm.find(a, b, it.H, truck.H, need)
+            attempts += 1
+            if pos is not None and (best is None or (pos[2], pos[0], pos[1]) < (best[0][2], best[0][0], best[0][1])):
+                best = (pos, L, W, a, b)
+        if best is None:
+            failed[key] = len(placed)
+            continue
+        (i, j, z), L, W, a, b = best
+        hm.place(i, j, a, b, z + it.H)
+        placed.append(Placement(it.id, i * step, j * step, z, L, W, it.H, it.weight, it.drop_order, it.fragile, it.stack_limit))
+        total_weight += it.weight
+    metrics.count("heightmap_searches", attempts)
+    metrics.log(f"[HEIGHTMAP] grid={hm.nx}x{hm.ny} step={step:.3f}m  placed={len(placed)}  max_z={hm.h.max():.2f}m")
+    return placed, total_weight
@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class Instrumentation:
+    # Wall time per stage and hot-path counters for a run, exported into report.json.
+    # When disabled, count() returns after one attribute check and stage() times nothing,
+    # so the hooks can stay in the packing code. Loops accumulate locally and report once.
+    # If tracemalloc is tracing, stages also record the peak traced memory (stages must
+    # not nest then: each one resets the peak).
+    def __init__(self, enabled=True, verbose=True):
+        self.enabled = enabled
+        self.verbose = verbose      # progress lines such as [LAYER]; off -> silent
+        self.stages = {}
+        self.peaks = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def reset(self):
+        self.stages = {}
+        self.peaks = {}
+        self.counters = {}
+        self.gauges = {}
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+                self.peaks[name] = max(self.peaks.get(name, 0.0), peak)
+
+    def record(self, name, seconds):
+        # a stage timed elsewhere (e.g. module import before the recorder was configured)
+        if self.enabled:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        # latest value of a derived figure (a rate, a correlation); counters only add up
+        if self.enabled:
+            self.gauges[name] = value
+
+    def log(self, msg):
+        if self.verbose:
+            print(msg)
+
+    def report(self):
+        rep = {
+            "stage_seconds": {k: round(v, 4) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+        if self.gauges:
+            rep["gauges"] = {k: round(v, 4) for k, v in self.gauges.items()}
+        if self.peaks:
+            rep["stage_peak_mb"] = {k: round(v, 2) for k, v in self.peaks.items()}
+        return rep
+
+# process-wide instance used by the packer, GA and main_gpu
+metrics = Instrumentation()
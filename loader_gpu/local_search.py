@@ -0,0 +1,58 @@
+import time
+from typing import List
+import numpy as np
+from .models import Item, sku_key
+from .packer_cpu import pack
+from .deadline import stop
+from .instrument import metrics
+
+def _volume(placed):
+    return sum(p.L * p.W * p.H for p in placed)
+
+def local_search(items: List[Item], truck, flags, moves=200, seed=1234, executor=None, deadline=None,
+                 respect_order=True):
+    # Pairwise-swap local search on the layer packer's placement priority. Swaps only mean
+    # something with respect_order: otherwise pack re-sorts the items itself (pack_order) and
+    # a swap changes nothing, so no moves are tried and the plain pack is returned. A move
+    # picks a layer checkpoint, swaps a box loaded at or above it with another box still to
+    # load there, and re-packs from that checkpoint only: the layers below are kept. Moves
+    # that do not lose volume are accepted. Returns (placements, total weight); layouts that
+    # came from the shelf fallback have no checkpoints and are returned as is.
+    rng = np.random.default_rng(seed)
+    order = list(items)
+    checkpoints = []
+    placed, total_w = pack(truck, flags, order, executor=executor, respect_order=respect_order,
+                           checkpoints=checkpoints)
+    vol = _volume(placed)
+    t0 = time.perf_counter()
+    done_moves = 0
+    for _ in range(moves if checkpoints and respect_order else 0):
+        if stop(deadline, "local_search"):
+            break
+        # upper layers are cheaper to re-pack: layer k is picked with weight k + 1
+        k = min(len(checkpoints) - 1, int(len(checkpoints) * np.sqrt(rng.random())))
+        cp = checkpoints[k]
+        below = {p.id for p in cp.placed}
+        rest = [it for it in order if it.id not in below]
+        above = {p.id for p in placed} - below
+        upper = [i for i, it in enumerate(rest) if it.id in above]
+        if not upper or len(rest) < 2:
+            continue
+        i, j = upper[int(rng.integers(len(upper)))], int(rng.integers(len(rest)))
+        if i == j or sku_key(rest[i]) == sku_key(rest[j]):
+            continue    # identical cartons: the layout would only swap ids
+        rest[i], rest[j] = rest[j], rest[i]
+        trail = []
+        cand, cand_w = pack(truck, flags, rest, executor=executor, respect_order=True, resume=cp, checkpoints=trail)
+        done_moves += 1
+        metrics.count("ls_layers_repacked", len(trail))
+        cand_vol = _volume(cand)
+        if cand_vol >= vol:
+            metrics.count("ls_accepted")
+            order = [it for it in order if it.id in below] + rest
+            checkpoints = checkpoints[:k] + trail
+            placed, total_w, vol = cand, cand_w, cand_vol
+    metrics.count("ls_moves", done_moves)
+    if done_moves:
+        metrics.gauge("ls_moves_per_s", done_moves / max(time.perf_counter() - t0, 1e-9))
+    return placed, total_w
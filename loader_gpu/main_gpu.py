@@ -1,108 +1,374 @@
-import argparse, pandas as pd
-from .config import TruckSpec, Flags, GA_POP, GA_GEN
-from .models import Item
-from .selector import select_subset
+import time
+_IMPORT_T0 = time.perf_counter()
+import argparse, glob, os, pandas as pd
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .config import TruckSpec, Flags, GA_POP, GA_GEN, PACK_WORKERS, PACK_ENGINE, INSTRUMENT, GA_BACKEND
+from .config import SELECT_TIME_LIMIT, SELECT_WORKERS, SELECT_DROP_WEIGHT, SELECT_SLACK, CACHE_DIR, OUTPUT_WRITER
+from .config import FLEET_CATALOG, FLEET_FILL, FLEET_WORKERS, DEADLINE_SELECT_SHARE, DEADLINE_GA_SHARE
+from .instrument import metrics
+from .models import Item, ItemTable, PlacementTable
+from .selector import select_subset, lane_candidates
 from .packer_cpu import pack
-from .ga_gpu import ga_reorder
-from .utils import save_layout_csv, save_report_json, draw3d
-
-def load_items_csv(path):
-    import pandas as pd
-    from .models import Item
-
-    df = pd.read_csv(path)
-    # Accept either *_m or *_mm headers; prefer meters if present.
-    def get_dim(row, m, mm):
-        if m in row and not pd.isna(row[m]):
-            return float(row[m])
-        return float(row[mm]) / 1000.0
-
-    items = []
-    for _, r in df.iterrows():
-        L = float(r["L_m"]) if "L_m" in df.columns else get_dim(r, "length_m", "length_mm")
-        W = float(r["W_m"]) if "W_m" in df.columns else get_dim(r, "width_m", "width_mm")
-        H = float(r["H_m"]) if "H_m" in df.columns else get_dim(r, "height_m", "height_mm")
-        items.append(Item(
-            id=str(r.get("id", _)),
-            L=L, W=W, H=H,
-            weight=float(r.get("weight_kg", 20.0)),
-            fragile=int(r.get("fragile", 0)),
-            stack_limit=int(r.get("stack_limit", 2)),
-            can_rotate=int(r.get("can_rotate", 1)),
-            drop_order=int(r.get("drop_order", 1)),
-        ))
-    return items
+from .ga import ga_reorder, ga_backend
+from .local_search import local_search
+from .fleet import plan_fleet, load_fleet_csv, rank_vehicles
+from .deadline import Deadline, shutdown
+from .cache import ResultCache, cache_key, placements_to_json, placements_from_json
+from .utils import save_layout_csv, save_layout_npy, save_report_json, draw3d, OutputWriter
+# torch, ortools and matplotlib load lazily inside the features that use them
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_T0
 
+# Item field <- CSV columns: exact meters header, else *_m with a per-row *_mm fallback.
+DIM_COLUMNS = {"L": ("L_m", "length_m", "length_mm"),
+               "W": ("W_m", "width_m", "width_mm"),
+               "H": ("H_m", "height_m", "height_mm")}
+# optional columns and the value used when the column (or a cell) is missing
+OPTIONAL_COLUMNS = {"weight_kg": 20.0, "fragile": 0, "stack_limit": 2, "can_rotate": 1, "drop_order": 1}
+# declared volume_m3 within this relative tolerance of L*W*H counts as consistent
+VOLUME_RTOL = 0.02
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--items", required=True)
-    ap.add_argument("--use_ortools", type=int, default=1)
-    ap.add_argument("--use_ga", type=int, default=1)
-    ap.add_argument("--ga_generations", type=int, default=GA_GEN)
-    ap.add_argument("--ga_population", type=int, default=GA_POP)
-    ap.add_argument("--prefilter_small", type=int, default=180)
-    ap.add_argument("--prefilter_large", type=int, default=40)
-    args = ap.parse_args()
+def _resolve_schema(header):
+    # Decide once, from the header, which columns feed each Item field.
+    cols = set(header)
+    dims = {}
+    for name, (exact, m, mm) in DIM_COLUMNS.items():
+        if exact in cols:
+            dims[name] = (exact, None)
+        elif m in cols:
+            dims[name] = (m, mm if mm in cols else None)
+        elif mm in cols:
+            dims[name] = (None, mm)
+        else:
+            raise ValueError(f"items CSV has no {name} column ({exact}, {m} or {mm})")
+    id_col = next((c for c in ("id", "item_id") if c in cols), None)
+    optional = [c for c in OPTIONAL_COLUMNS if c in cols]
+    volume = "volume_m3" if "volume_m3" in cols else None
+    usecols = [c for pair in dims.values() for c in pair if c] + optional
+    usecols += [c for c in (id_col, volume) if c]
+    return {"dims": dims, "id": id_col, "optional": optional, "volume": volume, "usecols": usecols}
 
-    truck = TruckSpec(); flags = Flags()
-    items = load_items_csv(args.items)
+def _table_from_frame(df, schema, start=0):
+    # Convert one DataFrame (or chunk starting at row `start`) column-wise into an ItemTable.
+    # Returns the table and how many rows declare a volume_m3 inconsistent with L*W*H.
+    dims = {}
+    for name, (m, mm) in schema["dims"].items():
+        v = df[m].to_numpy(dtype=np.float64) if m else df[mm].to_numpy(dtype=np.float64) / 1000.0
+        if m and mm:
+            v = np.where(np.isnan(v), df[mm].to_numpy(dtype=np.float64) / 1000.0, v)
+        dims[name] = v
+    if schema["id"]:
+        ids = df[schema["id"]].to_numpy(dtype=object)
+    else:
+        ids = np.arange(start, start + len(df)).astype(str).astype(object)
+    opt = {c: (df[c].fillna(default).to_numpy() if c in schema["optional"] else np.full(len(df), default))
+           for c, default in OPTIONAL_COLUMNS.items()}
+    tab = ItemTable(ids, dims["L"], dims["W"], dims["H"], opt["weight_kg"], opt["fragile"],
+                    opt["stack_limit"], opt["can_rotate"], opt["drop_order"])
+    bad = 0
+    if schema["volume"]:
+        declared = df[schema["volume"]].to_numpy(dtype=np.float64)
+        known = ~np.isnan(declared)
+        bad = int((known & ~np.isclose(declared, tab.vol, rtol=VOLUME_RTOL, atol=1e-6)).sum())
+    return tab, bad
 
-    # === ADAPTIVE LANE-AWARE PREFILTER (v4 recommended) ===
-    import numpy as np
+def iter_item_tables(path, chunksize=100_000):
+    # Stream a large manifest as ItemTable chunks without holding the whole DataFrame.
+    # Yields (table, rows_with_inconsistent_volume) per chunk.
+    schema = _resolve_schema(pd.read_csv(path, nrows=0).columns)
+    dtype = {schema["id"]: str} if schema["id"] else None
+    start = 0
+    for df in pd.read_csv(path, usecols=schema["usecols"], dtype=dtype, chunksize=chunksize):
+        yield _table_from_frame(df, schema, start)
+        start += len(df)
 
-    # Measure item widths and compute a "good lane width"
-    widths = np.array([min(i.L, i.W) if i.can_rotate else i.W for i in items])
-    lane = np.percentile(widths, 70)  # allow 70% of items to fit per lane (wider)
-    lane = min(lane, truck.W / 1.95)  # never exceed ~half-truck width
+def items_from_frame(df):
+    # ItemTable from an in-memory manifest (e.g. JSON records or CSV text sent to the
+    # pack service) with the same columns as an items CSV
+    schema = _resolve_schema(df.columns)
+    if schema["id"]:
+        df = df.assign(**{schema["id"]: df[schema["id"]].astype(str)})
+    tab, _ = _table_from_frame(df, schema)
+    return tab
 
-    MIN_H = 0.0  # allow smaller items to be considered
+def load_items_csv(path, table=False, chunksize=None):
+    # Accept either *_m or *_mm headers (prefer meters), `id` or `item_id` identifiers.
+    # table=True returns an ItemTable, otherwise a list of Item. chunksize streams the CSV.
+    if chunksize:
+        parts = list(iter_item_tables(path, chunksize))
+        tab = ItemTable.concat([t for t, _ in parts])
+        bad = sum(b for _, b in parts)
+    else:
+        schema = _resolve_schema(pd.read_csv(path, nrows=0).columns)
+        dtype = {schema["id"]: str} if schema["id"] else None
+        tab, bad = _table_from_frame(pd.read_csv(path, usecols=schema["usecols"], dtype=dtype), schema)
+    if bad:
+        print(f"[WARN] {path}: {bad} rows declare a volume_m3 that differs from L*W*H "
+              f"by more than {VOLUME_RTOL:.0%} (dimension units?)")
+    if table:
+        return tab
+    return tab.to_items()
 
-    def fits_lane(it):
-        dims = [(it.L, it.W), (it.W, it.L)] if it.can_rotate else [(it.L, it.W)]
-        return any((w <= lane and l <= truck.L and it.H <= truck.H) for l, w in dims)
 
-    eligible = [i for i in items if i.H >= MIN_H and fits_lane(i)]
+def solve(tab, truck, flags, args, deadline=None):
+    # prefilter -> select -> GA -> pack for one manifest; returns (placements, total weight).
+    # With a `deadline` the selection and the GA get DEADLINE_SELECT_SHARE / DEADLINE_GA_SHARE
+    # of the time left and the final pack the rest; stages past it keep their best so far.
+    # === ADAPTIVE LANE-AWARE PREFILTER (v4 recommended) ===
+    # columnar view: lane width at the 70th width percentile (wider lanes), candidates
+    # sorted to form stable columns in drop sequence, pool of at least 150
+    with metrics.stage("prefilter"):
+        idx, lane = lane_candidates(tab, truck, lane_pct=70, limit=260)
+        cand = tab.take(idx)
+    metrics.log(f"[INFO] Candidate pool (adaptive): {len(cand)}")
 
-    # Sort to form stable columns and maintain drop-sequence
-    eligible = sorted(eligible, key=lambda i: (
-        -i.drop_order,
-        -i.H,
-        -(i.L * i.W),
-        -i.stack_limit
-    ))
+    with metrics.stage("select_subset"):
+        chosen = (select_subset(cand, truck, time_limit=args.select_time, workers=args.select_workers,
+                                drop_weight=args.select_drop_weight, slack=args.select_slack,
+                                deadline=deadline and deadline.share(DEADLINE_SELECT_SHARE))
+                  if args.use_ortools else cand).to_items()
+    metrics.log(f"[INFO] Preselected (OR-Tools): {len(chosen)} items")
 
-    # Guarantee sufficient pool size (this is the key!)
-    if len(eligible) < 150:
-        eligible = sorted(items, key=lambda i: -(i.L * i.W))[:150]
+    # optional pool for evaluating candidate layer heights in parallel (same layout as serial)
+    executor = None
+    if args.pack_workers > 1:
+        pool_cls = ProcessPoolExecutor if args.pack_pool == "process" else ThreadPoolExecutor
+        executor = pool_cls(max_workers=args.pack_workers)
 
-    cand = eligible[:260]
-    print(f"[INFO] Candidate pool (adaptive): {len(cand)}")
+    try:
+        order = chosen[:]
+        if args.use_ga and len(order) > 4:
+            backend = ga_backend(args.ga_backend)
+            with metrics.stage("ga_reorder"):
+                order = ga_reorder(order, truck, population=args.ga_population, generations=args.ga_generations,
+                                   executor=executor, respect_order=bool(args.respect_order), engine=args.engine,
+                                   backend=backend, deadline=deadline and deadline.share(DEADLINE_GA_SHARE))
+            metrics.log(f"[INFO] GA ({backend}) reordering done.")
 
-    chosen = select_subset(cand, truck) if args.use_ortools else cand
-    print(f"[INFO] Preselected (OR-Tools): {len(chosen)} items")
+        with metrics.stage("pack"):
+            placed, total_w = pack(truck, flags, order, executor=executor, respect_order=bool(args.respect_order),
+                                   engine=args.engine, deadline=deadline)
+        if args.local_search and args.engine == "layers" and not args.respect_order:
+            metrics.log("[INFO] Local search skipped: swap moves need --respect_order 1")
+        elif args.local_search and args.engine == "layers":
+            with metrics.stage("local_search"):
+                ls_placed, ls_w = local_search(order, truck, flags, moves=args.local_search, executor=executor,
+                                               deadline=deadline, respect_order=bool(args.respect_order))
+            if PlacementTable.from_placements(ls_placed).volume() > PlacementTable.from_placements(placed).volume():
+                placed, total_w = ls_placed, ls_w
+            metrics.log(f"[INFO] Local search: {len(placed)} placed")
+    finally:
+        if executor is not None:
+            # past the deadline: drop queued work and do not wait for running tasks
+            shutdown(executor, deadline)
+    return placed, total_w
 
-    order = chosen[:]
-    if args.use_ga and len(order) > 4:
-        order = ga_reorder(order, truck, population=args.ga_population, generations=args.ga_generations)
-        print("[INFO] GA (GPU) reordering done.")
+def run_fleet(tab, flags, args, writer):
+    # fleet mode: every item is assigned to a vehicle (no prefilter/selection), each truck is
+    # packed in a worker process; per-truck layouts plus fleet_report.json under --fleet_out
+    catalog = load_fleet_csv(args.fleet_catalog) if args.fleet_catalog else FLEET_CATALOG
+    with metrics.stage("fleet"):
+        trucks, unplaced = plan_fleet(tab.to_items(), catalog, flags, engine=args.engine,
+                                      workers=args.fleet_workers, fill=args.fleet_fill,
+                                      objective=args.fleet_objective)
+    os.makedirs(args.fleet_out, exist_ok=True)
+    # layouts of an earlier, larger plan must not be mistaken for part of this one
+    for old in glob.glob(os.path.join(args.fleet_out, "truck_*_layout.csv")) + \
+            glob.glob(os.path.join(args.fleet_out, "truck_*_layout.npy")):
+        os.remove(old)
+    rows = []
+    with metrics.stage("render"):
+        for k, tr in enumerate(trucks, 1):
+            spec = tr["spec"]
+            name = f"truck_{k:02d}_{spec.name.replace(' ', '_')}_layout.csv"
+            writer.submit(save_layout_csv, tr["placed"], os.path.join(args.fleet_out, name))
+            if args.layout_npy:
+                writer.submit(save_layout_npy, tr["placed"], os.path.join(args.fleet_out, name[:-4] + ".npy"))
+            vol = PlacementTable.from_placements(tr["placed"]).volume()
+            rows.append({
+                "truck": k, "vehicle": spec.name, "cost": tr["cost"], "placed_items": len(tr["placed"]),
+                "volume_utilization_pct": round(100.0 * vol / (spec.L * spec.W * spec.H), 1),
+                "weight_utilization_pct": round(100.0 * tr["weight"] / spec.payload_kg, 1),
+                "layout": name,
+            })
+            metrics.log(f"[FLEET] truck {k} ({spec.name}): {rows[-1]['placed_items']} items, "
+                        f"vol {rows[-1]['volume_utilization_pct']}%, wt {rows[-1]['weight_utilization_pct']}%")
+    report = {
+        "trucks": len(trucks),
+        "total_cost": round(sum(tr["cost"] for tr in trucks), 3),
+        "placed_items": sum(len(tr["placed"]) for tr in trucks),
+        "unplaced_items": len(unplaced),
+        "vehicles": {spec.name: sum(tr["type"] == t for tr in trucks) for t, (spec, _, _) in enumerate(catalog)},
+        "per_truck": rows,
+        "unplaced_ids": [it.id for it in unplaced],
+    }
+    if metrics.enabled:
+        report["instrumentation"] = metrics.report()
+    writer.submit(save_report_json, report, os.path.join(args.fleet_out, "fleet_report.json"))
+    writer.close()
+    print(f"Trucks: {report['trucks']} | Cost: {report['total_cost']} | Placed: {report['placed_items']} "
+          f"| Unplaced: {report['unplaced_items']}")
+    print(f"Wrote: {args.fleet_out}/fleet_report.json and {len(trucks)} layout CSVs"
+          + (" (+ .npy)" if args.layout_npy else ""))
 
-    placed, total_w = pack(truck, flags, order)
+def run_truck_choice(tab, flags, args, writer):
+    # vehicle choice: the whole manifest is packed into one vehicle of each catalog type
+    # (types whose bounds cannot win are skipped), ranked in truck_ranking.json; the best
+    # type's layout is written like a normal run's
+    catalog = load_fleet_csv(args.fleet_catalog) if args.fleet_catalog else FLEET_CATALOG
+    with metrics.stage("choose_truck"):
+        ranking, packed = rank_vehicles(tab.to_items(), catalog, flags, engine=args.engine,
+                                        workers=args.fleet_workers, objective=args.truck_objective)
+    best = ranking[0] if ranking and ranking[0]["rank"] else None
+    report = {"objective": args.truck_objective, "best": best and best["vehicle"], "ranking": ranking}
+    if metrics.enabled:
+        report["instrumentation"] = metrics.report()
+    with metrics.stage("render"):
+        if best:
+            spec = catalog[best["type"]][0]
+            placed = packed[best["type"]][0]
+            writer.submit(save_layout_csv, placed, "packed_layout.csv")
+            if args.layout_npy:
+                writer.submit(save_layout_npy, placed, "packed_layout.npy")
+            if args.render:
+                writer.submit(draw3d, placed, spec, "plot3d.png",
+                              title=f"{spec.name}: {best['volume_utilization_pct']:.1f}% (Vol), "
+                                    f"{best['weight_utilization_pct']:.1f}% (Wt)")
+        writer.submit(save_report_json, report, "truck_ranking.json")
+    for row in ranking:
+        if row["rank"]:
+            print(f"{row['rank']:>2}. {row['vehicle']}: {row['placed_items']} items "
+                  f"({row['manifest_volume_pct']:.1f}% of manifest vol) | Vol Util: {row['volume_utilization_pct']:.1f}% "
+                  f"| Wt Util: {row['weight_utilization_pct']:.1f}% | Cost: {row['cost']:g}")
+        else:
+            print(f" -. {row['vehicle']}: {row['status']} (bound vol {row['bound_volume_utilization_pct']:.1f}%)")
+    writer.close()
+    print("Wrote: truck_ranking.json" + (", packed_layout.csv (best vehicle)" if best else ""))
 
-    vol_used = sum(p.L*p.W*p.H for p in placed)
-    vol_total = truck.L*truck.W*truck.H
-    vol_util = 100.0*vol_used/vol_total
-    wt_util = 100.0*total_w/truck.payload_kg
+def pack_manifest(tab, truck, flags, args, deadline, cache=None):
+    # cache lookup -> solve -> cache store for one manifest; returns (placements, total
+    # weight, report) where the report has no instrumentation block yet
+    # arguments that cannot change the layout stay out of the key; a run the deadline cut
+    # short is not stored, so the deadline itself does not change a cached layout either
+    params = {k: v for k, v in vars(args).items()
+              if k not in ("items", "instrument", "verbose", "cache", "cache_dir", "pack_workers", "pack_pool",
+                           "deadline", "render", "writer", "layout_npy")}
+    key = cache_key(tab, truck, flags, params) if cache else None
+    hit = cache.get(key) if cache else None
+    if hit is not None:
+        placed, total_w = placements_from_json(hit["placed"]), hit["total_weight"]
+        metrics.log(f"[INFO] Cache hit {key[:12]}: reusing {len(placed)} placements")
+    else:
+        placed, total_w = solve(tab, truck, flags, args, deadline)
+        if deadline.cut:
+            metrics.log(f"[WARN] Deadline of {args.deadline:g}s reached; cut short: {', '.join(deadline.cut)}")
+        elif cache:
+            cache.put(key, {"placed": placements_to_json(placed), "total_weight": total_w})
 
-    save_layout_csv(placed, "packed_layout.csv")
-    save_report_json({
+    vol_used = PlacementTable.from_placements(placed).volume()
+    report = {
         "placed_items": len(placed),
-        "volume_utilization_pct": round(vol_util,1),
-        "weight_utilization_pct": round(wt_util,1)
-    }, "report.json")
-    draw3d(placed, truck, "plot3d.png", title=f"Fill: {vol_util:.1f}% (Vol), {wt_util:.1f}% (Wt)")
+        "volume_utilization_pct": round(100.0*vol_used/(truck.L*truck.W*truck.H),1),
+        "weight_utilization_pct": round(100.0*total_w/truck.payload_kg,1)
+    }
+    if args.deadline:
+        report["deadline"] = {"seconds": args.deadline,
+                              "elapsed_s": round(args.deadline - deadline.remaining(), 3),
+                              "cut_short": deadline.cut}
+    if cache:
+        report["cache"] = cache.report()
+    return placed, total_w, report
+
+def build_parser():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", required=True)
+    ap.add_argument("--use_ortools", type=int, default=1)
+    ap.add_argument("--use_ga", type=int, default=1)
+    ap.add_argument("--ga_generations", type=int, default=GA_GEN)
+    ap.add_argument("--ga_population", type=int, default=GA_POP)
+    ap.add_argument("--ga_backend", choices=["auto", "numpy", "torch"], default=GA_BACKEND)
+    # CP-SAT preselector: effort cap in deterministic seconds, search workers, drop-order priority
+    # weight, pool volume/payload relative to the truck (>1.0 lets the pool exceed the truck)
+    ap.add_argument("--select_time", type=float, default=SELECT_TIME_LIMIT)
+    ap.add_argument("--select_workers", type=int, default=SELECT_WORKERS)
+    ap.add_argument("--select_drop_weight", type=float, default=SELECT_DROP_WEIGHT)
+    ap.add_argument("--select_slack", type=float, default=SELECT_SLACK)
+    ap.add_argument("--prefilter_small", type=int, default=180)
+    ap.add_argument("--prefilter_large", type=int, default=40)
+    ap.add_argument("--pack_workers", type=int, default=PACK_WORKERS)
+    ap.add_argument("--pack_pool", choices=["process", "thread"], default="process")
+    # 1 -> pack keeps the preselected/GA order as placement priority instead of re-sorting
+    ap.add_argument("--respect_order", type=int, default=0)
+    ap.add_argument("--engine", choices=["layers", "heightmap"], default=PACK_ENGINE)
+    # swap moves of a local search on the final order (layers engine; 0 -> off)
+    ap.add_argument("--local_search", type=int, default=0)
+    # stage timings/counters in report.json (0 -> off), progress lines (0 -> quiet)
+    ap.add_argument("--instrument", type=int, default=int(INSTRUMENT))
+    ap.add_argument("--verbose", type=int, default=1)
+    # plot3d.png (0 -> skip); where the output files are written: "sync", a background
+    # "thread" or a worker "process", so the run does not wait on matplotlib
+    ap.add_argument("--render", type=int, default=1)
+    # also write the layout as a memory-mappable .npy (utils.load_layout_npy reads it back)
+    ap.add_argument("--layout_npy", type=int, default=1)
+    ap.add_argument("--writer", choices=["sync", "thread", "process"], default=OUTPUT_WRITER)
+    # reuse the layout of an identical earlier run (same items, truck, config and arguments)
+    ap.add_argument("--cache", type=int, default=1)
+    ap.add_argument("--cache_dir", default=CACHE_DIR)
+    # fleet mode: assign all items to vehicles from FLEET_CATALOG (or a catalog CSV)
+    ap.add_argument("--fleet", type=int, default=0)
+    ap.add_argument("--fleet_catalog")
+    ap.add_argument("--fleet_workers", type=int, default=FLEET_WORKERS)
+    ap.add_argument("--fleet_fill", type=float, default=FLEET_FILL)
+    ap.add_argument("--fleet_objective", choices=["cost", "count"], default="cost")
+    ap.add_argument("--fleet_out", default="fleet_plan")
+    # vehicle choice: pack the manifest into each catalog type (FLEET_CATALOG or --fleet_catalog,
+    # --fleet_workers at once) and rank them: most of the manifest loaded, cost per m^3 or fill
+    ap.add_argument("--choose_truck", type=int, default=0)
+    ap.add_argument("--truck_objective", choices=["cover", "cost", "fill"], default="cover")
+    # wall-clock budget in seconds for load..pack (0 -> none); past it the best layout so
+    # far is returned and report.json lists the stages that were cut short
+    ap.add_argument("--deadline", type=float, default=0.0)
+    return ap
+
+def main():
+    args = build_parser().parse_args()
+    deadline = Deadline(args.deadline or None)
+    metrics.enabled = bool(args.instrument)
+    metrics.verbose = bool(args.verbose)
+    # cold start: importing the package (the interpreter itself is not included)
+    metrics.record("import", IMPORT_SECONDS)
+
+    truck = TruckSpec(); flags = Flags()
+    with metrics.stage("load"):
+        tab = load_items_csv(args.items, table=True)
+    writer = OutputWriter(args.writer)
+    if args.fleet:
+        run_fleet(tab, flags, args, writer)
+        return
+    if args.choose_truck:
+        run_truck_choice(tab, flags, args, writer)
+        return
+
+    cache = ResultCache(args.cache_dir) if args.cache else None
+    placed, total_w, report = pack_manifest(tab, truck, flags, args, deadline, cache)
+    vol_util = report["volume_utilization_pct"]
+    wt_util = report["weight_utilization_pct"]
+
+    # with a background writer this stage only covers handing the outputs over
+    with metrics.stage("render"):
+        writer.submit(save_layout_csv, placed, "packed_layout.csv")
+        if args.layout_npy:
+            writer.submit(save_layout_npy, placed, "packed_layout.npy")
+        if args.render:
+            writer.submit(draw3d, placed, truck, "plot3d.png",
+                          title=f"Fill: {vol_util:.1f}% (Vol), {wt_util:.1f}% (Wt)")
+    if metrics.enabled:
+        report["instrumentation"] = metrics.report()
+    writer.submit(save_report_json, report, "report.json")
     print(f"Placed: {len(placed)} | Vol Util: {vol_util:.1f}% | Wt Util: {wt_util:.1f}%")
-    print("Wrote: packed_layout.csv, report.json, plot3d.png")
+    writer.close()
+    print("Wrote: packed_layout.csv, " + ("packed_layout.npy, " if args.layout_npy else "") + "report.json"
+          + (", plot3d.png" if args.render else ""))
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
+from typing import List
+import numpy as np
 
-@dataclass
+@dataclass(slots=True)
 class Item:
     id: int
     L: float; W: float; H: float
@@ -12,10 +14,129 @@ class Item:
     vol: float = field(init=False)
     def __post_init__(self): self.vol = self.L*self.W*self.H
 
-@dataclass
+@dataclass(slots=True)
 class Placement:
     id: int
     x: float; y: float; z: float
     L: float; W: float; H: float
     weight: float; drop_order: int
     fragile: int; stack_limit: int
+
+def sku_key(it: Item):
+    # cartons with equal dimensions, weight and flags are interchangeable for packing
+    return (it.L, it.W, it.H, it.weight, it.fragile, it.stack_limit, it.can_rotate, it.drop_order)
+
+class ItemTable:
+    # Struct-of-arrays view of a manifest: one NumPy column per Item field. Row access
+    # (`t[i]`, iteration, to_items) builds Item objects on demand for code that needs them;
+    # index arrays, masks and slices give sub-tables. Column dtypes are float64/int64 so
+    # the values (and vol = L*W*H) are exactly those of the equivalent Item objects.
+    FLOAT_COLS = ("L", "W", "H", "weight")
+    INT_COLS = ("fragile", "stack_limit", "can_rotate", "drop_order")
+
+    def __init__(self, id, L, W, H, weight, fragile, stack_limit, can_rotate, drop_order):
+        self.id = np.asarray(id, dtype=object)
+        for name, col in zip(self.FLOAT_COLS, (L, W, H, weight)):
+            setattr(self, name, np.asarray(col, dtype=np.float64))
+        for name, col in zip(self.INT_COLS, (fragile, stack_limit, can_rotate, drop_order)):
+            setattr(self, name, np.asarray(col, dtype=np.int64))
+        self.vol = self.L * self.W * self.H
+
+    @classmethod
+    def from_items(cls, items: List[Item]):
+        return cls(*(np.array([getattr(it, name) for it in items],
+                              dtype=object if name == "id" else None)
+                     for name in ("id",) + cls.FLOAT_COLS + cls.INT_COLS))
+
+    @classmethod
+    def concat(cls, tables):
+        if not tables:
+            return cls(*([],) * 9)
+        return cls(*(np.concatenate([getattr(t, name) for t in tables])
+                     for name in ("id",) + cls.FLOAT_COLS + cls.INT_COLS))
+
+    def columns(self):
+        return {name: getattr(self, name) for name in ("id",) + self.FLOAT_COLS + self.INT_COLS}
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.item(key)
+        return ItemTable(**{name: col[key] for name, col in self.columns().items()})
+
+    def take(self, idx):
+        return self[np.asarray(idx, dtype=np.intp)]
+
+    def item(self, i) -> Item:
+        return Item(self.id[i], float(self.L[i]), float(self.W[i]), float(self.H[i]),
+                    float(self.weight[i]), int(self.fragile[i]), int(self.stack_limit[i]),
+                    int(self.can_rotate[i]), int(self.drop_order[i]))
+
+    def to_items(self) -> List[Item]:
+        cols = [col.tolist() for col in self.columns().values()]
+        return [Item(*row) for row in zip(*cols)]
+
+    def __iter__(self):
+        return iter(self.to_items())
+
+class PlacementTable:
+    # Columnar counterpart of a list of Placement, e.g. for volume/weight totals and export.
+    FIELDS = ("id", "x", "y", "z", "L", "W", "H", "weight", "drop_order", "fragile", "stack_limit")
+
+    def __init__(self, **cols):
+        for name in self.FIELDS:
+            col = cols[name]
+            if name == "id":
+                # fixed-width string ids (e.g. a memory-mapped layout file) are kept as they are
+                col = np.asarray(col)
+                if col.dtype.kind != "U":
+                    col = col.astype(object)
+            elif name in ("drop_order", "fragile", "stack_limit"):
+                col = np.asarray(col, dtype=np.int64)
+            else:
+                col = np.asarray(col, dtype=np.float64)
+            setattr(self, name, col)
+
+    @classmethod
+    def from_placements(cls, placements: List[Placement]):
+        return cls(**{name: [getattr(p, name) for p in placements] for name in cls.FIELDS})
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            row = (getattr(self, name)[key] for name in self.FIELDS)
+            return Placement(*(v.item() if isinstance(v, np.generic) else v for v in row))
+        return PlacementTable(**{name: getattr(self, name)[key] for name in self.FIELDS})
+
+    def to_placements(self) -> List[Placement]:
+        cols = [getattr(self, name).tolist() for name in self.FIELDS]
+        return [Placement(*row) for row in zip(*cols)]
+
+    def __iter__(self):
+        return iter(self.to_placements())
+
+    def to_records(self):
+        # one fixed-dtype structured array (ids as fixed-width unicode), e.g. for a .npy file
+        width = max((len(str(i)) for i in self.id.tolist()), default=1)
+        dtype = [("id", f"<U{max(width, 1)}")] + [(name, "<i8" if name in ("drop_order", "fragile", "stack_limit")
+                                                  else "<f8") for name in self.FIELDS[1:]]
+        rec = np.empty(len(self), dtype=dtype)
+        rec["id"] = [str(i) for i in self.id.tolist()]
+        for name in self.FIELDS[1:]:
+            rec[name] = getattr(self, name)
+        return rec
+
+    @classmethod
+    def from_records(cls, rec):
+        # columns are views into `rec` (no copy), so a memory-mapped array stays on disk
+        return cls(**{name: rec[name] for name in cls.FIELDS})
+
+    def volume(self) -> float:
+        return float(np.sum(self.L * self.W * self.H))
+
+    def total_weight(self) -> float:
+        return float(np.sum(self.weight))
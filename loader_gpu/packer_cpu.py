@@ -1,7 +1,16 @@
+from dataclasses import dataclass
 from typing import List
-from .models import Item, Placement
+from concurrent.futures import wait, FIRST_COMPLETED
+import numpy as np
+from .models import Item, Placement, sku_key
+from .spatial import SurfaceIndex
+from .freespace import FreeRects
+from .heightmap import pack_heightmap, heightmap_order
+from .instrument import metrics
+from .deadline import stop
 from .config import (
     MAX_LAYERS,
+    PACK_ENGINE,
     SUPPORT_RATIO_CARTON,
     SUPPORT_RATIO_STANDARD,
     SUPPORT_RATIO_HEAVY,
@@ -13,33 +22,256 @@ EPS = 1e-9
 def _orientations(it: Item):
     return [(it.L, it.W), (it.W, it.L)] if it.can_rotate else [(it.L, it.W)]
 
-def pack(truck, flags, items: List[Item]):
-    lane_w = (truck.W / 2.0) - 0.01
-    # dynamic max layers: bounded by config and by smallest item height to avoid too many tiny layers
-    min_item_h = min((it.H for it in items), default=0.1)
-    max_layers = max(1, min(int(MAX_LAYERS), max(1, int(truck.H / max(min_item_h, 0.05)))))
+def _layer_orientations(it: Item, flags):
+    # both footprints as a fixed-shape pair (repeated when rotation is not allowed)
+    dims = _orientations(it) if getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
+    return [dims[0], dims[-1]]
+
+class _LayerSim:
+    # Everything the candidate-height simulations of one layer read. Simulations never
+    # modify it, so it is pickled as-is when candidates are evaluated in a process pool.
+    def __init__(self, truck, flags, z, placed, remaining_items, total_weight):
+        self.truck, self.flags, self.z = truck, flags, z
+        self.remaining_items = remaining_items
+        # top surfaces of the previous layer; `placed` is fixed while candidates are simulated
+        self.surface = SurfaceIndex(placed, z, tol=0.05)
+        self.rem_h = np.array([it.H for it in remaining_items])
+        self.total_weight = total_weight
+        self.rem_ok = np.array([(not flags.max_payload) or (total_weight + it.weight <= truck.payload_kg + EPS)
+                                for it in remaining_items], dtype=bool)
+        self.rem_dims = np.array([_layer_orientations(it, flags) for it in remaining_items]).reshape(-1, 2, 2)
+        # SKU type per remaining item: identical cartons share the outcome of a failed attempt
+        types = {}
+        self.rem_type = [types.setdefault(sku_key(it), len(types)) for it in remaining_items]
+
+    def greedy_pass(self, reverse, candidate_h):
+        sim_free = FreeRects(self.truck.L, self.truck.W)
+        sim_placed = []
+        sim_area = 0.0
+        sim_layer_h = 0.0
+        sim_weight = self.total_weight
+        # same checks as real packer (height fits the candidate, payload not exceeded)
+        order = np.flatnonzero((self.rem_h <= candidate_h + EPS) & self.rem_ok)
+        if reverse:
+            order = order[::-1]
+        dims = self.rem_dims[order]
+        # type -> free-space version at which a carton of that type failed without changing
+        # anything; an identical carton facing the same version fails the same way
+        failed = {}
+        pos = 0
+        checks = 0      # support-area lookups, reported by the caller
+        while True:
+            # jump to the next item with any orientation fitting the current free space
+            pos = sim_free.first_fitting(dims, pos)
+            if pos < 0:
+                break
+            k = order[pos]
+            pos += 1
+            version = sim_free.version
+            if failed.get(self.rem_type[k]) == version:
+                continue
+            it = self.remaining_items[k]
+            # rem_ok only knows the weight of earlier layers; this layer's boxes count too
+            if self.flags.max_payload and sim_weight + it.weight > self.truck.payload_kg + EPS:
+                continue
+            orientations = _orientations(it) if getattr(self.flags, 'orientation_allowed', True) else [(it.L, it.W)]
+            for (L, W) in orientations:
+                if L > self.truck.L + EPS or W > self.truck.W + EPS:
+                    continue
+                # find best-fit free rect
+                chosen_idx = sim_free.best_fit(L, W)
+                if chosen_idx < 0:
+                    continue
+                x0, y0 = sim_free.rect(chosen_idx)[:2]
+                x1, y1 = x0 + L, y0 + W
+                # stacking checks against actual placed (previous layers)
+                if self.z > 0:
+                    base_need_ratio = (SUPPORT_RATIO_CARTON if it.weight < 18 else SUPPORT_RATIO_STANDARD if it.weight < 70 else SUPPORT_RATIO_HEAVY)
+                    # be slightly stricter on required fraction to avoid hanging items
+                    required_fraction = max(base_need_ratio, SUPPORT_MIN_FRACTION, 0.30)
+                    support_need = L * W * required_fraction
+                    # accept support from items whose top is very near the target z (tolerance)
+                    checks += 1
+                    got = self.surface.support_area(x0, y0, x1, y1, tol=0.05, need=support_need)
+                    if got + EPS < support_need:
+                        # fallback: if the center point of the footprint is supported by some item below,
+                        # allow only when there is at least a minimal contact area (e.g. 25% of required)
+                        cx = (x0 + x1) / 2.0
+                        cy = (y0 + y1) / 2.0
+                        center_supported = self.surface.covers_point(cx, cy, tol=EPS)
+                        if not center_supported or got < support_need * 0.25:
+                            sim_free.requeue(chosen_idx)
+                            continue
+                # accept placement in simulation
+                sim_placed.append((it, x0, y0, candidate_h, L, W))
+                sim_area += L * W
+                sim_weight += it.weight
+                sim_layer_h = max(sim_layer_h, it.H)
+                # split every free rect under the box and drop contained rects
+                sim_free.place(chosen_idx, L, W)
+                break
+            else:
+                if sim_free.version == version:
+                    failed[self.rem_type[k]] = version
+        # compute largest free rect area and number of fragments
+        return sim_area, sim_placed, sim_layer_h, sim_free, sim_free.largest_merged_area(), checks
+
+    def simulate(self, candidate_h):
+        sim_area, sim_placed, sim_layer_h, sim_free, largest_free, checks1 = self.greedy_pass(False, candidate_h)
+        # also try alternate ordering (small->big) to capture different filling patterns
+        # run a second pass with remaining_items reversed and pick the better of the two
+        sim2_area, sim2_placed, sim2_layer_h, sim2_free, largest2, checks2 = self.greedy_pass(True, candidate_h)
+        # pick the better simulation by score (area density + free-area bonus)
+        floor_area = self.truck.L * self.truck.W
+        score1 = (sim_area / max(sim_layer_h, 1e-6)) + 0.5 * (largest_free / floor_area) - 0.05 * (len(sim_free))
+        score2 = (sim2_area / max(sim2_layer_h, 1e-6)) + 0.5 * (largest2 / floor_area) - 0.05 * (len(sim2_free))
+        # support checks travel with the result so counts from pool workers are not lost
+        if score2 > score1:
+            return sim2_area, sim2_placed, sim2_layer_h, sim2_free, largest2, len(sim2_free), checks1 + checks2
+        return sim_area, sim_placed, sim_layer_h, sim_free, largest_free, len(sim_free), checks1 + checks2
+
+def _shelf_bound(truck, flags, items: List[Item], shelf_h):
+    # Upper bound on the volume _shelf_pack can load at `shelf_h`: the items short enough
+    # for a shelf whose footprint fits, capped by the shelves' floor area x tallest such
+    # item and, with max_payload, by a fractional knapsack on volume per kg.
+    shelves = int(max(1, min(int(truck.H // shelf_h), int(MAX_LAYERS))))
+    rot = getattr(flags, 'orientation_allowed', True)
+    fit = [it for it in items if it.H <= shelf_h + EPS and it.H <= truck.H + EPS and
+           any(L <= truck.L + EPS and W <= truck.W + EPS for L, W in (_orientations(it) if rot else [(it.L, it.W)]))]
+    if not fit:
+        return 0.0
+    bound = shelves * truck.L * truck.W * max(it.H for it in fit)
+    if not flags.max_payload:
+        return min(bound, sum(it.vol for it in fit))
+    vol, room = 0.0, truck.payload_kg + EPS
+    for it in sorted(fit, key=lambda it: -it.vol / max(it.weight, EPS)):
+        if it.weight <= room:
+            vol += it.vol; room -= it.weight
+        else:
+            vol += it.vol * room / it.weight
+            break
+    return min(bound, vol)
+
+def _shelf_pack(job):
+    # Fallback layout with fixed shelf heights: every shelf starts from an empty floor and
+    # takes the items (in pack's order) that fit below its height. A module-level function
+    # on one tuple so an executor can run the heights in parallel; returns
+    # (placements, weight, volume, support checks).
+    truck, flags, items_sorted, shelf_h = job
+    sim_placed = []
+    sim_weight = 0.0
+    z0 = 0.0
+    checks = 0
+    done = set()
+    short = [it for it in items_sorted if it.H <= shelf_h + EPS]
+    shelves = int(max(1, min(int(truck.H // shelf_h), int(MAX_LAYERS))))
+    for s in range(shelves):
+        free_rects = FreeRects(truck.L, truck.W)
+        # tops of earlier shelves; items added on this shelf sit above z0 so the index stays valid
+        surface = SurfaceIndex(sim_placed, z0, tol=EPS)
+        for it in short:
+            if it.id in done: continue
+            if z0 + it.H > truck.H + EPS: continue
+            if not ((not flags.max_payload) or (sim_weight + it.weight <= truck.payload_kg + EPS)): continue
+            orientations = _orientations(it) if getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
+            for (L,W) in orientations:
+                if L > truck.L + EPS or W > truck.W + EPS: continue
+                # best-fit
+                chosen_idx = free_rects.best_fit(L, W)
+                if chosen_idx < 0: continue
+                x0,y0 = free_rects.rect(chosen_idx)[:2]; x1,y1 = x0+L, y0+W
+                # stacking constraints: shelf above ground must be supported by previous shelf placements
+                if s > 0:
+                    required_fraction = max(SUPPORT_RATIO_CARTON if it.weight < 18 else SUPPORT_RATIO_STANDARD if it.weight < 70 else SUPPORT_RATIO_HEAVY, SUPPORT_MIN_FRACTION, 0.30)
+                    support_need = L*W*required_fraction
+                    # consider sim_placed items exactly at z0
+                    checks += 1
+                    got = surface.support_area(x0, y0, x1, y1, tol=EPS)
+                    if got + EPS < support_need:
+                        # center fallback
+                        cx=(x0+x1)/2.0; cy=(y0+y1)/2.0
+                        center_supported = surface.covers_point(cx, cy, tol=EPS)
+                        if not center_supported or got < support_need * 0.20:
+                            free_rects.requeue(chosen_idx); continue
+                # accept
+                p = Placement(it.id, x0, y0, z0, L, W, it.H, it.weight, it.drop_order, it.fragile, it.stack_limit)
+                sim_placed.append(p)
+                done.add(it.id)
+                sim_weight += it.weight
+                # split every free rect under the box and drop contained rects
+                free_rects.place(chosen_idx, L, W)
+                break
+        z0 += shelf_h
+    vol_used_s = sum(p.L*p.W*p.H for p in sim_placed)
+    return sim_placed, sim_weight, vol_used_s, checks
+
+@dataclass
+class LayerCheckpoint:
+    # pack() state at the start of a layer: the layers below are final and the layer is laid
+    # on an empty floor over their tops at z, so this is all a resumed pack needs
+    z: float
+    layers_done: int
+    max_layers: int
+    placed: List[Placement]
+    total_weight: float
 
+def pack_order(items: List[Item], respect_order=False, engine=PACK_ENGINE):
+    # The sequence pack() works through; two inputs with the same pack_order give the same layout.
+    if engine == "heightmap":
+        return heightmap_order(items, respect_order)
+    if respect_order:
+        return list(items)
     # Prefer smaller heights first so packer can form multiple thin layers.
     # Tie-break by larger footprint to fill area within each thin layer.
-    items_sorted = sorted(
-        items,
-        key=lambda i: (i.H, -(i.L * i.W), -i.weight, -i.stack_limit)
-    )
+    return sorted(items, key=lambda i: (i.H, -(i.L * i.W), -i.weight, -i.stack_limit))
 
-    placed: List[Placement] = []
-    total_weight = 0.0
-    z = 0.0
-    layers_done = 0
+def pack(truck, flags, items: List[Item], executor=None, respect_order=False, engine=PACK_ENGINE, deadline=None,
+         checkpoints=None, resume=None):
+    # `executor` (optional concurrent.futures executor) evaluates each layer's candidate
+    # heights concurrently; the chosen layout is identical to the serial run.
+    # `respect_order` keeps the caller's order (e.g. a GA permutation) as the placement
+    # priority instead of re-sorting by height/footprint.
+    # `engine="heightmap"` packs on a GRID_STEP height map instead of flat layers/shelves.
+    # `deadline` (deadline.Deadline): once it expires each remaining layer evaluates only the
+    # candidate heights already done (at least one) and the shelf fallback is skipped, so a
+    # complete layout still comes back.
+    # `checkpoints` (a list) receives a LayerCheckpoint at the start of every layer; it is
+    # emptied again when the shelf fallback replaces the layered layout. `resume` continues
+    # from such a checkpoint with `items` as the items still to load, in any order: the layers
+    # below it are kept and the shelf fallback is not retried. Resuming with the remaining
+    # items in their original order reproduces the original layout.
+    metrics.count("pack_calls")
+    if engine == "heightmap":
+        if resume is not None:
+            raise ValueError("the heightmap engine has no layer checkpoints")
+        return pack_heightmap(truck, flags, items, respect_order=respect_order, deadline=deadline)
+    lane_w = (truck.W / 2.0) - 0.01
+    items_sorted = pack_order(items, respect_order)
 
-    def can_add_weight(w):
-        return (not flags.max_payload) or (total_weight + w <= truck.payload_kg + EPS)
+    if resume is None:
+        # dynamic max layers: bounded by config and by smallest item height to avoid too many tiny layers
+        min_item_h = min((it.H for it in items), default=0.1)
+        max_layers = max(1, min(int(MAX_LAYERS), max(1, int(truck.H / max(min_item_h, 0.05)))))
+        placed: List[Placement] = []
+        total_weight = 0.0
+        z = 0.0
+        layers_done = 0
+    else:
+        max_layers = resume.max_layers
+        placed = list(resume.placed)
+        total_weight = resume.total_weight
+        z = resume.z
+        layers_done = resume.layers_done
+    placed_ids = {p.id for p in placed}
 
     while layers_done < max_layers and z + EPS < truck.H:
         # For this layer, try several candidate layer heights and pick the one
         # that yields the most area packed (more area -> better chance to stack above).
-        remaining_items = [it for it in items_sorted if not any(p.id == it.id for p in placed) and z + it.H <= truck.H + EPS]
+        remaining_items = [it for it in items_sorted if it.id not in placed_ids and z + it.H <= truck.H + EPS]
         if not remaining_items:
             break
+        if checkpoints is not None:
+            checkpoints.append(LayerCheckpoint(z, layers_done, max_layers, list(placed), total_weight))
 
         # Collect candidate heights: most frequent heights + quantiles
         height_counts = {}
@@ -67,231 +299,41 @@ def pack(truck, flags, items: List[Item]):
         if not candidates:
             break
 
-        # helper to simulate packing for a candidate height (does not modify global placed)
-        def merge_free_rects(rects):
-            # simple merge: if two rects share edge and have same extent in the other axis, merge into one
-            changed = True
-            rects = [r.copy() for r in rects]
-            while changed:
-                changed = False
-                out = []
-                used = [False]*len(rects)
-                for i,a in enumerate(rects):
-                    if used[i]: continue
-                    merged = a.copy()
-                    for j,b in enumerate(rects):
-                        if i==j or used[j]: continue
-                        # merge horizontally if y and W equal and x adjacent
-                        if abs(merged['y'] - b['y']) < EPS and abs(merged['W'] - b['W']) < EPS:
-                            if abs(merged['x'] + merged['L'] - b['x']) < EPS:
-                                merged['L'] += b['L']; used[j]=True; changed=True
-                            elif abs(b['x'] + b['L'] - merged['x']) < EPS:
-                                merged['L'] += b['L']; merged['x'] = b['x']; used[j]=True; changed=True
-                        # merge vertically if x and L equal and y adjacent
-                        if abs(merged['x'] - b['x']) < EPS and abs(merged['L'] - b['L']) < EPS:
-                            if abs(merged['y'] + merged['W'] - b['y']) < EPS:
-                                merged['W'] += b['W']; used[j]=True; changed=True
-                            elif abs(b['y'] + b['W'] - merged['y']) < EPS:
-                                merged['W'] += b['W']; merged['y'] = b['y']; used[j]=True; changed=True
-                    out.append(merged); used[i]=True
-                rects = out
-            return rects
-
-        def simulate_layer(candidate_h):
-            sim_free = [{"x": 0.0, "y": 0.0, "L": truck.L, "W": truck.W}]
-            sim_placed = []
-            sim_area = 0.0
-            sim_layer_h = 0.0
-            # iterate through remaining items in the same sorted order
-            for it in remaining_items:
-                if it.H > candidate_h + EPS:
-                    continue
-                # same checks as real packer
-                if not can_add_weight(it.weight):
-                    continue
-                orientations = _orientations(it) if getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
-                for (L, W) in orientations:
-                    if L > truck.L + EPS or W > truck.W + EPS:
-                        continue
-                    # find best-fit free rect
-                    chosen_idx = None
-                    best_left = None
-                    for ri, r in enumerate(sim_free):
-                        if L <= r["L"] + EPS and W <= r["W"] + EPS:
-                            left = (r["L"] * r["W"]) - (L * W)
-                            if best_left is None or left < best_left:
-                                best_left = left
-                                chosen_idx = ri
-                    if chosen_idx is None:
-                        continue
-                    r = sim_free.pop(chosen_idx)
-                    x0, y0 = r["x"], r["y"]
-                    x1, y1 = x0 + L, y0 + W
-                    # stacking checks against actual placed (previous layers)
-                    if z > 0:
-                        base_need_ratio = (SUPPORT_RATIO_CARTON if it.weight < 18 else SUPPORT_RATIO_STANDARD if it.weight < 70 else SUPPORT_RATIO_HEAVY)
-                        # be slightly stricter on required fraction to avoid hanging items
-                        required_fraction = max(base_need_ratio, SUPPORT_MIN_FRACTION, 0.30)
-                        support_need = L * W * required_fraction
-                        got = 0.0
-                        for q in placed:
-                            # accept support from items whose top is very near the target z (tolerance)
-                            if abs((q.z + q.H) - z) > 0.05:
-                                continue
-                            ox, oy = max(x0, q.x), max(y0, q.y)
-                            ex, ey = min(x1, q.x + q.L), min(y1, q.y + q.W)
-                            if ex > ox and ey > oy:
-                                got += (ex - ox) * (ey - oy)
-                                if got + EPS >= support_need:
-                                    break
-                        if got + EPS < support_need:
-                            # fallback: if the center point of the footprint is supported by some item below,
-                            # allow only when there is at least a minimal contact area (e.g. 25% of required)
-                            cx = (x0 + x1) / 2.0
-                            cy = (y0 + y1) / 2.0
-                            center_supported = False
-                            for q in placed:
-                                if abs((q.z + q.H) - z) > EPS:
-                                    continue
-                                if (q.x - EPS) <= cx < (q.x + q.L + EPS) and (q.y - EPS) <= cy < (q.y + q.W + EPS):
-                                    center_supported = True
-                                    break
-                            if not center_supported or got < support_need * 0.25:
-                                sim_free.append(r)
-                                continue
-                    # accept placement in simulation
-                    sim_placed.append((it, x0, y0, candidate_h, L, W))
-                    sim_area += L * W
-                    sim_layer_h = max(sim_layer_h, it.H)
-                    # split rects - ensure top rect uses the original rect's L (not the placed L)
-                    xr = {"x": x1, "y": y0, "L": r["L"] - L, "W": r["W"]}
-                    yt = {"x": x0, "y": y1, "L": r["L"], "W": r["W"] - W}
-                    if xr["L"] > EPS and xr["W"] > EPS:
-                        sim_free.append(xr)
-                    if yt["L"] > EPS and yt["W"] > EPS:
-                        sim_free.append(yt)
-                    # cleanup contained rects
-                    cleaned = []
-                    for a in sim_free:
-                        contained = False
-                        for b in sim_free:
-                            if a is b:
-                                continue
-                            if (a["x"] + a["L"] <= b["x"] + b["L"] + EPS and
-                                a["y"] + a["W"] <= b["y"] + b["W"] + EPS and
-                                a["x"] >= b["x"] - EPS and
-                                a["y"] >= b["y"] - EPS):
-                                contained = True
-                                break
-                        if not contained:
-                            cleaned.append(a)
-                    sim_free = cleaned
+        layer = _LayerSim(truck, flags, z, placed, remaining_items, total_weight)
+        # past the deadline the pool may still be busy with heights of a cut layer; evaluate
+        # this layer's first height in-process instead of queueing behind them
+        if executor is None or (deadline is not None and deadline.expired()):
+            sims = []
+            for c in candidates:
+                if sims and stop(deadline, "pack_heights"):
                     break
-            # compute largest free rect area and number of fragments
-            merged = merge_free_rects(sim_free)
-            largest_free = 0.0
-            for r in merged:
-                largest_free = max(largest_free, r['L'] * r['W'])
-            # also try alternate ordering (small->big) to capture different filling patterns
-            # run a second pass with remaining_items reversed and pick the better of the two
-            sim2_free = [{"x": 0.0, "y": 0.0, "L": truck.L, "W": truck.W}]
-            sim2_placed = []
-            sim2_area = 0.0
-            sim2_layer_h = 0.0
-            for it in reversed(remaining_items):
-                if it.H > candidate_h + EPS:
-                    continue
-                if not can_add_weight(it.weight):
-                    continue
-                orientations = _orientations(it) if getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
-                for (L, W) in orientations:
-                    if L > truck.L + EPS or W > truck.W + EPS:
-                        continue
-                    chosen_idx = None
-                    best_left = None
-                    for ri, r in enumerate(sim2_free):
-                        if L <= r["L"] + EPS and W <= r["W"] + EPS:
-                            left = (r["L"] * r["W"]) - (L * W)
-                            if best_left is None or left < best_left:
-                                best_left = left
-                                chosen_idx = ri
-                    if chosen_idx is None:
-                        continue
-                    r = sim2_free.pop(chosen_idx)
-                    x0, y0 = r["x"], r["y"]
-                    x1, y1 = x0 + L, y0 + W
-                    if z > 0:
-                        base_need_ratio = (SUPPORT_RATIO_CARTON if it.weight < 18 else SUPPORT_RATIO_STANDARD if it.weight < 70 else SUPPORT_RATIO_HEAVY)
-                        required_fraction = max(base_need_ratio, SUPPORT_MIN_FRACTION, 0.30)
-                        support_need = L * W * required_fraction
-                        got = 0.0
-                        for q in placed:
-                            if abs((q.z + q.H) - z) > 0.05:
-                                continue
-                            ox, oy = max(x0, q.x), max(y0, q.y)
-                            ex, ey = min(x1, q.x + q.L), min(y1, q.y + q.W)
-                            if ex > ox and ey > oy:
-                                got += (ex - ox) * (ey - oy)
-                                if got + EPS >= support_need:
-                                    break
-                        if got + EPS < support_need:
-                            cx = (x0 + x1) / 2.0
-                            cy = (y0 + y1) / 2.0
-                            center_supported = False
-                            for q in placed:
-                                if abs((q.z + q.H) - z) > EPS:
-                                    continue
-                                if (q.x - EPS) <= cx < (q.x + q.L + EPS) and (q.y - EPS) <= cy < (q.y + q.W + EPS):
-                                    center_supported = True
-                                    break
-                            if not center_supported or got < support_need * 0.25:
-                                sim2_free.append(r)
-                                continue
-                    sim2_placed.append((it, x0, y0, candidate_h, L, W))
-                    sim2_area += L * W
-                    sim2_layer_h = max(sim2_layer_h, it.H)
-                    xr = {"x": x1, "y": y0, "L": r["L"] - L, "W": r["W"]}
-                    yt = {"x": x0, "y": y1, "L": r["L"], "W": r["W"] - W}
-                    if xr["L"] > EPS and xr["W"] > EPS:
-                        sim2_free.append(xr)
-                    if yt["L"] > EPS and yt["W"] > EPS:
-                        sim2_free.append(yt)
-                    # cleanup contained rects
-                    cleaned = []
-                    for a in sim2_free:
-                        contained = False
-                        for b in sim2_free:
-                            if a is b:
-                                continue
-                            if (a["x"] + a["L"] <= b["x"] + b["L"] + EPS and
-                                a["y"] + a["W"] <= b["y"] + b["W"] + EPS and
-                                a["x"] >= b["x"] - EPS and
-                                a["y"] >= b["y"] - EPS):
-                                contained = True
-                                break
-                        if not contained:
-                            cleaned.append(a)
-                    sim2_free = cleaned
-                    break
-            merged2 = merge_free_rects(sim2_free)
-            largest2 = 0.0
-            for r in merged2:
-                largest2 = max(largest2, r['L'] * r['W'])
-            # pick the better simulation by score (area density + free-area bonus)
-            floor_area = truck.L * truck.W
-            score1 = (sim_area / max(sim_layer_h, 1e-6)) + 0.5 * (largest_free / floor_area) - 0.05 * (len(sim_free))
-            score2 = (sim2_area / max(sim2_layer_h, 1e-6)) + 0.5 * (largest2 / floor_area) - 0.05 * (len(sim2_free))
-            if score2 > score1:
-                return sim2_area, sim2_placed, sim2_layer_h, sim2_free, largest2, len(sim2_free)
-            return sim_area, sim_placed, sim_layer_h, sim_free, largest_free, len(sim_free)
+                sims.append(layer.simulate(c))
+        elif deadline is None or deadline.end is None:
+            # candidates only read `layer`; results come back in candidate order, so the
+            # winner below is the same as in a serial run
+            sims = list(executor.map(layer.simulate, candidates))
+        else:
+            # same, but only the candidates finished by the deadline (at least one) count
+            futs = [executor.submit(layer.simulate, c) for c in candidates]
+            done, _ = wait(futs, timeout=deadline.timeout())
+            if not done:
+                done, _ = wait(futs, return_when=FIRST_COMPLETED)
+            if len(done) < len(futs):
+                deadline.mark("pack_heights")
+                for f in futs:
+                    f.cancel()
+            sims = [f.result() for f in futs if f in done]
+            candidates = [c for c, f in zip(candidates, futs) if f in done]
+        metrics.count("candidate_heights", len(candidates))
+        metrics.count("support_checks", sum(sim[6] for sim in sims))
 
         # Evaluate candidates and pick the one with maximum area density (area / height) to encourage thin layers.
         best_candidate = None
         best_score = -1.0
         best_sim = None
         floor_area = truck.L * truck.W
-        for c in candidates:
-            area, sim_placed, sim_layer_h, sim_free, largest_free, num_free = simulate_layer(c)
+        for c, sim in zip(candidates, sims):
+            area, sim_placed, sim_layer_h, sim_free, largest_free, num_free, _ = sim
             if sim_layer_h <= EPS:
                 continue
             density = area / sim_layer_h
@@ -305,19 +347,20 @@ def pack(truck, flags, items: List[Item]):
         if best_sim is None or best_sim[0] <= EPS:
             break
 
-        # Commit best_sim placements to actual placed list and update free_rects accordingly
+        # Commit best_sim placements to actual placed list
         _, sim_placed, sim_layer_h, sim_free, largest_free, num_free = best_sim
-        # reuse the sim_free as the starting free rects for next iteration (converted to real list)
-        free_rects = merge_free_rects(sim_free)
+        metrics.count("layers")
+        metrics.count("free_rects", num_free)
         layer_h_max = sim_layer_h
         placed_this_layer = 0
         for it, x0, y0, ch, L, W in sim_placed:
             p = Placement(it.id, x0, y0, z, L, W, it.H, it.weight, it.drop_order, it.fragile, it.stack_limit)
             placed.append(p)
+            placed_ids.add(it.id)
             total_weight += it.weight
             placed_this_layer += 1
 
-        print(f"[LAYER] z={z:.2f}m  placed={placed_this_layer}  layer_h={layer_h_max:.2f}m")
+        metrics.log(f"[LAYER] z={z:.2f}m  placed={placed_this_layer}  layer_h={layer_h_max:.2f}m")
         if placed_this_layer == 0 or layer_h_max <= EPS:
             break
 
@@ -334,63 +377,8 @@ def pack(truck, flags, items: List[Item]):
     vol_util = vol_used / (vol_total + EPS)
 
     # condition to try shelf fallback: only one layer OR utilization low (<20%)
-    if len({round(p.z,6) for p in placed}) <= 1 or vol_util < 0.20:
-        def shelf_pack_with_height(shelf_h):
-            sim_placed = []
-            sim_weight = 0.0
-            z0 = 0.0
-            shelves = int(max(1, min(int(truck.H // shelf_h), int(MAX_LAYERS))))
-            for s in range(shelves):
-                free_rects = [{"x":0.0, "y":0.0, "L":truck.L, "W":truck.W}]
-                for it in items_sorted:
-                    if any(p.id == it.id for p in sim_placed): continue
-                    if it.H > shelf_h + EPS: continue
-                    if z0 + it.H > truck.H + EPS: continue
-                    if not ((not flags.max_payload) or (sim_weight + it.weight <= truck.payload_kg + EPS)): continue
-                    orientations = _orientations(it) if getattr(flags, 'orientation_allowed', True) else [(it.L, it.W)]
-                    for (L,W) in orientations:
-                        if L > truck.L + EPS or W > truck.W + EPS: continue
-                        # best-fit
-                        chosen_idx=None; best_left=None
-                        for ri,r in enumerate(free_rects):
-                            if L <= r['L'] + EPS and W <= r['W'] + EPS:
-                                left = (r['L']*r['W']) - (L*W)
-                                if best_left is None or left < best_left: best_left=left; chosen_idx=ri
-                        if chosen_idx is None: continue
-                        r = free_rects.pop(chosen_idx)
-                        x0,y0 = r['x'], r['y']; x1,y1 = x0+L, y0+W
-                        # stacking constraints: shelf above ground must be supported by previous shelf placements
-                        if s > 0:
-                            required_fraction = max(SUPPORT_RATIO_CARTON if it.weight < 18 else SUPPORT_RATIO_STANDARD if it.weight < 70 else SUPPORT_RATIO_HEAVY, SUPPORT_MIN_FRACTION, 0.30)
-                            support_need = L*W*required_fraction
-                            got = 0.0
-                            # consider sim_placed items exactly at z0
-                            for q in sim_placed:
-                                if abs((q.z + q.H) - z0) > EPS: continue
-                                ox,oy = max(x0,q.x), max(y0,q.y); ex,ey = min(x1, q.x+q.L), min(y1, q.y+q.W)
-                                if ex>ox and ey>oy: got += (ex-ox)*(ey-oy);
-                            if got + EPS < support_need:
-                                # center fallback
-                                cx=(x0+x1)/2.0; cy=(y0+y1)/2.0; center_supported=False
-                                for q in sim_placed:
-                                    if abs((q.z + q.H) - z0) > EPS: continue
-                                    if (q.x - EPS) <= cx < (q.x + q.L + EPS) and (q.y - EPS) <= cy < (q.y + q.W + EPS): center_supported=True; break
-                                if not center_supported or got < support_need * 0.20:
-                                    free_rects.append(r); continue
-                        # accept
-                        p = Placement(it.id, x0, y0, z0, L, W, it.H, it.weight, it.drop_order, it.fragile, it.stack_limit)
-                        sim_placed.append(p)
-                        sim_weight += it.weight
-                        # split
-                        xr={"x":x1, "y":y0, "L":r['L']-L, "W":r['W']}
-                        yt={"x":x0, "y":y1, "L":r['L'], "W":r['W']-W}
-                        if xr['L']>EPS and xr['W']>EPS: free_rects.append(xr)
-                        if yt['L']>EPS and yt['W']>EPS: free_rects.append(yt)
-                        break
-                z0 += shelf_h
-            vol_used_s = sum(p.L*p.W*p.H for p in sim_placed)
-            return sim_placed, sim_weight, vol_used_s
-
+    if resume is None and (len({round(p.z,6) for p in placed}) <= 1 or vol_util < 0.20):
+        metrics.count("shelf_fallbacks")
         # candidate shelf heights (meters): try thin shelves first
         candidate_shelves = [0.25, 0.30, 0.35, 0.40, 0.50]
         # include minimal and median item heights
@@ -400,11 +388,39 @@ def pack(truck, flags, items: List[Item]):
                 candidate_shelves += [max(0.05, hs[0]), hs[max(0, len(hs)//2)]]
         except Exception:
             pass
+        candidate_shelves = list(dict.fromkeys(candidate_shelves))
+
+        # Heights whose volume bound cannot beat the best utilization so far are skipped;
+        # the rest are packed (in parallel with an executor) and the winner is picked in
+        # candidate order as before, so the result matches trying every height.
+        bounds = [_shelf_bound(truck, flags, items_sorted, sh) / (vol_total + EPS) for sh in candidate_shelves]
+        results = {}
+        if executor is None:
+            best_util = vol_util
+            for k in sorted(range(len(candidate_shelves)), key=lambda k: -bounds[k]):
+                if bounds[k] <= best_util + 1e-6:
+                    metrics.count("shelf_pruned", len(candidate_shelves) - len(results))
+                    break
+                if stop(deadline, "pack_shelves"):
+                    break
+                results[k] = _shelf_pack((truck, flags, items_sorted, candidate_shelves[k]))
+                best_util = max(best_util, results[k][2] / (vol_total + EPS))
+        elif not (deadline is not None and deadline.stop("pack_shelves")):
+            live = [k for k in range(len(candidate_shelves)) if bounds[k] > vol_util + 1e-6]
+            metrics.count("shelf_pruned", len(candidate_shelves) - len(live))
+            futs = {executor.submit(_shelf_pack, (truck, flags, items_sorted, candidate_shelves[k])): k for k in live}
+            done, _ = wait(futs, timeout=None if deadline is None else deadline.timeout())
+            if len(done) < len(futs):
+                deadline.mark("pack_shelves")
+                for f in futs:
+                    f.cancel()
+            results = {futs[f]: f.result() for f in done}
+        metrics.count("support_checks", sum(r[3] for r in results.values()))
 
         best_shelf_res = (placed, total_weight, vol_used)
         best_shelf_util = vol_util
-        for sh in candidate_shelves:
-            sim_placed, sim_weight, vol_used_s = shelf_pack_with_height(sh)
+        for k in sorted(results):
+            sim_placed, sim_weight, vol_used_s, _ = results[k]
             util = vol_used_s / (vol_total + EPS)
             if util > best_shelf_util + 1e-6:
                 best_shelf_util = util
@@ -413,5 +429,7 @@ def pack(truck, flags, items: List[Item]):
         # if shelf strategy improved utilization, return its result
         if best_shelf_util > vol_util + 1e-6:
             sim_placed, sim_weight, vol_used_s = best_shelf_res
+            if checkpoints is not None:
+                checkpoints.clear()
             return sim_placed, sim_weight
     return placed, total_weight
@@ -1,32 +1,145 @@
-from ortools.sat.python import cp_model
-from .config import ALPHA_VOL, BETA_WT
+import numpy as np
+from .config import ALPHA_VOL, BETA_WT, SELECT_TIME_LIMIT, SELECT_WORKERS, SELECT_DROP_WEIGHT, SELECT_SLACK, SELECT_SEED
+from .config import SELECT_WALL_FACTOR, SELECT_COUNT_BONUS
+from .models import ItemTable
+from .instrument import metrics
 
-def select_subset(items, truck, max_keep=180):
-    scored = []
+def heuristic_scores(tab: ItemTable, truck):
     lane_w = truck.W / 2.0 - 0.01
 
-    for it in items:
-        # footprint score: prefer items that fit lane width nicely
-        footprint_eff = min(it.W, lane_w) * min(it.L, truck.L)
+    # footprint score: prefer items that fit lane width nicely
+    footprint_eff = np.minimum(tab.W, lane_w) * np.minimum(tab.L, truck.L)
 
-        # stacking score: prefer items that have moderate height
-        height_eff = 1.0 / (1.0 + abs(it.H - 0.45))  # peak around 0.45m
+    # stacking score: prefer items that have moderate height
+    height_eff = 1.0 / (1.0 + np.abs(tab.H - 0.45))  # peak around 0.45m
 
-        # weight penalty to avoid overweight bottom-layer dominance
-        weight_eff = 1.0 / (1.0 + it.weight / 40.0)
+    # weight penalty to avoid overweight bottom-layer dominance
+    weight_eff = 1.0 / (1.0 + tab.weight / 40.0)
 
-        # final score (tuned from real load planning heuristics)
-        score = (
-            (it.L * it.W * it.H) * 1.0 +   # volume
-            footprint_eff * 0.8 +
-            height_eff * 0.6 +
-            weight_eff * 0.4 -
-            it.fragile * 0.3
-        )
+    # final score (tuned from real load planning heuristics)
+    return (
+        (tab.L * tab.W * tab.H) * 1.0 +   # volume
+        footprint_eff * 0.8 +
+        height_eff * 0.6 +
+        weight_eff * 0.4 -
+        tab.fragile * 0.3
+    )
 
-        scored.append((score, it))
+def _hint(tab, rank, max_keep, cap_vol, cap_wt):
+    # heuristic ranking made feasible: walk the ranking, keep items while both capacities allow
+    keep, vol, wt = [], 0.0, 0.0
+    for i in rank.tolist():
+        if len(keep) >= max_keep:
+            break
+        if vol + tab.vol[i] <= cap_vol and wt + tab.weight[i] <= cap_wt:
+            keep.append(i); vol += tab.vol[i]; wt += tab.weight[i]
+    return keep
 
-    scored.sort(key=lambda x: x[0], reverse=True)
+def _cpsat_select(tab, score, rank, max_keep, cap_vol, cap_wt, time_limit, workers, drop_weight, wall_limit=None):
+    # Multi-constraint 0/1 knapsack: maximise the summed heuristic score (plus an optional
+    # drop-order priority and SELECT_COUNT_BONUS per item, so spare capacity is filled with
+    # candidates rather than left empty) under the volume, payload and pool-size limits,
+    # warm-started from the feasible heuristic ranking. Returns (selected indices or None, optimal).
+    # The search is reproducible: fixed seed, effort capped in deterministic time, and
+    # several workers interleaved instead of racing (a race can pick a different optimum
+    # among ties). The wall clock only stops it at SELECT_WALL_FACTOR times the effort cap
+    # (an overloaded host; logged) or at `wall_limit` (from a deadline; such a run is marked
+    # cut short and is not cached).
+    from ortools.sat.python import cp_model
 
-    # keep top N best candidates
-    return [x[1] for x in scored[:max_keep]]
+    value = score + SELECT_COUNT_BONUS
+    if drop_weight and len(tab):
+        span = max(1, int(tab.drop_order.max() - tab.drop_order.min()))
+        value += drop_weight * (tab.drop_order - tab.drop_order.min()) / span
+    # CP-SAT is integer-only: cm^3, units of 10 g and thousandths of score
+    vol_i = np.ceil(tab.vol * 1e6).astype(np.int64)
+    wt_i = np.ceil(tab.weight * 100).astype(np.int64)
+    val_i = np.round(value * 1000).astype(np.int64)
+
+    model = cp_model.CpModel()
+    x = [model.NewBoolVar(f"x{i}") for i in range(len(tab))]
+    model.Add(sum(int(v) * xi for v, xi in zip(vol_i, x)) <= int(cap_vol * 1e6))
+    model.Add(sum(int(w) * xi for w, xi in zip(wt_i, x)) <= int(cap_wt * 100))
+    model.Add(sum(x) <= max_keep)
+    model.Maximize(sum(int(v) * xi for v, xi in zip(val_i, x)))
+    hint = set(_hint(tab, rank, max_keep, cap_vol, cap_wt))
+    for i, xi in enumerate(x):
+        model.AddHint(xi, 1 if i in hint else 0)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_deterministic_time = float(time_limit)
+    safety = SELECT_WALL_FACTOR * float(time_limit)
+    solver.parameters.max_time_in_seconds = safety if wall_limit is None else min(safety, float(wall_limit))
+    solver.parameters.random_seed = SELECT_SEED
+    solver.parameters.num_workers = max(1, int(workers))
+    if workers > 1:
+        solver.parameters.interleave_search = True
+    status = solver.Solve(model)
+    metrics.count(f"select_{solver.StatusName(status).lower()}")
+    if status != cp_model.OPTIMAL and solver.WallTime() >= safety:
+        metrics.log(f"[WARN] CP-SAT stopped on the {safety:.1f}s wall-clock cap before its effort cap; "
+                    f"the selection may differ between runs")
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, False
+    # best incumbent, optimal or the one held when the time limit expired
+    return [i for i in range(len(tab)) if solver.BooleanValue(x[i])], status == cp_model.OPTIMAL
+
+def select_subset(items, truck, max_keep=180, method="cpsat", time_limit=SELECT_TIME_LIMIT,
+                  workers=SELECT_WORKERS, drop_weight=SELECT_DROP_WEIGHT, deadline=None, slack=SELECT_SLACK):
+    # `items` is a list of Item or an ItemTable; the result has the same type, in heuristic
+    # rank order. method="heuristic" keeps the top `max_keep` by score; "cpsat" solves the
+    # knapsack above within `time_limit` deterministic seconds against the truck's volume
+    # and payload times `slack`, so the pool never holds more than that (it may hold fewer
+    # than `max_keep` items), and falls back to the ranking if OR-Tools is missing or finds
+    # no solution in time. A `deadline` adds a wall-clock cap (expired: ranking).
+    tab = items if isinstance(items, ItemTable) else ItemTable.from_items(items)
+    score = heuristic_scores(tab, truck)
+    # keep top N best candidates (stable, so ties keep input order)
+    rank = np.argsort(-score, kind="stable")
+    keep = rank[:max_keep]
+    capped = deadline is not None and deadline.end is not None
+    wall_limit = max(0.0, deadline.remaining()) if capped else None
+    if method == "cpsat" and capped and wall_limit <= 0:
+        deadline.mark("select_subset")
+    elif method == "cpsat":
+        cap_vol = truck.L * truck.W * truck.H * slack
+        try:
+            chosen, optimal = _cpsat_select(tab, score, rank, max_keep, cap_vol, truck.payload_kg * slack,
+                                            time_limit, workers, drop_weight, wall_limit)
+            # not optimal with the deadline gone: stopped on the wall clock, not the effort cap
+            if capped and not optimal and deadline.expired():
+                deadline.mark("select_subset")
+        except ImportError:
+            metrics.log("[INFO] OR-Tools not installed; using the heuristic ranking")
+            chosen = None
+        if chosen is not None:
+            pos = np.empty(len(tab), dtype=np.int64)
+            pos[rank] = np.arange(len(tab))
+            keep = np.array(sorted(chosen, key=lambda i: pos[i]), dtype=np.intp)
+    if isinstance(items, ItemTable):
+        return tab.take(keep)
+    return [items[i] for i in keep.tolist()]
+
+def lane_candidates(tab: ItemTable, truck, lane_pct=70, limit=260, min_pool=150, min_h=0.0):
+    # Adaptive lane-aware prefilter: indices of items that fit a lane sized at the
+    # `lane_pct` percentile of item widths, in drop-sequence/column order. Falls back to
+    # the `min_pool` largest footprints when too few items qualify. Returns (indices, lane).
+    widths = np.where(tab.can_rotate != 0, np.minimum(tab.L, tab.W), tab.W)
+    lane = float(np.percentile(widths, lane_pct))
+    lane = min(lane, truck.W / 1.95)  # never exceed ~half-truck width
+
+    fits = (tab.W <= lane) & (tab.L <= truck.L)
+    fits |= (tab.can_rotate != 0) & (tab.L <= lane) & (tab.W <= truck.L)
+    eligible = np.flatnonzero(fits & (tab.H <= truck.H) & (tab.H >= min_h))
+
+    area = tab.L * tab.W
+    # sort to form stable columns and maintain drop-sequence (last key is primary)
+    e = eligible
+    eligible = e[np.lexsort((-tab.stack_limit[e], -area[e], -tab.H[e], -tab.drop_order[e]))]
+
+    # guarantee sufficient pool size
+    if len(eligible) < min_pool:
+        eligible = np.argsort(-area, kind="stable")[:min_pool]
+    if limit is not None:
+        eligible = eligible[:limit]
+    return eligible, lane
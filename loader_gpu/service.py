@@ -0,0 +1,264 @@
+import argparse, asyncio, io, json, math, os, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qsl
+import pandas as pd
+from .config import TruckSpec, Flags, SERVICE_PORT, SERVICE_WORKERS, SERVICE_QUEUE, SERVICE_MAX_BODY
+from .config import SERVICE_DEADLINE, SERVICE_MAX_DEADLINE, SERVICE_LIMITS
+from .instrument import metrics
+
+# Resident pack service: an asyncio HTTP front end (TCP or Unix socket) over a pool of
+# warm worker processes. POST /pack takes a manifest as JSON
+#   {"items": [{"id": ..., "length_mm": ..., ...}], "options": {...}, "truck": {...}, "flags": {...}}
+# or as CSV text (Content-Type: text/csv, options in the query string), with the columns of
+# an items CSV and `options` named like main_gpu's arguments. The reply carries the
+# placements (PlacementTable columns) and the report; nothing is written to disk except
+# the pack cache. At most workers + queue requests are accepted at a time, later ones get
+# 503 with Retry-After; every request runs under a deadline (SERVICE_DEADLINE unless it
+# sets a shorter one) and numeric options are kept within SERVICE_LIMITS, so one request
+# occupies one worker for a bounded time. GET /health and GET /stats report on the service.
+
+# main_gpu options a request may not set: outputs the service does not write, other modes
+# (and their settings), and pools or paths of the server's own
+_REJECTED = ("items", "fleet", "fleet_catalog", "fleet_workers", "fleet_fill", "fleet_objective", "fleet_out",
+             "choose_truck", "truck_objective", "writer", "render", "layout_npy", "pack_workers", "pack_pool",
+             "cache_dir")
+
+_DEFAULTS = None    # main_gpu argument defaults, per worker
+_CHOICES = {}       # allowed values of main_gpu's choice arguments
+_CACHE = None       # per-worker ResultCache
+
+def _warm():
+    # worker initializer: import the pipeline and pack a tiny manifest once, so the first
+    # request does not pay for imports and first-call setup
+    global _DEFAULTS, _CACHE
+    from .main_gpu import build_parser, items_from_frame, pack_manifest
+    from .cache import ResultCache
+    metrics.verbose = False
+    parser = build_parser()
+    _DEFAULTS = parser.parse_args(["--items", "-"])
+    _CHOICES.update({a.dest: a.choices for a in parser._actions if a.choices})
+    _CACHE = ResultCache(_DEFAULTS.cache_dir) if _DEFAULTS.cache else None
+    tab = items_from_frame(pd.DataFrame({"L_m": [0.4] * 6, "W_m": [0.3] * 6, "H_m": [0.2] * 6}))
+    args = argparse.Namespace(**dict(vars(_DEFAULTS), use_ga=0, use_ortools=0, cache=0))
+    pack_manifest(tab, TruckSpec(), Flags(), args, _deadline(args))
+
+def _deadline(args):
+    from .deadline import Deadline
+    return Deadline(args.deadline or None)
+
+def _options(options):
+    # request options -> main_gpu arguments, typed like their defaults and within the
+    # service's limits
+    args = vars(_DEFAULTS).copy()
+    args["deadline"] = SERVICE_DEADLINE
+    for name, value in options.items():
+        if name in _REJECTED:
+            raise ValueError(f"option {name!r} cannot be set on the service")
+        if name not in args:
+            raise ValueError(f"unknown option {name!r}")
+        default = args[name]
+        if value is None and default is not None:
+            raise ValueError(f"{name} needs a value")
+        try:
+            args[name] = value if default is None else type(default)(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"{name} must be a {type(default).__name__}, not {value!r}")
+        if name in _CHOICES and args[name] not in _CHOICES[name]:
+            raise ValueError(f"{name} must be one of {', '.join(_CHOICES[name])}")
+        if isinstance(default, (int, float)):
+            low, high = SERVICE_LIMITS.get(name, (0, math.inf))
+            if not (math.isfinite(args[name]) and low <= args[name] <= high):
+                raise ValueError(f"{name} must be in [{low}, {high}]" if math.isfinite(high)
+                                 else f"{name} must be a finite number >= {low}")
+    if not 0 < args["deadline"] <= SERVICE_MAX_DEADLINE:
+        raise ValueError(f"deadline must be in (0, {SERVICE_MAX_DEADLINE}] seconds")
+    return argparse.Namespace(**args)
+
+def pack_request(payload):
+    # one /pack request, run in a worker process; ValueError means a bad request
+    from .main_gpu import items_from_frame, pack_manifest
+    from .cache import placements_to_json
+    args = _options(payload.get("options") or {})
+    try:
+        truck = TruckSpec(**payload.get("truck", {}))
+        flags = Flags(**payload.get("flags", {}))
+    except TypeError as e:
+        raise ValueError(str(e))
+    if "csv" in payload:
+        df = pd.read_csv(io.StringIO(payload["csv"]))
+    elif payload.get("items"):
+        df = pd.DataFrame(payload["items"])
+    else:
+        raise ValueError("no items in the request")
+    try:
+        tab = items_from_frame(df)
+    except KeyError as e:
+        raise ValueError(f"missing column {e}")
+    metrics.reset()
+    metrics.enabled = bool(args.instrument)
+    placed, total_w, report = pack_manifest(tab, truck, flags, args, _deadline(args),
+                                            _CACHE if args.cache else None)
+    if metrics.enabled:
+        report["instrumentation"] = metrics.report()
+    return {"placements": placements_to_json(placed), "total_weight": total_w, "report": report}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class PackService:
+    def __init__(self, workers=SERVICE_WORKERS, queue=SERVICE_QUEUE, max_body=SERVICE_MAX_BODY):
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue
+        self.max_body = max_body
+        self.pool = None
+        self.pending = 0
+        self.stats = {"served": 0, "rejected": 0, "failed": 0, "busy_seconds": 0.0}
+
+    async def start(self):
+        # spawn and warm every worker before the first request is accepted; workers come from
+        # a fork server so a replacement pool does not inherit open client connections
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm,
+                                        mp_context=mp.get_context(method))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers)))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 with keep-alive, one request at a time per connection
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                raw = headers.get("content-length", "0") or "0"
+                if not (raw.isascii() and raw.isdigit()):
+                    await self._reply(writer, 400, {"error": "Content-Length must be a non-negative integer"},
+                                      close=True)
+                    break
+                length = int(raw)
+                if length > self.max_body:
+                    await self._reply(writer, 413, {"error": f"body over {self.max_body} bytes"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, reply, extra = await self.route(method, target, headers, body)
+                close = headers.get("connection", "").lower() == "close"
+                await self._reply(writer, status, reply, extra, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # a request or header line over the stream limit
+            try:
+                await self._reply(writer, 400, {"error": "request line or header too long"}, close=True)
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"ok": True, "workers": self.workers, "pending": self.pending}, None
+        if url.path == "/stats":
+            return 200, dict(self.stats, pending=self.pending, capacity=self.capacity), None
+        if url.path != "/pack":
+            return 404, {"error": f"no route {url.path}"}, None
+        if method != "POST":
+            return 405, {"error": "POST a manifest to /pack"}, None
+        if self.pending >= self.capacity:
+            self.stats["rejected"] += 1
+            return 503, {"error": "queue full"}, {"Retry-After": "1"}
+        try:
+            if headers.get("content-type", "").split(";")[0] == "text/csv":
+                payload = {"csv": body.decode(), "options": dict(parse_qsl(url.query))}
+            else:
+                payload = json.loads(body or b"{}")
+                if not isinstance(payload, dict):
+                    raise ValueError("expected a JSON object")
+        except (ValueError, UnicodeDecodeError) as e:
+            return 400, {"error": f"unreadable body: {e}"}, None
+        self.pending += 1
+        t0 = time.perf_counter()
+        pool = self.pool
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, pack_request, payload)
+        except ValueError as e:
+            self.stats["failed"] += 1
+            return 400, {"error": str(e)}, None
+        except BrokenProcessPool:
+            # a worker died (e.g. killed for memory): the first request to see it starts a fresh
+            # pool for the next requests
+            self.stats["failed"] += 1
+            if pool is self.pool:
+                pool.shutdown(wait=False)
+                await self.start()
+            return 500, {"error": "worker process died"}, None
+        except Exception as e:
+            self.stats["failed"] += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}, None
+        finally:
+            self.pending -= 1
+            self.stats["busy_seconds"] += time.perf_counter() - t0
+        self.stats["served"] += 1
+        result["seconds"] = round(time.perf_counter() - t0, 4)
+        return 200, result, None
+
+    async def _reply(self, writer, status, reply, extra=None, close=False):
+        data = json.dumps(reply).encode()
+        head = [f"HTTP/1.1 {status} {_REASONS[status]}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", f"Connection: {'close' if close else 'keep-alive'}"]
+        head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+        await writer.drain()
+
+async def serve(host="127.0.0.1", port=SERVICE_PORT, socket_path=None, workers=SERVICE_WORKERS, queue=SERVICE_QUEUE):
+    service = PackService(workers, queue)
+    await service.start()
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        where = socket_path
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        where = f"http://{host}:{port}"
+    print(f"[INFO] Pack service on {where}: {service.workers} warm workers, queue {queue}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def main():
+    ap = argparse.ArgumentParser(description="Resident pack service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=SERVICE_PORT)
+    ap.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    ap.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    ap.add_argument("--queue", type=int, default=SERVICE_QUEUE)
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket, args.workers, args.queue))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import bisect
+from typing import List
+import numpy as np
+from .models import Item, Placement, sku_key
+from .spatial import SurfaceIndex
+from .freespace import FreeRects
+from .packer_cpu import _orientations
+from .instrument import metrics
+from .config import (
+    SUPPORT_RATIO_CARTON,
+    SUPPORT_RATIO_STANDARD,
+    SUPPORT_RATIO_HEAVY,
+    SUPPORT_MIN_FRACTION,
+)
+
+EPS = 1e-9
+# tops within this distance below a floor support boxes on it (as in packer_cpu)
+SUPPORT_TOL = 0.05
+# free rectangles tried per floor and orientation before moving up
+FIT_CANDIDATES = 8
+
+def _crosses(p, z):
+    # box p stands at or passes through height z
+    return p.z <= z + EPS and p.z + p.H > z + EPS
+
+class _Floor:
+    # A height z where boxes can stand (the truck floor or the top of a placed box): the free
+    # rectangles at z, without the boxes standing at or passing through z, and the tops
+    # under it. Boxes higher up (overhangs) are checked when a box is placed.
+    def __init__(self, truck, z, placed):
+        self.z = z
+        self.free = FreeRects(truck.L, truck.W)
+        self.surface = SurfaceIndex(placed, z, tol=SUPPORT_TOL)
+        for p in placed:
+            if _crosses(p, z):
+                self.free.occupy(p.x, p.y, p.L, p.W)
+
+def _supported(surface, weight, x0, y0, L, W):
+    # same acceptance rule as the layer simulation in packer_cpu.pack
+    if surface.z <= EPS:
+        return True
+    base_need_ratio = (SUPPORT_RATIO_CARTON if weight < 18 else SUPPORT_RATIO_STANDARD if weight < 70 else SUPPORT_RATIO_HEAVY)
+    support_need = L * W * max(base_need_ratio, SUPPORT_MIN_FRACTION, 0.30)
+    got = surface.support_area(x0, y0, x0 + L, y0 + W, tol=SUPPORT_TOL, need=support_need)
+    if got + EPS >= support_need:
+        return True
+    return surface.covers_point(x0 + L / 2.0, y0 + W / 2.0, tol=EPS) and got >= support_need * 0.25
+
+class PackSession:
+    # Incremental packer for items that arrive (or are cancelled) while a truck is loaded.
+    # The layer packer's free rectangles and support surfaces are kept per floor height:
+    # each placed box opens a floor at its top and is cut out of the free space of the
+    # floors it passes through. A new box goes to the lowest floor with a best-fit
+    # rectangle where it is supported and clear of boxes above; the existing load is never
+    # moved or recomputed. Payload is enforced cumulatively.
+    def __init__(self, truck, flags):
+        self.truck, self.flags = truck, flags
+        self.floors: List[_Floor] = [_Floor(truck, 0.0, [])]
+        self.placed = {}            # item id -> (Item, Placement), in placement order
+        self.total_weight = 0.0
+        self._boxes = None          # (n, 6) x0, y0, z0, x1, y1, z1 of the load, built on demand
+        # SKU type -> version of the load when a carton of that type found no place; until
+        # the load changes, an identical carton would fail the same way
+        self.version = 0
+        self._failed = {}
+
+    @classmethod
+    def from_placements(cls, truck, flags, items: List[Item], placed: List[Placement]):
+        # Continue from an existing layout (any engine); `items` supplies the Item records
+        # of the placed ids.
+        s = cls(truck, flags)
+        by_id = {it.id: it for it in items}
+        for p in placed:
+            s.placed[p.id] = (by_id[p.id], p)
+            s.total_weight += p.weight
+        s._rebuild()
+        return s
+
+    def placements(self) -> List[Placement]:
+        return [p for _, p in self.placed.values()]
+
+    def __len__(self):
+        return len(self.placed)
+
+    def __contains__(self, item_id):
+        return item_id in self.placed
+
+    def add(self, it: Item):
+        # place one item; returns its Placement, or None when it does not fit anywhere
+        if it.id in self.placed:
+            raise ValueError(f"item {it.id!r} is already placed")
+        if self.flags.max_payload and self.total_weight + it.weight > self.truck.payload_kg + EPS:
+            metrics.count("session_rejects")
+            return None
+        key = sku_key(it)
+        if self._failed.get(key) == self.version:
+            metrics.count("session_rejects")
+            return None
+        orientations = _orientations(it) if getattr(self.flags, 'orientation_allowed', True) else [(it.L, it.W)]
+        for f in self.floors:
+            if f.z + it.H > self.truck.H + EPS:
+                break
+            if f.z > EPS and not len(f.surface):
+                continue
+            for L, W in orientations:
+                if L > f.free.max_l + EPS or W > f.free.max_w + EPS:
+                    continue
+                # best fit first; unsupported rectangles or pockets under an overhang fall
+                # through to the next candidate
+                for i in f.free.fitting(L, W)[:FIT_CANDIDATES]:
+                    x0, y0 = f.free.rect(i)[:2]
+                    metrics.count("support_checks")
+                    if _supported(f.surface, it.weight, x0, y0, L, W) and self._clear(x0, y0, f.z, L, W, it.H):
+                        return self._commit(it, Placement(it.id, x0, y0, f.z, L, W, it.H, it.weight,
+                                                          it.drop_order, it.fragile, it.stack_limit))
+        self._failed[key] = self.version
+        metrics.count("session_rejects")
+        return None
+
+    def add_many(self, items: List[Item], respect_order=False):
+        # Place a batch, by default in pack()'s order (short, large footprint first).
+        # Returns (placements, items that did not fit).
+        if not respect_order:
+            items = sorted(items, key=lambda i: (i.H, -(i.L * i.W), -i.weight, -i.stack_limit))
+        placed, rejected = [], []
+        for it in items:
+            p = self.add(it)
+            if p is None:
+                rejected.append(it)
+            else:
+                placed.append(p)
+        return placed, rejected
+
+    def _clear(self, x0, y0, z, L, W, H):
+        # no box standing above z (over an overhang) reaches into the new box
+        if self._boxes is None:
+            self._boxes = np.array([(q.x, q.y, q.z, q.x + q.L, q.y + q.W, q.z + q.H)
+                                    for q in self.placements()], dtype=np.float64).reshape(-1, 6)
+        b = self._boxes
+        hit = ((b[:, 2] > z + EPS) & (b[:, 2] < z + H - EPS) & (b[:, 0] < x0 + L - EPS) &
+               (b[:, 3] > x0 + EPS) & (b[:, 1] < y0 + W - EPS) & (b[:, 4] > y0 + EPS))
+        return not hit.any()
+
+    def _commit(self, it, p):
+        self.placed[it.id] = (it, p)
+        self.total_weight += it.weight
+        self._boxes = None
+        self.version += 1
+        top = p.z + p.H
+        for f in self.floors:
+            if _crosses(p, f.z):
+                f.free.occupy(p.x, p.y, p.L, p.W)
+            elif f.z >= top - EPS:
+                f.surface.add(p)
+        self._open_floor(top)
+        return p
+
+    def _open_floor(self, top):
+        # a top just under an existing floor already supports boxes there
+        zs = [f.z for f in self.floors]
+        k = bisect.bisect_left(zs, top - EPS)
+        if k < len(zs) and zs[k] <= top + SUPPORT_TOL:
+            return
+        if top >= self.truck.H - EPS:
+            return
+        self.floors.insert(k, _Floor(self.truck, top, self.placements()))
+
+    def remove(self, item_id):
+        # Un-place a cancelled item. Boxes that lose their support are un-placed too and
+        # returned as Items (pass them to add()/add_many() to load them again).
+        if item_id not in self.placed:
+            raise KeyError(item_id)
+        it, p = self.placed.pop(item_id)
+        gone, displaced = [p], []
+        # support only comes from below: settle the load bottom-up
+        for z in sorted({q.z for _, q in self.placed.values() if q.z > p.z + EPS}):
+            surface = SurfaceIndex(self.placements(), z, tol=SUPPORT_TOL)
+            for pid, (jt, q) in list(self.placed.items()):
+                if abs(q.z - z) <= EPS and not _supported(surface, jt.weight, q.x, q.y, q.L, q.W):
+                    del self.placed[pid]
+                    gone.append(q)
+                    displaced.append(jt)
+        self.total_weight -= sum(q.weight for q in gone)
+        self._boxes = None
+        self.version += 1
+        self._refresh(gone)
+        metrics.count("session_displaced", len(displaced))
+        return displaced
+
+    def _refresh(self, gone):
+        # Free space cannot be handed back to a FreeRects: re-derive the floors the removed
+        # boxes passed through or supported, and close floors nothing stands on any more.
+        placed = self.placements()
+        floors = []
+        for f in self.floors:
+            if any(_crosses(q, f.z) or 0 <= f.z - (q.z + q.H) <= SUPPORT_TOL + EPS for q in gone):
+                f = _Floor(self.truck, f.z, placed)
+                if f.z > EPS and not len(f.surface) and not any(abs(q.z - f.z) <= EPS for q in placed):
+                    continue
+            floors.append(f)
+        self.floors = floors
+
+    def _rebuild(self):
+        placed = self.placements()
+        zs = sorted({0.0} | {q.z for q in placed})
+        self.floors = [_Floor(self.truck, z, placed) for z in zs]
+        for top in sorted({q.z + q.H for q in placed}):
+            self._open_floor(top)
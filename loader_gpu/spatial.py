@@ -0,0 +1,70 @@
+import math
+
+EPS = 1e-9
+
+class SurfaceIndex:
+    # Uniform grid over the top faces of placements resting at height `z`.
+    # Built once per layer/shelf so support checks only visit boxes under a footprint
+    # instead of scanning every placement. Matches are returned in insertion order so
+    # the accumulated support area is bit-identical to a linear scan.
+    def __init__(self, placements, z, tol=0.05, cell=0.25):
+        self.z = z
+        self.cell = cell
+        self.tol = tol
+        self.tops = []      # (top, x0, y0, x1, y1) per indexed placement
+        self.cells = {}
+        for q in placements:
+            self.add(q)
+
+    def add(self, q):
+        # index one more placement if its top is at z; later additions come later in order
+        top = q.z + q.H
+        if abs(top - self.z) > self.tol:
+            return False
+        k = len(self.tops)
+        x1, y1 = q.x + q.L, q.y + q.W
+        self.tops.append((top, q.x, q.y, x1, y1))
+        for key in self._keys(q.x - EPS, q.y - EPS, x1 + EPS, y1 + EPS):
+            self.cells.setdefault(key, []).append(k)
+        return True
+
+    def __len__(self):
+        return len(self.tops)
+
+    def _keys(self, x0, y0, x1, y1):
+        c = self.cell
+        for i in range(int(math.floor(x0 / c)), int(math.floor(x1 / c)) + 1):
+            for j in range(int(math.floor(y0 / c)), int(math.floor(y1 / c)) + 1):
+                yield (i, j)
+
+    def under(self, x0, y0, x1, y1):
+        # indices of indexed tops whose cells intersect the footprint, in insertion order
+        if not self.tops:
+            return []
+        hits = set()
+        for key in self._keys(x0, y0, x1, y1):
+            hits.update(self.cells.get(key, ()))
+        return sorted(hits)
+
+    def support_area(self, x0, y0, x1, y1, tol=0.05, need=None):
+        got = 0.0
+        for k in self.under(x0, y0, x1, y1):
+            top, qx0, qy0, qx1, qy1 = self.tops[k]
+            if abs(top - self.z) > tol:
+                continue
+            ox, oy = max(x0, qx0), max(y0, qy0)
+            ex, ey = min(x1, qx1), min(y1, qy1)
+            if ex > ox and ey > oy:
+                got += (ex - ox) * (ey - oy)
+                if need is not None and got + EPS >= need:
+                    break
+        return got
+
+    def covers_point(self, cx, cy, tol=EPS):
+        for k in self.under(cx, cy, cx, cy):
+            top, qx0, qy0, qx1, qy1 = self.tops[k]
+            if abs(top - self.z) > tol:
+                continue
+            if (qx0 - EPS) <= cx < (qx1 + EPS) and (qy0 - EPS) <= cy < (qy1 + EPS):
+                return True
+        return False
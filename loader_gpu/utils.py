@@ -1,8 +1,7 @@
 import csv, json
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from .models import PlacementTable
 
 # Style 1: logistics gradient by drop_order
 STOP_COLORS = {
@@ -20,24 +19,79 @@ def save_layout_csv(placements, path):
         w = csv.DictWriter(f, fieldnames=keys); w.writeheader()
         for p in placements: w.writerow({k:getattr(p,k) for k in keys})
 
+def save_layout_npy(placements, path):
+    # binary twin of save_layout_csv: PlacementTable.to_records() in NumPy's .npy format
+    np.save(path, PlacementTable.from_placements(placements).to_records())
+
+def load_layout_npy(path, mmap=True):
+    # PlacementTable over a .npy layout; with mmap the columns are read-only views of the file
+    return PlacementTable.from_records(np.load(path, mmap_mode="r" if mmap else None))
+
 def save_report_json(rep, path):
     with open(path, "w") as f: json.dump(rep, f, indent=2)
 
-def draw3d(placements, truck, out_png, title=None):
-    fig = plt.figure()
+# corner indices (bit 0 -> +L, bit 1 -> +W, bit 2 -> +H) of the 6 faces of a box
+_FACES = np.array([[0, 1, 3, 2], [4, 5, 7, 6], [0, 1, 5, 4], [2, 3, 7, 6], [1, 3, 7, 5], [0, 2, 6, 4]])
+_CORNERS = np.array([[(c >> 0) & 1, (c >> 1) & 1, (c >> 2) & 1] for c in range(8)], dtype=np.float64)
+
+def box_faces(placements):
+    # (6n, 4, 3) face vertices and (6n, 4) RGBA colours of all boxes, built as arrays
+    tab = PlacementTable.from_placements(placements)
+    origin = np.column_stack([tab.x, tab.y, tab.z])
+    size = np.column_stack([tab.L, tab.W, tab.H])
+    corners = origin[:, None, :] + _CORNERS[None, :, :] * size[:, None, :]     # (n, 8, 3)
+    verts = corners[:, _FACES].reshape(-1, 4, 3)
+    palette = np.array([STOP_COLORS.get(k, (0.5,0.5,0.5,0.5)) for k in range(max(STOP_COLORS) + 1)])
+    stop = tab.drop_order.astype(np.int64)
+    colors = np.where(((stop >= 1) & (stop <= max(STOP_COLORS)))[:, None],
+                      palette[np.clip(stop, 0, max(STOP_COLORS))], (0.5,0.5,0.5,0.5))
+    return verts, np.repeat(colors, 6, axis=0)
+
+def draw3d(placements, truck, out_png, title=None, dpi=150):
+    # All faces go into one Poly3DCollection. matplotlib is imported on first render only
+    # (it is slow to load and not needed otherwise); the pyplot-free Figure lets an
+    # OutputWriter thread render while the caller carries on.
+    from matplotlib.figure import Figure
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+    fig = Figure()
     ax = fig.add_subplot(projection='3d')
     ax.set_xlim(0, truck.L); ax.set_ylim(0, truck.W); ax.set_zlim(0, truck.H)
-    for p in placements:
-        color = STOP_COLORS.get(int(p.drop_order), (0.5,0.5,0.5,0.5))
-        x,y,z = p.x, p.y, p.z; L,W,H=p.L,p.W,p.H
-        X=[x,x+L,x+L,x,x,x+L,x+L,x]; Y=[y,y,y+W,y+W,y,y,y+W,y+W]; Z=[z,z,z,z,z+H,z+H,z+H,z+H]
-        faces=[[(X[0],Y[0],Z[0]),(X[1],Y[1],Z[1]),(X[2],Y[2],Z[2]),(X[3],Y[3],Z[3])],
-               [(X[4],Y[4],Z[4]),(X[5],Y[5],Z[5]),(X[6],Y[6],Z[6]),(X[7],Y[7],Z[7])],
-               [(X[0],Y[0],Z[0]),(X[1],Y[1],Z[1]),(X[5],Y[5],Z[5]),(X[4],Y[4],Z[4])],
-               [(X[2],Y[2],Z[2]),(X[3],Y[3],Z[3]),(X[7],Y[7],Z[7]),(X[6],Y[6],Z[6])],
-               [(X[1],Y[1],Z[1]),(X[2],Y[2],Z[2]),(X[6],Y[6],Z[6]),(X[5],Y[5],Z[5])],
-               [(X[4],Y[4],Z[4]),(X[7],Y[7],Z[7]),(X[3],Y[3],Z[3]),(X[0],Y[0],Z[0])]]
-        ax.add_collection3d(Poly3DCollection(faces, facecolors=[color]*6, edgecolors='k', linewidths=0.2))
+    if placements:
+        verts, colors = box_faces(placements)
+        ax.add_collection3d(Poly3DCollection(verts, facecolors=colors, edgecolors='k', linewidths=0.2))
     ax.set_xlabel("L (m)"); ax.set_ylabel("W (m)"); ax.set_zlabel("H (m)")
     if title: ax.set_title(title)
-    fig.tight_layout(); fig.savefig(out_png, dpi=150); plt.close(fig)
+    fig.tight_layout(); fig.savefig(out_png, dpi=dpi)
+
+class OutputWriter:
+    # Runs output jobs (save_layout_csv, save_report_json, draw3d) synchronously
+    # (mode="sync"), on one background thread ("thread") or in a worker process
+    # ("process"), in submission order. close() waits for them and re-raises the first error.
+    def __init__(self, mode="sync"):
+        self.mode = mode
+        self.pool = None
+        if mode == "thread":
+            self.pool = ThreadPoolExecutor(max_workers=1)
+        elif mode == "process":
+            self.pool = ProcessPoolExecutor(max_workers=1)
+        self.jobs = []
+
+    def submit(self, fn, *args, **kwargs):
+        if self.pool is None:
+            fn(*args, **kwargs)
+        else:
+            self.jobs.append(self.pool.submit(fn, *args, **kwargs))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        for job in self.jobs:
+            job.result()
+        self.jobs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
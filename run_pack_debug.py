@@ -2,20 +2,23 @@
 Debug runner: load items from a CSV and run the packer directly (no GA/ORTools).
 Prints detailed information about layers, placements, and returns a CSV for inspection.
 Run:
-    python3 run_pack_debug.py auto_optimized_truckC_500.csv
+    python3 run_pack_debug.py auto_optimized_truckC_500.csv [--npy]
+--npy also writes the layout as a .npy structured array (loader_gpu.utils.load_layout_npy).
 """
-import sys, csv
+import sys, csv, time
 from loader_gpu.main_gpu import load_items_csv
 from loader_gpu.config import TruckSpec, Flags
 from loader_gpu.packer_cpu import pack
+from loader_gpu.utils import save_layout_npy
 
 if len(sys.argv) < 2:
-    print('Usage: python3 run_pack_debug.py <items.csv>')
+    print('Usage: python3 run_pack_debug.py <items.csv> [--npy]')
     sys.exit(1)
 
 path = sys.argv[1]
+t0 = time.perf_counter()
 items = load_items_csv(path)
-print(f'Loaded {len(items)} items from {path}')
+print(f'Loaded {len(items)} items from {path} in {time.perf_counter() - t0:.3f}s')
 truck = TruckSpec(); flags = Flags()
 try:
     placed, total_w = pack(truck, flags, items)
@@ -49,3 +52,8 @@ with open(out, 'w', newline='') as f:
         if isinstance(row['id'], float): row['id'] = int(row['id'])
         w.writerow(row)
 print('Wrote debug CSV to', out)
+
+if '--npy' in sys.argv[2:]:
+    out_npy = out[:-4] + '.npy'
+    save_layout_npy(placed, out_npy)
+    print('Wrote debug layout to', out_npy)
@@ -0,0 +1,53 @@
+import asyncio, json, os
+import numpy as np
+import pandas as pd
+from loader_gpu import batch
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.main_gpu import build_parser, load_items_csv, pack_manifest
+from loader_gpu.instrument import metrics
+from loader_gpu.deadline import Deadline
+
+def _args(*extra):
+    return build_parser().parse_args(["--items", "-", "--use_ga", "0", "--use_ortools", "0", "--render", "0",
+                                      "--cache", "0", "--verbose", "0", *extra])
+
+def _manifest(path, n, seed):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({"L_m": np.round(rng.uniform(0.3, 0.9, n), 2), "W_m": np.round(rng.uniform(0.3, 0.9, n), 2),
+                  "H_m": np.round(rng.uniform(0.3, 0.9, n), 2),
+                  "weight_kg": rng.integers(5, 60, n)}).to_csv(path, index=False)
+    return str(path)
+
+def test_find_manifests_expands_directories_sorted(tmp_path):
+    d = tmp_path / "m"
+    d.mkdir()
+    for name in ("b.csv", "a.csv", "notes.txt"):
+        (d / name).write_text("")
+    single = tmp_path / "x.csv"
+    assert batch.find_manifests([str(single), str(d)]) == [str(single), str(d / "a.csv"), str(d / "b.csv")]
+
+def test_names_are_unique_per_manifest():
+    assert batch._names(["a/x.csv", "b/x.csv", "c/y.csv", "d/x.csv"]) == ["x", "x_2", "y", "x_3"]
+
+def test_run_batch_matches_single_runs_and_reports_failures(tmp_path):
+    paths = [_manifest(tmp_path / f"m{k}.csv", 40 + 10 * k, k) for k in range(3)]
+    bad = tmp_path / "bad.csv"
+    bad.write_text("not,a,manifest\n1,2,3\n")
+    paths.append(str(bad))
+    args, out = _args(), str(tmp_path / "out")
+    report = asyncio.run(batch.run_batch(paths, args, out, workers=2, jobs=2))
+    metrics.verbose = True
+    assert report["manifests"] == 4 and report["failed"] == 1
+    rows = {r["name"]: r for r in report["results"]}
+    assert "error" in rows["bad"]
+    with open(os.path.join(out, "batch_report.json")) as f:
+        assert json.load(f)["failed"] == 1
+    for k, path in enumerate(paths[:3]):
+        row = rows[f"m{k}"]
+        # same layout as an in-process pack of the manifest
+        placed, _, _ = pack_manifest(load_items_csv(path, table=True), TruckSpec(), Flags(), args, Deadline(None))
+        written = pd.read_csv(os.path.join(out, f"m{k}", "packed_layout.csv"))
+        assert row["placed_items"] == len(placed) == len(written)
+        assert sorted(map(str, written["id"])) == sorted(str(p.id) for p in placed)
+        assert os.path.exists(os.path.join(out, f"m{k}", "report.json"))
+        assert not os.path.exists(os.path.join(out, f"m{k}", "plot3d.png"))
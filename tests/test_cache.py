@@ -0,0 +1,81 @@
+import argparse, dataclasses, os, time
+import numpy as np
+import pytest
+from loader_gpu import config
+from loader_gpu.cache import ResultCache, cache_key, placements_to_json, placements_from_json
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.deadline import Deadline
+from loader_gpu.instrument import metrics
+from loader_gpu.main_gpu import build_parser, load_items_csv, pack_manifest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def tab():
+    return load_items_csv(os.path.join(ROOT, "auto_optimized_truckC_500.csv"), table=True)
+
+@pytest.fixture(autouse=True)
+def quiet():
+    metrics.verbose = False
+    yield
+    metrics.verbose = True
+
+def test_key_covers_items_truck_flags_params_and_config(tab, monkeypatch):
+    base = cache_key(tab, TruckSpec(), Flags(), {"use_ga": 1})
+    assert base == cache_key(tab, TruckSpec(), Flags(), {"use_ga": 1})
+    assert base != cache_key(tab.take(np.arange(len(tab))[::-1]), TruckSpec(), Flags(), {"use_ga": 1})
+    assert base != cache_key(tab, dataclasses.replace(TruckSpec(), L=6.0), Flags(), {"use_ga": 1})
+    assert base != cache_key(tab, TruckSpec(), Flags(axle_balance=True), {"use_ga": 1})
+    assert base != cache_key(tab, TruckSpec(), Flags(), {"use_ga": 0})
+    monkeypatch.setattr(config, "MAX_LAYERS", config.MAX_LAYERS + 1)
+    assert base != cache_key(tab, TruckSpec(), Flags(), {"use_ga": 1})
+    monkeypatch.undo()
+    # the cache's own settings do not change what is cached
+    monkeypatch.setattr(config, "CACHE_MEMORY_ENTRIES", 1)
+    assert base == cache_key(tab, TruckSpec(), Flags(), {"use_ga": 1})
+
+def test_memory_tier_is_lru():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1          # a is now the most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["memory_hits"] == 3 and cache.stats["misses"] == 1
+
+def test_disk_tier_is_shared_and_evicts_least_recently_used(tmp_path):
+    first = ResultCache(tmp_path, max_entries=1)
+    first.put("k1", {"v": "x" * 1000})
+    assert ResultCache(tmp_path).get("k1") == {"v": "x" * 1000}
+    size = (tmp_path / "k1.json").stat().st_size
+    cache = ResultCache(tmp_path, max_bytes=int(2.5 * size))
+    cache.put("k2", {"v": "y" * 1000})
+    old = time.time() - 100
+    os.utime(tmp_path / "k1.json", (old, old))
+    os.utime(tmp_path / "k2.json", (old + 50, old + 50))
+    assert ResultCache(tmp_path).get("k1") is not None     # a disk hit refreshes k1
+    cache.put("k3", {"v": "z" * 1000})
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["k1.json", "k3.json"]
+    assert cache.stats["evictions"] == 1
+
+def test_unreadable_file_is_a_miss(tmp_path):
+    (tmp_path / "bad.json").write_text("{not json")
+    assert ResultCache(tmp_path).get("bad") is None
+
+def _args(**kw):
+    args = build_parser().parse_args(["--items", "-", "--use_ga", "0", "--use_ortools", "0", "--verbose", "0"])
+    return argparse.Namespace(**dict(vars(args), **kw))
+
+def test_pack_manifest_reuses_a_stored_layout(tab):
+    cache = ResultCache()
+    placed, w, report = pack_manifest(tab, TruckSpec(), Flags(), _args(), Deadline(), cache)
+    again, w2, _ = pack_manifest(tab, TruckSpec(), Flags(), _args(), Deadline(), cache)
+    assert cache.stats["stores"] == 1 and cache.stats["memory_hits"] == 1
+    assert placements_to_json(again) == placements_to_json(placed) and w2 == w
+    assert placements_to_json(placements_from_json(placements_to_json(placed))) == placements_to_json(placed)
+
+def test_cut_short_runs_are_not_stored(tab):
+    cache = ResultCache()
+    deadline = Deadline(1e-6)
+    time.sleep(0.01)
+    pack_manifest(tab, TruckSpec(), Flags(), _args(deadline=1e-6), deadline, cache)
+    assert deadline.cut and cache.stats["stores"] == 0
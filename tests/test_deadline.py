@@ -0,0 +1,86 @@
+import os, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pytest
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.deadline import Deadline, shutdown
+from loader_gpu.instrument import metrics
+from loader_gpu.main_gpu import load_items_csv
+from loader_gpu.packer_cpu import pack
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# time a stage may run past its budget: after the deadline every remaining layer still
+# evaluates one candidate height in-process
+SLACK_S = 0.5
+
+@pytest.fixture(autouse=True)
+def quiet():
+    metrics.verbose = False
+    yield
+    metrics.verbose = True
+
+def test_shutdown_past_deadline_does_not_wait_for_running_tasks():
+    executor = ProcessPoolExecutor(max_workers=1)
+    # one running task, the next already handed to the worker's call queue, the rest queued
+    futs = [executor.submit(time.sleep, 30) for _ in range(4)]
+    time.sleep(0.5)
+    procs = list(executor._processes.values())
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    t0 = time.perf_counter()
+    shutdown(executor, deadline)
+    assert time.perf_counter() - t0 < 1.0
+    # queued tasks are cancelled and running ones fail with their worker; none runs its 30 s
+    for p in procs:
+        p.join(5)
+        assert not p.is_alive()
+    t_end = time.perf_counter() + 5
+    while not all(f.done() for f in futs) and time.perf_counter() < t_end:
+        time.sleep(0.05)
+    assert all(f.done() for f in futs)
+    assert futs[-1].cancelled()
+
+def test_shutdown_within_budget_waits():
+    executor = ThreadPoolExecutor(max_workers=1)
+    fut = executor.submit(time.sleep, 0.2)
+    shutdown(executor, Deadline(30))
+    assert fut.done() and not fut.cancelled()
+
+@pytest.mark.parametrize("pool_cls", [ProcessPoolExecutor, ThreadPoolExecutor])
+def test_pack_with_executor_stays_within_deadline(pool_cls):
+    items = load_items_csv(os.path.join(ROOT, "realistic_mix_dataset_2000.csv"))
+    executor = pool_cls(max_workers=2)
+    list(executor.map(abs, [1, 2]))     # start the workers outside the budget
+    budget = 0.5
+    deadline = Deadline(budget)
+    t0 = time.perf_counter()
+    try:
+        placed, _ = pack(TruckSpec(), Flags(), items, executor=executor, deadline=deadline)
+    finally:
+        shutdown(executor, deadline)
+    elapsed = time.perf_counter() - t0
+    assert placed
+    assert deadline.cut
+    assert elapsed < budget + SLACK_S, f"{elapsed:.2f}s for a {budget}s budget"
+
+def test_ga_rescoring_pack_stays_within_deadline():
+    from loader_gpu import ga_numpy
+    items = load_items_csv(os.path.join(ROOT, "realistic_mix_dataset_2000.csv"))
+    ga_numpy._FITNESS.clear()
+    rng = np.random.default_rng(0)
+    cands = [rng.permutation(len(items)).tolist() for _ in range(4)]
+    t0 = time.perf_counter()
+    full = ga_numpy.pick_by_packing(items, TruckSpec(), list(range(len(items))), cands[:1], respect_order=True)
+    full_s = time.perf_counter() - t0
+    ga_numpy._FITNESS.clear()
+    budget = min(0.3, full_s / 4)
+    deadline = Deadline(budget)
+    t0 = time.perf_counter()
+    order = ga_numpy.pick_by_packing(items, TruckSpec(), list(range(len(items))), cands, respect_order=True,
+                                     deadline=deadline)
+    elapsed = time.perf_counter() - t0
+    # the proxy winner comes back, and the cut packs are not memoised as its fitness
+    assert [it.id for it in order] == [it.id for it in items]
+    assert "ga_rescoring" in deadline.cut
+    assert not ga_numpy._FITNESS
+    assert elapsed < budget + SLACK_S, f"{elapsed:.2f}s for a {budget:.2f}s budget ({full_s:.2f}s unbounded)"
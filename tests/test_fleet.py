@@ -0,0 +1,121 @@
+import numpy as np
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.models import Item
+from loader_gpu.packer_cpu import pack
+from loader_gpu.fleet import assign, fits_truck, plan_fleet, vehicle_bound, rank_vehicles, _rank_key
+
+EPS = 1e-6
+SMALL = TruckSpec(name="small", L=2.0, W=1.5, H=1.5, payload_kg=600.0)
+LARGE = TruckSpec(name="large", L=4.0, W=2.0, H=2.0, payload_kg=2000.0)
+
+def _items(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Item(k, *map(float, np.round(rng.uniform(0.3, 0.9, 3), 2)), float(rng.integers(5, 80)),
+                 0, 3, 1, int(rng.integers(1, 6))) for k in range(n)]
+
+def test_assign_respects_counts_bounds_and_partitions_the_items():
+    items = _items(120)
+    catalog = [(SMALL, 3, 1.0), (LARGE, 2, 2.5)]
+    available = [3, 2]
+    trucks, rest = assign(items, catalog, available, fill=0.8)
+    assert available == [3 - sum(t == 0 for t, _ in trucks), 2 - sum(t == 1 for t, _ in trucks)]
+    assert min(available) >= 0
+    ids = [it.id for _, its in trucks for it in its] + [it.id for it in rest]
+    assert sorted(ids) == list(range(120))
+    for t, its in trucks:
+        spec = catalog[t][0]
+        assert sum(it.vol for it in its) <= spec.L * spec.W * spec.H * 0.8 + EPS
+        assert sum(it.weight for it in its) <= spec.payload_kg + EPS
+        assert all(fits_truck(it, spec) for it in its)
+
+def test_assign_closes_with_the_cheapest_type_that_takes_everything():
+    items = _items(5)
+    trucks, rest = assign(items, [(LARGE, 1, 3.0), (SMALL, 1, 1.0)], [1, 1])
+    assert [t for t, _ in trucks] == [1] and not rest
+    # by count every vehicle costs the same: the first type that takes everything wins
+    trucks, _ = assign(items, [(LARGE, 1, 3.0), (SMALL, 1, 1.0)], [1, 1], objective="count")
+    assert [t for t, _ in trucks] == [0]
+
+def test_items_that_fit_no_vehicle_stay_unassigned():
+    tall = Item(99, 0.5, 0.5, 3.0, 10.0, 0, 3, 1, 1)
+    trucks, rest = assign(_items(10) + [tall], [(SMALL, 5, 1.0)], [5])
+    assert [it.id for it in rest] == [99]
+
+def _check_plan(trucks, unplaced, items, catalog):
+    placed_ids = [p.id for tr in trucks for p in tr["placed"]]
+    assert len(placed_ids) == len(set(placed_ids))
+    assert sorted(placed_ids + [it.id for it in unplaced]) == sorted(it.id for it in items)
+    used = {}
+    for tr in trucks:
+        spec = tr["spec"]
+        used[tr["type"]] = used.get(tr["type"], 0) + 1
+        assert {it.id for it in tr["items"]} == {p.id for p in tr["placed"]}
+        assert tr["weight"] <= spec.payload_kg + EPS
+        for p in tr["placed"]:
+            assert p.x + p.L <= spec.L + EPS and p.y + p.W <= spec.W + EPS and p.z + p.H <= spec.H + EPS
+    assert all(used[t] <= catalog[t][1] for t in used)
+
+def test_plan_fleet_places_every_item_once():
+    items = _items(150, seed=1)
+    catalog = [(SMALL, 4, 1.0), (LARGE, 3, 2.5)]
+    trucks, unplaced = plan_fleet(items, catalog, Flags(), workers=1)
+    _check_plan(trucks, unplaced, items, catalog)
+    assert trucks and not unplaced
+
+def test_plan_fleet_is_the_same_with_worker_processes():
+    items = _items(80, seed=2)
+    catalog = [(SMALL, 4, 1.0), (LARGE, 2, 2.5)]
+    serial, left1 = plan_fleet(items, catalog, Flags(), workers=1)
+    parallel, left2 = plan_fleet(items, catalog, Flags(), workers=2)
+    assert [it.id for it in left1] == [it.id for it in left2]
+    assert [(tr["type"], tr["placed"]) for tr in serial] == [(tr["type"], tr["placed"]) for tr in parallel]
+
+def test_plan_fleet_keeps_heavy_loads_within_payload():
+    # weight-bound manifest: each truck must stop at its payload
+    items = [Item(k, 0.4, 0.4, 0.4, 150.0, 0, 3, 1, 1) for k in range(30)]
+    catalog = [(SMALL, 10, 1.0)]
+    trucks, unplaced = plan_fleet(items, catalog, Flags(), workers=1)
+    _check_plan(trucks, unplaced, items, catalog)
+    assert not unplaced and len(trucks) >= 8
+
+def _vol(placed):
+    return sum(p.L * p.W * p.H for p in placed)
+
+def test_vehicle_bound_is_optimistic():
+    items = _items(100, seed=3)
+    for spec in (SMALL, LARGE):
+        _, vol, weight = vehicle_bound(items, spec, Flags())
+        placed, w = pack(spec, Flags(), [it for it in items if fits_truck(it, spec)])
+        assert _vol(placed) <= vol + EPS and w <= weight + EPS
+
+def test_rank_vehicles_prunes_without_changing_the_winner():
+    items = _items(60, seed=4)
+    tiny = TruckSpec(name="tiny", L=1.0, W=1.0, H=0.2, payload_kg=100.0)
+    catalog = [(SMALL, 1, 1.0), (LARGE, 1, 2.5), (TruckSpec(name="huge", L=8.0, W=2.4, H=2.6,
+                payload_kg=9000.0), 1, 6.0), (tiny, 1, 0.5)]
+    for objective in ("cover", "cost", "fill"):
+        rows, packed = rank_vehicles(items, catalog, Flags(), workers=1, objective=objective)
+        by_type = {r["type"]: r for r in rows}
+        assert by_type[3]["status"] == "no_fit" and by_type[3]["rank"] is None
+        ranked = [r for r in rows if r["rank"] is not None]
+        assert [r["rank"] for r in ranked] == list(range(1, len(ranked) + 1))
+        assert set(packed) == {r["type"] for r in ranked}
+        # exhaustive: pack every type that fits something and rank by the same key
+        total = sum(it.vol for it in items)
+        keys = {}
+        for t, (spec, _, cost) in enumerate(catalog[:3]):
+            placed, _ = pack(spec, Flags(), [it for it in items if fits_truck(it, spec)])
+            keys[t] = _rank_key(objective, _vol(placed), spec, cost, total)
+        assert ranked[0]["type"] == min(keys, key=lambda t: (keys[t], t))
+        for r in rows:
+            if r["status"] == "pruned":
+                assert keys[r["type"]] >= keys[ranked[0]["type"]]
+
+def test_rank_vehicles_is_the_same_with_worker_processes():
+    # pruning depends on which packs finish first; the winner and its layout do not
+    items = _items(60, seed=5)
+    catalog = [(SMALL, 1, 1.0), (LARGE, 1, 2.5)]
+    serial, p1 = rank_vehicles(items, catalog, Flags(), workers=1, objective="fill")
+    parallel, p2 = rank_vehicles(items, catalog, Flags(), workers=2, objective="fill")
+    assert serial[0]["type"] == parallel[0]["type"]
+    assert p1[serial[0]["type"]] == p2[parallel[0]["type"]]
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from loader_gpu import freespace
+from loader_gpu.freespace import FreeRects
+
+EPS = 1e-9
+
+def _dict_best_fit(rects, L, W):
+    # the dict-list scan FreeRects replaced: least leftover area, earliest row on ties
+    chosen, best_left = -1, None
+    for i, r in enumerate(rects):
+        if L <= r["L"] + EPS and W <= r["W"] + EPS:
+            left = r["L"] * r["W"] - L * W
+            if best_left is None or left < best_left:
+                chosen, best_left = i, left
+    return chosen
+
+def _dict_merge(rects):
+    # the dict-list merge FreeRects.merged replaced
+    changed = True
+    rects = [r.copy() for r in rects]
+    while changed:
+        changed = False
+        out, used = [], [False] * len(rects)
+        for i, a in enumerate(rects):
+            if used[i]:
+                continue
+            m = a.copy()
+            for j, b in enumerate(rects):
+                if i == j or used[j]:
+                    continue
+                if abs(m["y"] - b["y"]) < EPS and abs(m["W"] - b["W"]) < EPS:
+                    if abs(m["x"] + m["L"] - b["x"]) < EPS:
+                        m["L"] += b["L"]; used[j] = True; changed = True
+                    elif abs(b["x"] + b["L"] - m["x"]) < EPS:
+                        m["L"] += b["L"]; m["x"] = b["x"]; used[j] = True; changed = True
+                if abs(m["x"] - b["x"]) < EPS and abs(m["L"] - b["L"]) < EPS:
+                    if abs(m["y"] + m["W"] - b["y"]) < EPS:
+                        m["W"] += b["W"]; used[j] = True; changed = True
+                    elif abs(b["y"] + b["W"] - m["y"]) < EPS:
+                        m["W"] += b["W"]; m["y"] = b["y"]; used[j] = True; changed = True
+            out.append(m); used[i] = True
+        rects = out
+    return [(r["x"], r["y"], r["L"], r["W"]) for r in rects]
+
+def _random_rows(rng, n, grid=False):
+    if grid:
+        # unit cells of a coarse grid in shuffled order: many equal sizes and shared edges
+        cells = [(float(x), float(y), 1.0, 1.0) for x in range(6) for y in range(4)]
+        return [cells[i] for i in rng.permutation(len(cells))[:n]]
+    return [tuple(map(float, np.round(rng.uniform(0, 3, 4), 2))) for _ in range(n)]
+
+@pytest.mark.parametrize("n", [5, 20, 200])   # scalar and array paths
+def test_best_fit_matches_the_dict_scan(n):
+    rng = np.random.default_rng(n)
+    rows = _random_rows(rng, n)
+    rows += rows[:3]                            # exact ties go to the earlier row
+    fr = FreeRects.from_rows(rows)
+    dicts = [dict(x=x, y=y, L=l, W=w) for x, y, l, w in rows]
+    for L, W in rng.uniform(0, 3.2, (200, 2)):
+        assert fr.best_fit(L, W) == _dict_best_fit(dicts, L, W)
+        fits = fr.fitting(L, W)
+        assert (fits[0] if fits else -1) == fr.best_fit(L, W)
+
+@pytest.mark.parametrize("n", [6, 24])
+def test_merged_matches_the_dict_merge(n):
+    rng = np.random.default_rng(n)
+    rows = _random_rows(rng, n, grid=True)
+    fr = FreeRects.from_rows(rows)
+    want = _dict_merge([dict(x=x, y=y, L=l, W=w) for x, y, l, w in rows])
+    assert np.allclose(fr.merged(), np.array(want).reshape(-1, 4))
+
+def _place_random(fr, rng, k):
+    boxes = []
+    for L, W in rng.uniform(0.2, 1.2, (k, 2)):
+        i = fr.best_fit(L, W)
+        if i < 0:
+            continue
+        x, y = fr.rect(i)[:2]
+        fr.place(i, L, W)
+        boxes.append((x, y, x + L, y + W))
+    return boxes
+
+def test_free_rows_never_overlap_placed_boxes_and_stay_maximal():
+    rng = np.random.default_rng(7)
+    fr = FreeRects(6.0, 2.2)
+    boxes = _place_random(fr, rng, 60)
+    assert len(boxes) > 10
+    rows = fr.rows().tolist()
+    for x, y, l, w in rows:
+        for bx0, by0, bx1, by1 in boxes:
+            assert x + l <= bx0 + 1e-7 or bx1 <= x + 1e-7 or y + w <= by0 + 1e-7 or by1 <= y + 1e-7
+    # no row lies inside another one
+    for a, (ax, ay, al, aw) in enumerate(rows):
+        for b, (bx, by, bl, bw) in enumerate(rows):
+            if a != b:
+                assert not (ax >= bx - EPS and ay >= by - EPS and ax + al <= bx + bl + EPS and ay + aw <= by + bw + EPS)
+    # every free point of the layer is inside some row
+    for px, py in rng.uniform(0, [6.0, 2.2], (2000, 2)):
+        if not any(x0 < px < x1 and y0 < py < y1 for x0, y0, x1, y1 in boxes):
+            assert any(x <= px <= x + l and y <= py <= y + w for x, y, l, w in rows)
+
+def test_scalar_and_array_paths_agree(monkeypatch):
+    runs = []
+    for small in (freespace.SMALL, 0):
+        monkeypatch.setattr(freespace, "SMALL", small)
+        fr = FreeRects(6.0, 2.2)
+        _place_random(fr, np.random.default_rng(3), 80)
+        runs.append(fr.rows().copy())
+    assert runs[0].shape == runs[1].shape and np.array_equal(runs[0], runs[1])
+
+def test_first_fitting_finds_the_first_item_that_fits():
+    fr = FreeRects.from_rows([(0.0, 0.0, 1.0, 0.5)])
+    dims = np.array([[[2.0, 2.0], [2.0, 2.0]], [[0.6, 1.0], [1.0, 0.6]], [[0.4, 0.4], [0.4, 0.4]]])
+    assert fr.first_fitting(dims) == 2
+    assert fr.first_fitting(dims[:2]) == -1
+
+def test_occupy_and_requeue_bump_the_version():
+    fr = FreeRects(4.0, 2.0)
+    v = fr.version
+    fr.occupy(1.0, 0.0, 1.0, 1.0)
+    assert fr.version > v and fr.best_fit(4.0, 2.0) == -1
+    v = fr.version
+    first = fr.rect(0)
+    fr.requeue(0)
+    assert fr.version > v and fr.rect(len(fr) - 1) == first
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from loader_gpu import ga_numpy
+from loader_gpu.config import TruckSpec
+from loader_gpu.instrument import metrics
+from loader_gpu.models import Item
+
+def _items(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Item(i, *map(float, rng.uniform(0.3, 1.0, 3)), float(rng.uniform(5, 60)), 0, 3, 1, int(rng.integers(1, 4)))
+            for i in range(n)]
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.verbose = False
+    metrics.reset()
+    ga_numpy._FITNESS.clear()
+    yield
+    metrics.verbose = True
+
+def test_surrogate_untrusted_when_proxy_ranks_packs_backwards():
+    s = ga_numpy._Surrogate()
+    for x, y in [(1, 5.0), (2, 4.0), (3, 3.5), (4, 2.0), (5, 1.0)]:
+        s.add(x, y)
+    assert s.coef is not None and not s.trusted()
+
+def test_surrogate_trusted_when_proxy_agrees():
+    s = ga_numpy._Surrogate()
+    for x, y in [(1, 1.0), (2, 2.5), (3, 2.9), (4, 4.2), (5, 5.0)]:
+        s.add(x, y)
+    assert s.trusted()
+
+def test_rescoring_never_skips_memoised_candidates():
+    items, truck = _items(), TruckSpec()
+    rng = np.random.default_rng(1)
+    best = list(range(len(items)))
+    cands = [rng.permutation(len(items)).tolist() for _ in range(8)]
+    first = ga_numpy.pick_by_packing(items, truck, best, cands, respect_order=True)
+    packs = metrics.counters.get("ga_real_packs", 0)
+    skips = metrics.counters.get("ga_surrogate_skips", 0)
+    metrics.reset()
+    again = ga_numpy.pick_by_packing(items, truck, best, cands, respect_order=True)
+    # every packed ordering is memoised now: looked up rather than packed or screened again
+    assert metrics.counters.get("ga_real_packs", 0) == 0
+    assert metrics.counters["ga_fitness_hits"] == packs
+    assert metrics.counters.get("ga_surrogate_skips", 0) == skips
+    assert [it.id for it in again] == [it.id for it in first]
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from loader_gpu import ga_numpy
+from loader_gpu.config import TruckSpec
+from loader_gpu.instrument import metrics
+from loader_gpu.models import Item
+
+def _backends():
+    out = [("numpy", ga_numpy, np.asarray)]
+    try:
+        import torch
+        from loader_gpu import ga_gpu
+        out.append(("torch", ga_gpu, lambda a: torch.as_tensor(np.asarray(a), dtype=torch.int64)))
+    except ImportError:
+        pass
+    return out
+
+BACKENDS = _backends()
+
+def _ox(p1, p2, a, b):
+    # scalar order crossover: p1's segment [a, b) in place, the other positions from b on
+    # (wrapping) filled with p2's remaining genes in p2 order
+    n = len(p1)
+    seg = set(p1[a:b])
+    fill = [g for g in p2 if g not in seg]
+    child = list(p1)
+    for k, g in enumerate(fill):
+        child[(b + k) % n] = g
+    return child
+
+def _parents(rng, c, n):
+    p1 = np.stack([rng.permutation(n) for _ in range(c)])
+    p2 = np.stack([rng.permutation(n) for _ in range(c)])
+    cuts = np.sort(rng.integers(0, n, (c, 2)), axis=1)
+    return p1, p2, cuts[:, 0], cuts[:, 1]
+
+@pytest.mark.parametrize("name,mod,conv", BACKENDS, ids=[b[0] for b in BACKENDS])
+def test_order_crossover_children_are_permutations_and_match_scalar_ox(name, mod, conv):
+    rng = np.random.default_rng(0)
+    for n in (2, 5, 37):
+        p1, p2, a, b = _parents(rng, 64, n)
+        child = np.asarray(mod.order_crossover(conv(p1), conv(p2), conv(a), conv(b)))
+        for r in range(len(child)):
+            assert sorted(child[r].tolist()) == list(range(n))
+            assert child[r].tolist() == _ox(p1[r].tolist(), p2[r].tolist(), int(a[r]), int(b[r]))
+
+@pytest.mark.parametrize("name,mod,conv", BACKENDS, ids=[b[0] for b in BACKENDS])
+def test_swap_genes_keeps_permutations(name, mod, conv):
+    rng = np.random.default_rng(1)
+    n = 20
+    pop = np.stack([rng.permutation(n) for _ in range(50)])
+    i, j = rng.integers(0, n, 50), rng.integers(0, n, 50)
+    i[:5] = j[:5]                                   # i == j leaves the row unchanged
+    out = np.asarray(mod.swap_genes(conv(pop.copy()), conv(i), conv(j)))
+    for r in range(len(pop)):
+        assert sorted(out[r].tolist()) == list(range(n))
+        want = pop[r].copy()
+        want[i[r]], want[j[r]] = pop[r, j[r]], pop[r, i[r]]
+        assert out[r].tolist() == want.tolist()
+
+@pytest.mark.parametrize("backend", [b[0] for b in BACKENDS])
+def test_ga_reorder_returns_every_item_once(backend):
+    metrics.verbose = False
+    rng = np.random.default_rng(2)
+    items = [Item(str(k), *map(float, rng.uniform(0.3, 0.9, 3)), float(rng.uniform(5, 50)), 0, 3, 1, 1)
+             for k in range(80)]
+    if backend == "torch":
+        from loader_gpu.ga_gpu import ga_reorder
+    else:
+        from loader_gpu.ga_numpy import ga_reorder
+    order = ga_reorder(items, TruckSpec(), population=16, generations=5)
+    metrics.verbose = True
+    assert sorted(it.id for it in order) == sorted(it.id for it in items)
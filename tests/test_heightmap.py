@@ -0,0 +1,34 @@
+import os
+import pytest
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.heightmap import HeightMap, pack_heightmap
+from loader_gpu.instrument import metrics
+from loader_gpu.main_gpu import load_items_csv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EPS = 1e-6
+
+@pytest.fixture(autouse=True)
+def quiet():
+    metrics.verbose = False
+    yield
+    metrics.verbose = True
+
+def test_find_prefers_the_lowest_flat_window():
+    hm = HeightMap(1.0, 1.0, 0.1)
+    hm.place(0, 0, 5, 10, 0.5)          # raised left half
+    i, j, base = hm.find(5, 5, 0.2, limit_h=2.0, need=1.0)
+    assert base == 0.0 and i >= 5
+
+def test_layout_is_inside_the_truck_and_free_of_overlaps():
+    truck = TruckSpec()
+    items = load_items_csv(os.path.join(ROOT, "auto_optimized_truckC_500.csv"))
+    placed, w = pack_heightmap(truck, Flags(), items)
+    assert placed and w <= truck.payload_kg + EPS
+    for p in placed:
+        assert p.x >= -EPS and p.y >= -EPS and p.z >= -EPS
+        assert p.x + p.L <= truck.L + EPS and p.y + p.W <= truck.W + EPS and p.z + p.H <= truck.H + EPS
+    for k, p in enumerate(placed):
+        for q in placed[k + 1:]:
+            assert (p.x + p.L <= q.x + EPS or q.x + q.L <= p.x + EPS or p.y + p.W <= q.y + EPS
+                    or q.y + q.W <= p.y + EPS or p.z + p.H <= q.z + EPS or q.z + q.H <= p.z + EPS)
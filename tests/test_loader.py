@@ -0,0 +1,77 @@
+import glob, os
+import numpy as np
+import pandas as pd
+import pytest
+from loader_gpu.main_gpu import load_items_csv, iter_item_tables, items_from_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# item manifests shipped with the repo (packed_layout.csv is an output)
+MANIFESTS = [p for p in sorted(glob.glob(os.path.join(ROOT, "*.csv")))
+             if "L_m" in open(p).readline() or "_mm" in open(p).readline()]
+
+def _row_loader(path):
+    # the iterrows() loader the column-wise one replaced (ids aside, see test_ids_are_text)
+    df = pd.read_csv(path)
+    def dim(r, m, mm):
+        return float(r[m]) if m in r and not pd.isna(r[m]) else float(r[mm]) / 1000.0
+    rows = []
+    for _, r in df.iterrows():
+        rows.append((float(r["L_m"]) if "L_m" in df.columns else dim(r, "length_m", "length_mm"),
+                     float(r["W_m"]) if "W_m" in df.columns else dim(r, "width_m", "width_mm"),
+                     float(r["H_m"]) if "H_m" in df.columns else dim(r, "height_m", "height_mm"),
+                     float(r.get("weight_kg", 20.0)), int(r.get("fragile", 0)), int(r.get("stack_limit", 2)),
+                     int(r.get("can_rotate", 1)), int(r.get("drop_order", 1))))
+    return rows
+
+@pytest.mark.parametrize("path", MANIFESTS, ids=os.path.basename)
+def test_fields_match_the_row_loader(path):
+    items = load_items_csv(path)
+    got = [(it.L, it.W, it.H, it.weight, it.fragile, it.stack_limit, it.can_rotate, it.drop_order) for it in items]
+    assert got == _row_loader(path)
+
+@pytest.mark.parametrize("path", MANIFESTS, ids=os.path.basename)
+def test_chunked_stream_equals_one_read(path):
+    whole = load_items_csv(path, table=True)
+    chunked = load_items_csv(path, table=True, chunksize=97)
+    for name, col in whole.columns().items():
+        assert np.array_equal(col, chunked.columns()[name]), name
+
+def test_ids_are_text_and_fall_back_to_item_id_then_row_number(tmp_path):
+    a = tmp_path / "a.csv"
+    a.write_text("id,L_m,W_m,H_m\n1,0.5,0.4,0.3\n2,0.5,0.4,0.3\n")
+    b = tmp_path / "b.csv"
+    b.write_text("item_id,length_mm,width_mm,height_mm\nX1,500,400,300\n")
+    c = tmp_path / "c.csv"
+    c.write_text("L_m,W_m,H_m\n0.5,0.4,0.3\n0.6,0.4,0.3\n0.7,0.4,0.3\n")
+    assert [it.id for it in load_items_csv(a)] == ["1", "2"]
+    assert [it.id for it in load_items_csv(b)] == ["X1"]
+    assert [it.id for it in load_items_csv(c)] == ["0", "1", "2"]
+    assert [t.id.tolist() for t, _ in iter_item_tables(c, chunksize=2)] == [["0", "1"], ["2"]]
+
+def test_meters_fall_back_to_millimetres_per_row_and_defaults_fill_gaps(tmp_path):
+    p = tmp_path / "m.csv"
+    p.write_text("id,length_m,length_mm,width_mm,height_mm,weight_kg,fragile\n"
+                 "1,0.5,,400,300,,1\n2,,650,400,300,12,\n")
+    a, b = load_items_csv(p)
+    assert (a.L, b.L, a.W, a.H) == (0.5, 0.65, 0.4, 0.3)
+    assert (a.weight, b.weight, a.fragile, b.fragile, a.stack_limit, a.can_rotate, a.drop_order) == \
+        (20.0, 12.0, 1, 0, 2, 1, 1)
+
+def test_missing_dimension_is_an_error(tmp_path):
+    p = tmp_path / "bad.csv"
+    p.write_text("id,L_m,W_m\n1,0.5,0.4\n")
+    with pytest.raises(ValueError, match="H column"):
+        load_items_csv(p)
+
+def test_inconsistent_volume_is_reported(tmp_path, capsys):
+    p = tmp_path / "v.csv"
+    p.write_text("id,L_m,W_m,H_m,volume_m3\n1,0.5,0.4,0.3,0.06\n2,0.5,0.4,0.3,60\n")
+    load_items_csv(p)
+    assert "1 rows declare a volume_m3" in capsys.readouterr().out
+
+def test_items_from_frame_matches_the_csv_loader():
+    path = os.path.join(ROOT, "realistic_mix_dataset_2000.csv")
+    tab = items_from_frame(pd.read_csv(path))
+    ref = load_items_csv(path, table=True)
+    for name, col in ref.columns().items():
+        assert np.array_equal(col, tab.columns()[name]), name
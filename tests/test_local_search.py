@@ -0,0 +1,39 @@
+import os
+import pytest
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.instrument import metrics
+from loader_gpu.local_search import local_search
+from loader_gpu.main_gpu import load_items_csv
+from loader_gpu.packer_cpu import pack
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope="module")
+def items():
+    return load_items_csv(os.path.join(ROOT, "auto_optimized_truckC_500.csv"))[:150]
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.verbose = False
+    metrics.reset()
+    yield
+    metrics.verbose = True
+
+def _volume(placed):
+    return sum(p.L * p.W * p.H for p in placed)
+
+def test_without_respect_order_returns_the_plain_pack(items):
+    truck, flags = TruckSpec(), Flags()
+    placed, w = local_search(items, truck, flags, moves=20, respect_order=False)
+    ref, ref_w = pack(truck, flags, items)
+    assert [(p.id, p.x, p.y, p.z) for p in placed] == [(p.id, p.x, p.y, p.z) for p in ref] and w == ref_w
+    assert metrics.counters.get("ls_moves", 0) == 0
+
+def test_moves_never_lose_volume_in_priority_order(items):
+    truck, flags = TruckSpec(), Flags()
+    base, _ = pack(truck, flags, items, respect_order=True)
+    placed, w = local_search(items, truck, flags, moves=20, respect_order=True)
+    assert metrics.counters["ls_moves"] > 0
+    assert _volume(placed) >= _volume(base) - 1e-9
+    assert w <= truck.payload_kg + 1e-6
+    assert len({p.id for p in placed}) == len(placed)
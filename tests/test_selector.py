@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from loader_gpu.config import TruckSpec
+from loader_gpu.models import ItemTable
+from loader_gpu.selector import select_subset, heuristic_scores
+
+pytest.importorskip("ortools")
+
+def _table(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    L, W, H = rng.uniform(0.3, 1.2, n), rng.uniform(0.3, 1.0, n), rng.uniform(0.2, 1.0, n)
+    zeros = np.zeros(n, dtype=np.int64)
+    return ItemTable(np.arange(n), L, W, H, rng.uniform(5, 120, n), zeros, zeros + 3, zeros + 1, zeros + 1)
+
+def test_pool_stays_within_truck_capacity():
+    tab, truck = _table(), TruckSpec()
+    pool = select_subset(tab, truck, max_keep=180, time_limit=0.5)
+    assert len(pool) <= 180
+    assert pool.vol.sum() <= truck.L * truck.W * truck.H + 1e-6
+    assert pool.weight.sum() <= truck.payload_kg + 1e-6
+
+def test_slack_scales_capacity():
+    tab, truck = _table(), TruckSpec()
+    pool = select_subset(tab, truck, max_keep=180, time_limit=0.5, slack=1.5)
+    assert pool.vol.sum() <= 1.5 * truck.L * truck.W * truck.H + 1e-6
+    assert pool.vol.sum() > truck.L * truck.W * truck.H
+
+def test_selection_is_reproducible():
+    tab, truck = _table(seed=1), TruckSpec()
+    runs = {tuple(select_subset(tab, truck, time_limit=0.3).id.tolist()) for _ in range(3)}
+    assert len(runs) == 1
+
+def test_pool_is_in_rank_order():
+    tab, truck = _table(seed=2), TruckSpec()
+    pool = select_subset(tab, truck, time_limit=0.3)
+    scores = heuristic_scores(pool, truck)
+    assert np.all(np.diff(scores) <= 1e-12)
+
+def test_heuristic_method_keeps_top_ranked():
+    tab, truck = _table(seed=3), TruckSpec()
+    pool = select_subset(tab, truck, max_keep=50, method="heuristic")
+    top = np.argsort(-heuristic_scores(tab, truck), kind="stable")[:50]
+    assert pool.id.tolist() == tab.id[top].tolist()
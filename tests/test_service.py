@@ -0,0 +1,73 @@
+import asyncio, json, math
+import pytest
+from loader_gpu import service
+from loader_gpu.config import SERVICE_DEADLINE
+from loader_gpu.instrument import metrics
+
+RECORDS = [{"L_m": 0.5, "W_m": 0.4, "H_m": 0.3, "weight_kg": 10}] * 20
+
+@pytest.fixture(scope="module", autouse=True)
+def defaults():
+    # the worker initializer, run in-process: main_gpu defaults and a warm pipeline
+    service._warm()
+    yield
+    metrics.verbose = True
+
+def test_default_deadline_applies():
+    assert service._options({}).deadline == SERVICE_DEADLINE
+
+@pytest.mark.parametrize("options", [
+    {"ga_population": 0}, {"ga_population": -5}, {"ga_population": 1000}, {"ga_generations": -5},
+    {"select_workers": -5}, {"select_workers": 8}, {"local_search": -5}, {"select_time": -5},
+    {"select_time": math.nan}, {"select_time": math.inf}, {"select_drop_weight": math.nan},
+    {"prefilter_small": -1}, {"use_ga": 2}, {"deadline": 0}, {"deadline": 1000}, {"deadline": math.nan},
+    {"ga_population": "many"}, {"ga_population": math.inf}, {"ga_population": None}, {"engine": "voxels"},
+    {"pack_workers": 8}, {"pack_pool": "thread"}, {"cache_dir": "/tmp/x"}, {"fleet_workers": 64},
+    {"no_such_option": 1},
+])
+def test_bad_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        service._options(options)
+
+def test_options_in_range_are_typed_like_the_defaults():
+    args = service._options({"ga_population": "2", "ga_generations": 0, "select_time": 1, "deadline": 5})
+    assert (args.ga_population, args.ga_generations, args.select_time, args.deadline) == (2, 0, 1.0, 5.0)
+
+def test_pack_request_with_smallest_population():
+    reply = service.pack_request({"items": RECORDS, "options": {"use_ga": 1, "ga_population": 2, "cache": 0}})
+    assert reply["report"]["placed_items"] == len(reply["placements"]["id"]) > 0
+
+def _http(raw):
+    # one request through PackService.handle on a local port, without the worker pool
+    async def run():
+        svc = service.PackService(workers=1, queue=0)
+        server = await asyncio.start_server(svc.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(raw)
+            await writer.drain()
+            data = await reader.read()
+            writer.close()
+        return data
+    data = asyncio.run(run())
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+@pytest.mark.parametrize("length", [b"abc", b"-5", b"1e3"])
+def test_malformed_content_length_is_a_bad_request(length):
+    status, reply = _http(b"POST /pack HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+    assert status == 400 and "Content-Length" in reply["error"]
+
+def test_health_and_unknown_route():
+    assert _http(b"GET /health HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 200
+    assert _http(b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n")[0] == 404
+
+def test_full_queue_answers_503():
+    # no workers to hand the request to: capacity 1 with one request already pending
+    async def run():
+        svc = service.PackService(workers=1, queue=0)
+        svc.pending = 1
+        return await svc.route("POST", "/pack", {}, b"{}")
+    status, _, extra = asyncio.run(run())
+    assert status == 503 and extra == {"Retry-After": "1"}
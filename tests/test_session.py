@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from loader_gpu.config import TruckSpec, Flags
+from loader_gpu.models import Item
+from loader_gpu.packer_cpu import pack
+from loader_gpu.session import PackSession
+
+EPS = 1e-6
+
+def _items(n, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    return [Item(start + k, *map(float, np.round(rng.uniform(0.3, 1.2, 3), 2)), float(rng.integers(5, 60)),
+                 0, 3, 1, int(rng.integers(1, 6))) for k in range(n)]
+
+def _check(truck, placements):
+    # inside the truck and no two boxes overlap
+    for p in placements:
+        assert p.x >= -EPS and p.y >= -EPS and p.z >= -EPS
+        assert p.x + p.L <= truck.L + EPS and p.y + p.W <= truck.W + EPS and p.z + p.H <= truck.H + EPS
+    for k, a in enumerate(placements):
+        for b in placements[k + 1:]:
+            overlap = (min(a.x + a.L, b.x + b.L) - max(a.x, b.x) > EPS and
+                       min(a.y + a.W, b.y + b.W) - max(a.y, b.y) > EPS and
+                       min(a.z + a.H, b.z + b.H) - max(a.z, b.z) > EPS)
+            assert not overlap, (a.id, b.id)
+
+def test_add_places_valid_boxes_and_keeps_the_load():
+    truck, s = TruckSpec(), PackSession(TruckSpec(), Flags())
+    placed, rejected = s.add_many(_items(40))
+    assert len(placed) + len(rejected) == 40 and len(s) == len(placed) > 0
+    before = {p.id: p for p in s.placements()}
+    for it in _items(20, seed=1, start=100):
+        s.add(it)
+    # arrivals never move boxes already loaded
+    assert all(s.placed[i][1] == p for i, p in before.items())
+    _check(truck, s.placements())
+    assert abs(s.total_weight - sum(p.weight for p in s.placements())) < 1e-6
+
+def test_payload_is_enforced_cumulatively():
+    truck = TruckSpec(payload_kg=100.0)
+    s = PackSession(truck, Flags())
+    s.add_many([Item(k, 0.5, 0.5, 0.5, 30.0, 0, 3, 1, 1) for k in range(6)])
+    assert len(s) == 3 and s.total_weight <= truck.payload_kg
+
+def test_duplicate_and_unknown_ids():
+    s = PackSession(TruckSpec(), Flags())
+    it = _items(1)[0]
+    s.add(it)
+    with pytest.raises(ValueError):
+        s.add(it)
+    with pytest.raises(KeyError):
+        s.remove(999)
+
+def test_remove_frees_space_and_returns_unsupported_boxes():
+    truck = TruckSpec(L=1.0, W=1.0, H=2.0)
+    s = PackSession(truck, Flags())
+    base = Item(0, 1.0, 1.0, 0.5, 20.0, 0, 3, 1, 1)
+    top = Item(1, 1.0, 1.0, 0.5, 10.0, 0, 3, 1, 1)
+    assert s.add(base).z == 0.0
+    assert s.add(top).z == pytest.approx(0.5)
+    # the box on top loses its support with the base and is handed back
+    displaced = s.remove(0)
+    assert [it.id for it in displaced] == [1] and len(s) == 0 and s.total_weight == pytest.approx(0.0)
+    # the floor is free again, and the upper floor is gone
+    assert s.add(top).z == 0.0
+    assert s.add(base).z == pytest.approx(0.5)
+
+def test_remove_keeps_boxes_that_are_still_supported():
+    s = PackSession(TruckSpec(), Flags())
+    s.add_many(_items(60, seed=3))
+    ids = [p.id for p in s.placements()]
+    for k in ids[::4]:
+        if k in s:
+            for it in s.remove(k):
+                assert it.id not in s
+    _check(s.truck, s.placements())
+    # the freed space takes new boxes
+    placed, _ = s.add_many(_items(30, seed=4, start=500))
+    assert placed
+    _check(s.truck, s.placements())
+
+def test_from_placements_continues_a_pack_result():
+    truck, flags = TruckSpec(), Flags()
+    items = _items(50, seed=5)
+    placed, _ = pack(truck, flags, items)
+    s = PackSession.from_placements(truck, flags, items, placed)
+    assert len(s) == len(placed)
+    s.add_many(_items(20, seed=6, start=1000))
+    assert {p.id for p in placed} <= {p.id for p in s.placements()}
+    _check(truck, s.placements())
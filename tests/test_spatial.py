@@ -0,0 +1,48 @@
+import numpy as np
+from loader_gpu.models import Placement
+from loader_gpu.spatial import SurfaceIndex
+
+def _boxes(rng, n, z_tops=(0.5, 0.8)):
+    out = []
+    for k in range(n):
+        L, W = rng.uniform(0.2, 1.0, 2)
+        x, y = rng.uniform(0, 5.0), rng.uniform(0, 2.0)
+        top = z_tops[k % len(z_tops)]
+        out.append(Placement(k, float(x), float(y), 0.0, float(L), float(W), top, 10.0, 1, 0, 3))
+    return out
+
+def _linear_support(placed, z, x0, y0, x1, y1, tol=0.05):
+    # the scan over every placement that SurfaceIndex replaces, in the same order
+    got = 0.0
+    for q in placed:
+        if abs(q.z + q.H - z) > tol:
+            continue
+        ox, oy = max(x0, q.x), max(y0, q.y)
+        ex, ey = min(x1, q.x + q.L), min(y1, q.y + q.W)
+        if ex > ox and ey > oy:
+            got += (ex - ox) * (ey - oy)
+    return got
+
+def test_support_area_is_bit_identical_to_a_linear_scan():
+    rng = np.random.default_rng(0)
+    placed = _boxes(rng, 300)
+    index = SurfaceIndex(placed, 0.5)
+    assert len(index) == 150                    # only tops at z are indexed
+    for x0, y0 in rng.uniform(-0.5, 5.5, (300, 2)):
+        L, W = rng.uniform(0.1, 1.5, 2)
+        assert index.support_area(x0, y0, x0 + L, y0 + W) == _linear_support(placed, 0.5, x0, y0, x0 + L, y0 + W)
+
+def test_need_stops_early_but_reaches_it():
+    rng = np.random.default_rng(1)
+    placed = _boxes(rng, 200, z_tops=(0.5,))
+    index = SurfaceIndex(placed, 0.5)
+    full = index.support_area(0.0, 0.0, 5.0, 2.0)
+    part = index.support_area(0.0, 0.0, 5.0, 2.0, need=0.1 * full)
+    assert 0.1 * full <= part + 1e-9 and part <= full
+
+def test_add_and_covers_point():
+    index = SurfaceIndex([], 1.0)
+    assert not index.add(Placement(1, 0.0, 0.0, 0.0, 1.0, 1.0, 0.5, 5.0, 1, 0, 3))     # top at 0.5
+    assert index.add(Placement(2, 2.0, 0.0, 0.5, 1.0, 1.0, 0.5, 5.0, 1, 0, 3))
+    assert index.covers_point(2.5, 0.5) and not index.covers_point(0.5, 0.5)
+    assert index.support_area(1.5, 0.0, 2.5, 1.0) == 0.5
@@ -0,0 +1,54 @@
+import json
+import numpy as np
+import pytest
+from loader_gpu.config import TruckSpec
+from loader_gpu.models import Placement
+from loader_gpu.utils import STOP_COLORS, OutputWriter, box_faces, draw3d, save_report_json
+
+def _placements(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [Placement(k, *map(float, rng.uniform(0, 3, 3)), *map(float, rng.uniform(0.2, 1, 3)),
+                      float(rng.integers(1, 50)), int(rng.integers(0, 8)), 0, 3) for k in range(n)]
+
+def _reference_faces(p):
+    # the six faces the per-box draw3d built, as corner sets
+    x, y, z, L, W, H = p.x, p.y, p.z, p.L, p.W, p.H
+    X = [x, x+L, x+L, x, x, x+L, x+L, x]; Y = [y, y, y+W, y+W, y, y, y+W, y+W]; Z = [z]*4 + [z+H]*4
+    idx = [[0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 5, 4], [2, 3, 7, 6], [1, 2, 6, 5], [4, 7, 3, 0]]
+    return {frozenset((round(X[i], 9), round(Y[i], 9), round(Z[i], 9)) for i in f) for f in idx}
+
+def test_box_faces_match_the_per_box_faces_and_colours():
+    placements = _placements(50)
+    verts, colors = box_faces(placements)
+    assert verts.shape == (300, 4, 3) and colors.shape == (300, 4)
+    for k, p in enumerate(placements):
+        faces = {frozenset(tuple(np.round(v, 9)) for v in face) for face in verts[6 * k:6 * k + 6]}
+        assert faces == _reference_faces(p)
+        expected = STOP_COLORS.get(int(p.drop_order), (0.5, 0.5, 0.5, 0.5))
+        assert np.allclose(colors[6 * k:6 * k + 6], expected)
+
+def test_draw3d_writes_a_png(tmp_path):
+    pytest.importorskip("matplotlib")
+    for name, placements in (("full.png", _placements(20)), ("empty.png", [])):
+        out = tmp_path / name
+        draw3d(placements, TruckSpec(), str(out), title="t", dpi=40)
+        assert out.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+
+@pytest.mark.parametrize("mode", ["sync", "thread", "process"])
+def test_output_writer_runs_jobs_in_order(tmp_path, mode):
+    path = str(tmp_path / "report.json")
+    with OutputWriter(mode) as writer:
+        for k in range(5):
+            writer.submit(save_report_json, {"k": k}, path)
+    with open(path) as f:
+        assert json.load(f) == {"k": 4}
+
+def _fail():
+    raise RuntimeError("disk full")
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_output_writer_reraises_on_close(mode):
+    writer = OutputWriter(mode)
+    writer.submit(_fail)
+    with pytest.raises(RuntimeError, match="disk full"):
+        writer.close()